@@ -1,9 +1,10 @@
 from django.conf import settings
 from django.db import models
 from django.utils import timezone
+from common.tracking import TrackedFieldsMixin
 from products.models import Material
 
-class BulkRequest(models.Model):
+class BulkRequest(TrackedFieldsMixin, models.Model):
     STATUS = [
         ("OPEN", "Open"),
         ("CLOSED", "Closed"),
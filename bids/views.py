@@ -4,6 +4,8 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from core.idempotency import idempotent
+
 from .models import BulkRequest, Bid
 from .serializers import BulkRequestSerializer, BidSerializer
 from .permissions import IsRetailOrWhole, IsSupplier
@@ -21,6 +23,10 @@ class BulkRequestViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsRetailOrWhole]
     serializer_class = BulkRequestSerializer
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def get_queryset(self):
         qs = BulkRequest.objects.select_related("user","material").annotate(bids_count=Count("bids")).order_by("-created_at")
         u = self.request.user
@@ -59,6 +65,10 @@ class BidViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated(), IsSupplier()]
         return [IsAuthenticated()]
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def get_queryset(self):
         qs = Bid.objects.select_related("bulk_request","supplier","bulk_request__material").order_by("-created_at")
         u = self.request.user
@@ -0,0 +1,44 @@
+# common/conditional.py
+"""
+ETag / Last-Modified helpers for DRF views.
+
+Views compute validators from a cheap query (never by serializing) and call
+not_modified() first; only when it returns None is the body built.
+"""
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    raw = "|".join(str(p) for p in parts)
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def _timestamp(dt):
+    return timegm(dt.utctimetuple()) if dt else None
+
+
+def set_validators(response, etag=None, last_modified=None, vary=()):
+    if etag:
+        response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(_timestamp(last_modified))
+    if vary:
+        patch_vary_headers(response, vary)
+    return response
+
+
+def not_modified(request, etag=None, last_modified=None, vary=()):
+    """
+    304 (or 412 for a failed If-Match) when the request's preconditions say the
+    client's copy is current, otherwise None.
+    """
+    if request.method not in ("GET", "HEAD") or not (etag or last_modified):
+        return None
+    response = get_conditional_response(request, etag=etag, last_modified=_timestamp(last_modified))
+    if response is not None and response.status_code == 304:
+        set_validators(response, etag, last_modified, vary)
+    return response
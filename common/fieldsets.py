@@ -0,0 +1,54 @@
+# common/fieldsets.py
+"""
+Sparse fieldsets: ?fields=a,b,c keeps only those output fields, ?omit=x,y
+drops fields. The view mixin parses the params into serializer context and
+exposes wants(name) so get_queryset() can skip joins/prefetches/columns for
+fields nobody asked for. "id" is always returned.
+"""
+
+
+def _split(value):
+    return {p.strip() for p in (value or "").split(",") if p.strip()}
+
+
+class SparseFieldsMixin:
+    """Serializer side: honours context["fields"] / context["omit"]."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        only = self.context.get("fields")
+        omit = self.context.get("omit") or ()
+        if only:
+            fields = {name: f for name, f in fields.items() if name in only or name == "id"}
+        for name in omit:
+            if name != "id":
+                fields.pop(name, None)
+        return fields
+
+
+class SparseFieldsViewMixin:
+    """View side: parse ?fields= / ?omit= once per request."""
+
+    fields_query_param = "fields"
+    omit_query_param = "omit"
+    # fields always dropped for an action, e.g. {"list": {"prices"}}
+    default_omit = {}
+
+    def get_fieldset(self):
+        if not hasattr(self, "_fieldset"):
+            params = self.request.query_params if getattr(self, "request", None) else {}
+            only = _split(params.get(self.fields_query_param)) or None
+            omit = _split(params.get(self.omit_query_param)) | set(self.default_omit.get(self.action, ()))
+            self._fieldset = (only, omit)
+        return self._fieldset
+
+    def wants(self, name):
+        only, omit = self.get_fieldset()
+        return (only is None or name in only) and name not in omit
+
+    def get_serializer_context(self):
+        ctx = super().get_serializer_context()
+        only, omit = self.get_fieldset()
+        ctx["fields"] = only
+        ctx["omit"] = omit
+        return ctx
@@ -0,0 +1,240 @@
+# common/pagination.py
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import F, OrderBy, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset, ttl=60):
+    """
+    Cheap "about N rows" for keyset pages. PostgreSQL answers from the
+    planner's row estimate; other databases run COUNT(*) once and reuse it
+    for `ttl` seconds per distinct query.
+    """
+    db = queryset.db
+    sql, params = queryset.order_by().query.sql_with_params()
+    if connections[db].vendor == "postgresql":
+        with connections[db].cursor() as cur:
+            cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cur.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    key = "estimate_count:" + hashlib.sha1(f"{db}:{sql}:{params!r}".encode()).hexdigest()
+    total = cache.get(key)
+    if total is None:
+        total = queryset.order_by().count()
+        cache.set(key, total, ttl)
+    return total
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over whatever ORDER BY the view produced.
+
+    The primary key is appended as a tie-breaker and each page is fetched with
+    a WHERE on the last row's sort values instead of OFFSET, and without a
+    COUNT(*), so page 500 costs the same as page 1. Cursors are opaque
+    base64 tokens; NULLs in nullable sort columns are treated as the largest
+    value in both directions.
+
+    Response: {"next", "previous", "results"} plus "estimated_total" when
+    the client asks for ?with_total=1.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    total_query_param = "with_total"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.keys = self.get_sort_keys(queryset)
+        position, reverse = self.decode_cursor(request)
+
+        keys = [(name, not desc, nullable) for name, desc, nullable in self.keys] if reverse else self.keys
+        qs = queryset.order_by(*[self._order_expr(*k) for k in keys])
+        if position is not None:
+            qs = qs.filter(self._after(keys, position))
+
+        rows = list(qs[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.first, self.last = (rows[0], rows[-1]) if rows else (None, None)
+        self.estimated_total = None
+        if request.query_params.get(self.total_query_param) in ("1", "true", "True"):
+            self.estimated_total = estimate_count(queryset)
+        return rows
+
+    def get_paginated_response(self, data):
+        payload = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+        if self.estimated_total is not None:
+            payload["estimated_total"] = self.estimated_total
+        return Response(payload)
+
+    # ---- links / cursors ----
+
+    def get_next_link(self):
+        if not (self.has_next and self.last is not None):
+            return None
+        return self._link(self.encode_cursor(self.last, reverse=False))
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.first is not None):
+            return None
+        return self._link(self.encode_cursor(self.first, reverse=True))
+
+    def _link(self, cursor):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, "page")
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def encode_cursor(self, obj, reverse):
+        values = [_jsonable(getattr(obj, self._attname(name))) for name, _, _ in self.keys]
+        raw = json.dumps({"p": values, "r": int(reverse)}, separators=(",", ":"))
+        return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            raw = urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            data = json.loads(raw)
+            values = data["p"]
+            if len(values) != len(self.keys):
+                raise ValueError("cursor does not match ordering")
+            position = [self._to_python(name, v) for (name, _, _), v in zip(self.keys, values)]
+            return position, bool(data.get("r"))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound("Invalid cursor")
+
+    # ---- ordering helpers ----
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param) or self.page_size)
+        except ValueError:
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_sort_keys(self, queryset):
+        self.model = queryset.model
+        ordering = list(queryset.query.order_by or self.model._meta.ordering)
+        keys = []
+        for item in ordering:
+            if isinstance(item, OrderBy) and isinstance(item.expression, F):
+                name, desc = item.expression.name, item.descending
+            elif isinstance(item, str) and "__" not in item and item != "?":
+                name, desc = item.lstrip("-"), item.startswith("-")
+            else:
+                raise NotFound(f"Ordering {item!r} cannot be used with cursor pagination")
+            if name in ("pk", self.model._meta.pk.name):
+                name = "pk"
+            keys.append((name, desc, self._nullable(name)))
+        if not any(name == "pk" for name, _, _ in keys):
+            keys.append(("pk", keys[-1][1] if keys else False, False))
+        return keys
+
+    def _field(self, name):
+        if name == "pk":
+            return self.model._meta.pk
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None  # annotation
+
+    def _nullable(self, name):
+        field = self._field(name)
+        return bool(field is not None and field.null)
+
+    def _attname(self, name):
+        field = self._field(name)
+        return "pk" if name == "pk" else (field.attname if field is not None else name)
+
+    def _to_python(self, name, value):
+        field = self._field(name)
+        if value is None or field is None:
+            return value
+        return field.to_python(value)
+
+    @staticmethod
+    def _order_expr(name, desc, nullable):
+        if not nullable:
+            return f"-{name}" if desc else name
+        return F(name).desc(nulls_first=True) if desc else F(name).asc(nulls_last=True)
+
+    @classmethod
+    def _after(cls, keys, position):
+        """Q for rows strictly after `position` in the (name, desc, nullable) ordering."""
+        (name, desc, nullable), value = keys[0], position[0]
+        if value is None:
+            equal = Q(**{f"{name}__isnull": True})
+            beyond = Q(**{f"{name}__isnull": False}) if desc else None
+        else:
+            equal = Q(**{name: value})
+            beyond = Q(**{f"{name}__{'lt' if desc else 'gt'}": value})
+            if nullable and not desc:
+                beyond |= Q(**{f"{name}__isnull": True})
+        if len(keys) == 1:
+            return beyond if beyond is not None else Q(pk__in=[])
+        tail = equal & cls._after(keys[1:], position[1:])
+        return tail if beyond is None else (beyond | tail)
+
+
+class PageOrKeysetPagination(BasePagination):
+    """
+    Default PageNumberPagination; switches to KeysetPagination when the client
+    opts in with ?pagination=cursor (or follows a ?cursor= link).
+    """
+
+    def __init__(self):
+        self.page_paginator = PageNumberPagination()
+        self.keyset_paginator = KeysetPagination()
+        self.active = self.page_paginator
+
+    @staticmethod
+    def wants_keyset(request):
+        params = request.query_params
+        return params.get("pagination") == "cursor" or bool(params.get(KeysetPagination.cursor_query_param))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.active = self.keyset_paginator if self.wants_keyset(request) else self.page_paginator
+        return self.active.paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_paginator.get_paginated_response_schema(schema)
+
+
+def _jsonable(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
@@ -0,0 +1,79 @@
+# common/tracking.py
+"""
+Dirty tracking for model instances without re-reading the row.
+
+TrackedFieldsMixin keeps the values an instance was loaded with (from_db,
+refresh_from_db, or its last save()), so signals and save paths can ask what
+changed:
+
+    order.has_changed("status"), order.loaded_value("status"), order.changed_fields()
+
+Models that set ``save_changed_only = True`` also get a narrower save():
+on an existing row without update_fields it writes only the changed columns
+(plus auto_now ones). Only opt in a model that has an auto_now field, no
+JSON fields changed in place and no pre_save receivers setting values;
+those changes would not be written. Post_save receivers still see the
+pre-save snapshot.
+"""
+
+
+class TrackedFieldsMixin:
+    # set True on a model to write only changed columns (see module docstring)
+    save_changed_only = False
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in instance.__dict__
+        }
+        return instance
+
+    def _tracked(self):
+        return [f for f in self._meta.concrete_fields if not f.primary_key]
+
+    def _remember(self, attnames=None):
+        loaded = self.__dict__.setdefault("_loaded_values", {})
+        for field in self._tracked():
+            if (attnames is None or field.attname in attnames) and field.attname in self.__dict__:
+                loaded[field.attname] = getattr(self, field.attname)
+
+    def loaded_value(self, name):
+        """Value of field `name` as last loaded / saved (None if unknown)."""
+        attname = self._meta.get_field(name).attname
+        return getattr(self, "_loaded_values", {}).get(attname)
+
+    def changed_fields(self):
+        """Names of fields whose current value differs from the loaded one."""
+        loaded = getattr(self, "_loaded_values", {})
+        changed = set()
+        for field in self._tracked():
+            if field.attname not in self.__dict__:
+                continue  # deferred and never touched
+            if field.attname not in loaded or loaded[field.attname] != getattr(self, field.attname):
+                changed.add(field.name)
+        return changed
+
+    def has_changed(self, name):
+        return name in self.changed_fields()
+
+    def save(self, *args, **kwargs):
+        if (
+            self.save_changed_only and not self._state.adding and self.pk is not None
+            and kwargs.get("update_fields") is None and not args
+            and hasattr(self, "_loaded_values")
+        ):
+            auto_now = {f.name for f in self._tracked() if getattr(f, "auto_now", False)}
+            kwargs["update_fields"] = self.changed_fields() | auto_now
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            self._remember()
+        else:
+            self._remember({self._meta.get_field(name).attname for name in update_fields})
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        fields = kwargs.get("fields")
+        self._remember(None if fields is None else {self._meta.get_field(f).attname for f in fields})
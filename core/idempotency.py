@@ -0,0 +1,158 @@
+# core/idempotency.py
+"""
+Idempotency-Key support for unsafe POST endpoints (checkout, bids, bulk requests).
+
+    @api_view(["POST"])
+    @permission_classes([IsAuthenticated])
+    @idempotent
+    def checkout_view(request): ...
+
+A request carrying an ``Idempotency-Key`` header claims (user, key) by
+inserting an IdempotencyKey row before the view runs. When the view returns,
+its rendered JSON and the headers it set are stored on the row and sent as-is,
+so every retry with the same key gets the identical response back (plus
+``Idempotent-Replayed: true``)
+without running the view again. A duplicate arriving while the first is still
+in flight polls for its result for up to IDEMPOTENCY_WAIT seconds instead of
+re-executing. Reusing a key with a different payload is a 422.
+
+5xx responses and exceptions release the claim so the client can retry.
+Rows expire after IDEMPOTENCY_KEY_TTL seconds (`manage.py purge_idempotency_keys`).
+Requests without the header behave exactly as before.
+"""
+import functools
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.1  # seconds
+# stored in their own columns or recomputed for each response
+UNSTORED_HEADERS = {"content-type", "content-length"}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def fingerprint(request):
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _error(detail, status):
+    return Response({"detail": detail}, status=status)
+
+
+def _build(body, status, content_type, headers):
+    response = HttpResponse(body, status=status, content_type=content_type)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def _replay(record):
+    response = _build(bytes(record.body or b""), record.status_code, record.content_type, record.headers or {})
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _claim(user, key, print_, now):
+    """Insert the in-flight row. Returns (record, created)."""
+    lock_timeout = timedelta(seconds=_setting("IDEMPOTENCY_LOCK_TIMEOUT", 60))
+    expires_at = now + timedelta(seconds=_setting("IDEMPOTENCY_KEY_TTL", 24 * 3600))
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user, key=key, fingerprint=print_, locked_at=now, expires_at=expires_at,
+            ), True
+    except IntegrityError:
+        pass
+    record = IdempotencyKey.objects.get(user=user, key=key)
+    # an expired row, or an in-flight claim whose worker died, can be taken over
+    stale = record.expires_at <= now or (record.status_code is None and record.locked_at <= now - lock_timeout)
+    if stale and IdempotencyKey.objects.filter(pk=record.pk, locked_at=record.locked_at).update(
+        fingerprint=print_, status_code=None, content_type="", body=None, headers={}, locked_at=now, expires_at=expires_at,
+    ):
+        record.refresh_from_db()
+        return record, True
+    return record, False
+
+
+def _wait(record):
+    deadline = time.monotonic() + _setting("IDEMPOTENCY_WAIT", 10)
+    while record.status_code is None and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+        if record is None:  # the original failed and released the key
+            return None
+    return record
+
+
+def _render(response):
+    """(body, content type, headers to keep) of the view's response."""
+    headers = {name: value for name, value in response.items() if name.lower() not in UNSTORED_HEADERS}
+    if isinstance(response, Response):
+        return JSONRenderer().render(response.data), "application/json", headers
+    return response.content, response.get("Content-Type", "application/json"), headers
+
+
+def idempotent(view):
+    """Decorate a DRF function view or viewset method (request is the first non-self arg)."""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        request = args[0] if hasattr(args[0], "META") else args[1]
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return _error(f"{HEADER} must be at most {MAX_KEY_LENGTH} characters", 400)
+
+        print_ = fingerprint(request)
+        record, created = _claim(request.user, key, print_, timezone.now())
+        if not created:
+            if record.fingerprint != print_:
+                return _error(f"{HEADER} was already used for a different request", 422)
+            record = _wait(record)
+            if record is None:
+                return wrapper(*args, **kwargs)
+            if record.status_code is None:
+                response = _error("A request with this Idempotency-Key is still in progress", 409)
+                response["Retry-After"] = "1"
+                return response
+            return _replay(record)
+
+        try:
+            response = view(*args, **kwargs)
+        except Exception:
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            raise
+        if response.status_code >= 500:
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            return response
+
+        body, content_type, headers = _render(response)
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            status_code=response.status_code, content_type=content_type, body=body, headers=headers,
+        )
+        # send the stored bytes, not a fresh render, so retries match exactly
+        return _build(body, response.status_code, content_type, headers)
+
+    return wrapper
+
+
+def purge_expired(now=None):
+    return IdempotencyKey.objects.filter(expires_at__lte=now or timezone.now()).delete()[0]
@@ -0,0 +1,12 @@
+# core/management/commands/purge_idempotency_keys.py
+from django.core.management.base import BaseCommand
+
+from core.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses past IDEMPOTENCY_KEY_TTL (run daily)."
+
+    def handle(self, *args, **opts):
+        deleted = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} expired idempotency keys."))
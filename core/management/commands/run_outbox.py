@@ -0,0 +1,45 @@
+# core/management/commands/run_outbox.py
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.outbox import drain, purge_sent
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox events (order e-mails) in batches; runs until stopped unless --once."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain everything that is due, then exit.")
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds to sleep when idle.")
+        parser.add_argument(
+            "--purge", action="store_true",
+            help="Delete delivered events older than OUTBOX_RETENTION_DAYS first.",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["purge"]:
+            days = getattr(settings, "OUTBOX_RETENTION_DAYS", 30)
+            purged = purge_sent(timezone.now() - timedelta(days=days))
+            self.stdout.write(f"Purged {purged} delivered events.")
+
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = drain(opts["batch_size"])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    if opts["verbosity"] > 1:
+                        self.stdout.write(f"  batch: {sent} sent, {failed} failed")
+                    continue
+                if opts["once"]:
+                    break
+                time.sleep(opts["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Outbox: {total_sent} sent, {total_failed} failed."))
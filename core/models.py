@@ -0,0 +1,56 @@
+# core/models.py
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class IdempotencyKey(models.Model):
+    """
+    First response to a POST sent with an Idempotency-Key header, replayed
+    verbatim on retries (see core/idempotency.py). status_code is NULL while
+    the original request is still running.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    key = models.CharField(max_length=255)
+    # sha256 of method + path + body: the same key with another payload is rejected
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    body = models.BinaryField(null=True, blank=True)
+    # headers the view set (Location, ETag...), restored on every replay
+    headers = models.JSONField(default=dict, blank=True)
+    locked_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "key"], name="uniq_idempotency_key")]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key} ({self.status_code or 'in flight'})"
+
+
+class OutboxEvent(models.Model):
+    """
+    Side effect (e-mail, webhook...) recorded in the same transaction as the
+    change that caused it and delivered later by `manage.py run_outbox`
+    (see core/outbox.py).
+    """
+    PENDING, SENT, FAILED = "PENDING", "SENT", "FAILED"
+    STATUS_CHOICES = [(PENDING, "Pending"), (SENT, "Sent"), (FAILED, "Failed")]
+
+    topic = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # next delivery attempt; pushed forward while a worker holds the event
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "available_at"], name="outbox_due")]
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk} ({self.status})"
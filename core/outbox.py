@@ -0,0 +1,110 @@
+# core/outbox.py
+"""
+Transactional outbox.
+
+Writers call enqueue(topic, payload) inside the transaction that makes the
+change, so the event exists if and only if the change committed, and the
+request never waits on SMTP or any other slow backend. `manage.py run_outbox`
+drains due events in batches:
+
+  - claim a batch (available_at pushed OUTBOX_LEASE seconds ahead, so a
+    second worker skips it);
+  - open ONE mail connection for the batch and call each topic's handler
+    with it: handler(payload, mail=connection);
+  - mark successes SENT; failures are retried after OUTBOX_RETRY_BASE * 2^n
+    seconds (capped at OUTBOX_RETRY_MAX) and marked FAILED after
+    OUTBOX_MAX_ATTEMPTS.
+
+Handlers register with @outbox_handler("topic") in their app's signals.py.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+HANDLERS = {}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def outbox_handler(topic):
+    def register(func):
+        HANDLERS[topic] = func
+        return func
+    return register
+
+
+def enqueue(topic, payload):
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def enqueue_many(events):
+    """enqueue() for a batch of (topic, payload) pairs: one INSERT."""
+    return OutboxEvent.objects.bulk_create([OutboxEvent(topic=t, payload=p) for t, p in events])
+
+
+def retry_delay(attempts):
+    base = _setting("OUTBOX_RETRY_BASE", 30)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), _setting("OUTBOX_RETRY_MAX", 3600)))
+
+
+def _claim(batch_size, now):
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEvent.PENDING, available_at__lte=now)
+            .order_by("available_at", "id")[:batch_size]
+        )
+        if events:
+            OutboxEvent.objects.filter(pk__in=[e.pk for e in events]).update(
+                available_at=now + timedelta(seconds=_setting("OUTBOX_LEASE", 300)),
+            )
+    return events
+
+
+def drain(batch_size=None, now=None):
+    """Deliver one batch of due events. Returns (sent, failed) counts for the batch."""
+    now = now or timezone.now()
+    events = _claim(batch_size or _setting("OUTBOX_BATCH_SIZE", 100), now)
+    if not events:
+        return 0, 0
+
+    max_attempts = _setting("OUTBOX_MAX_ATTEMPTS", 8)
+    sent = failed = 0
+    # if the mail server is down this raises and the batch is retried once
+    # its lease runs out
+    with get_connection() as mail:
+        for event in events:
+            event.attempts += 1
+            handler = HANDLERS.get(event.topic)
+            try:
+                if handler is None:
+                    raise LookupError(f"no outbox handler for {event.topic!r}")
+                handler(event.payload, mail=mail)
+            except Exception as exc:
+                failed += 1
+                event.last_error = f"{type(exc).__name__}: {exc}"
+                if handler is None or event.attempts >= max_attempts:
+                    event.status = OutboxEvent.FAILED
+                else:
+                    event.available_at = timezone.now() + retry_delay(event.attempts)
+            else:
+                sent += 1
+                event.status = OutboxEvent.SENT
+                event.sent_at = timezone.now()
+                event.last_error = ""
+
+    OutboxEvent.objects.bulk_update(
+        events, ["status", "attempts", "available_at", "last_error", "sent_at"],
+    )
+    return sent, failed
+
+
+def purge_sent(before):
+    return OutboxEvent.objects.filter(status=OutboxEvent.SENT, sent_at__lte=before).delete()[0]
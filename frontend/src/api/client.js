@@ -22,12 +22,28 @@ export const tokenStore = {
   },
 };
 
-// Request: attach access token if present
+// Guest cart token (anonymous cart kept server-side in the cache).
+// The backend merges it into the user's cart on login.
+export const cartTokenStore = {
+  get() {
+    return localStorage.getItem("cartToken");
+  },
+  set(token) {
+    if (token) localStorage.setItem("cartToken", token);
+    else localStorage.removeItem("cartToken");
+  },
+};
+
+// Request: attach access token (and guest cart token) if present
 client.interceptors.request.use((config) => {
   const tokens = tokenStore.get();
   if (tokens?.access) {
     config.headers.Authorization = `Bearer ${tokens.access}`;
   }
+  const cartToken = cartTokenStore.get();
+  if (cartToken) {
+    config.headers["X-Cart-Token"] = cartToken;
+  }
   return config;
 });
 
@@ -72,4 +88,16 @@ client.interceptors.response.use(
   }
 );
 
+// Every row of a paginated list endpoint: cursor pages, following `next`.
+export async function fetchAllPages(url, params = {}) {
+  const rows = [];
+  let res = await client.get(url, { params: { pagination: "cursor", page_size: 100, ...params } });
+  rows.push(...(res.data.results ?? []));
+  while (res.data.next) {
+    res = await client.get(res.data.next);
+    rows.push(...(res.data.results ?? []));
+  }
+  return rows;
+}
+
 export default client;
@@ -1,6 +1,6 @@
 // src/context/AuthContext.jsx
 import { createContext, useEffect, useState } from "react";
-import api from "../api/client";
+import api, { cartTokenStore } from "../api/client";
 
 export const AuthContext = createContext(null);
 
@@ -55,6 +55,7 @@ export default function AuthProvider({ children }) {
   // ✅ yeh naya login function
   const login = async (username, password) => {
     const r = await api.post("/auth/login/", { username, password });
+    cartTokenStore.set(null); // guest cart was merged into the account
     const nextTokens = r.data;
     setTokens(nextTokens);
     localStorage.setItem("tokens", JSON.stringify(nextTokens));
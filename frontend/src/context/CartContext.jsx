@@ -1,5 +1,5 @@
 import { createContext, useCallback, useContext, useEffect, useMemo, useState } from "react";
-import client from "../api/client";
+import client, { cartTokenStore } from "../api/client";
 import { AuthContext } from "./AuthContext";
 
 export const CartContext = createContext(null);
@@ -11,7 +11,8 @@ export default function CartProvider({ children }) {
 
   // load optionally accepts a category slug to request server-side filtered cart
   const load = useCallback(async (category = "") => {
-    if (!tokens?.access) { setItems([]); setSummary({ count: 0, subtotal: 0 }); return; }
+    // guests without a cart token have nothing to load
+    if (!tokens?.access && !cartTokenStore.get()) { setItems([]); setSummary({ count: 0, subtotal: 0 }); return; }
     const params = category ? { params: { category } } : {};
     const [listRes, sumRes] = await Promise.all([
       client.get("/cart/", params),
@@ -27,7 +28,8 @@ export default function CartProvider({ children }) {
 
   const add = useCallback(async (materialId, qty = 1) => {
     try {
-      await client.post("/cart/", { material: materialId, qty });
+      const res = await client.post("/cart/", { material: materialId, qty });
+      if (res?.data?.cart_token) cartTokenStore.set(res.data.cart_token);
       await load();
     } catch (err) {
       const data = err?.response?.data;
@@ -38,6 +40,15 @@ export default function CartProvider({ children }) {
     }
   }, [load]);
 
+  // lines: [{ sku, qty } | { material, qty }] — one request for a whole purchase list.
+  // Resolves to { unknown, shortages } so the caller can show what was skipped.
+  const addMany = useCallback(async (lines, mode = "add") => {
+    const res = await client.post("/cart/bulk/", { items: lines, mode });
+    setItems(res.data.items ?? []);
+    setSummary(res.data.summary ?? { count: 0, subtotal: 0 });
+    return { unknown: res.data.unknown ?? [], shortages: res.data.shortages ?? [] };
+  }, []);
+
   const updateQty = useCallback(async (id, qty) => {
     await client.patch(`/cart/${id}/`, { qty });
     await load();
@@ -49,8 +60,8 @@ export default function CartProvider({ children }) {
   }, [load]);
 
   const value = useMemo(() => ({
-    items, summary, load, add, updateQty, remove
-  }), [items, summary, add, updateQty, remove, load]);
+    items, summary, load, add, addMany, updateQty, remove
+  }), [items, summary, add, addMany, updateQty, remove, load]);
 
   return <CartContext.Provider value={value}>{children}</CartContext.Provider>;
 }
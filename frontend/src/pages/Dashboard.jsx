@@ -6,6 +6,7 @@ import { useNavigate } from "react-router-dom";
 export default function Dashboard() {
   const { user, tokens, loadProfile } = useContext(AuthContext);
   const [orders, setOrders] = useState([]);
+  const [orderStats, setOrderStats] = useState({});
   const [materials, setMaterials] = useState([]);
   const [loading, setLoading] = useState(true);
   const [expanded, setExpanded] = useState({});
@@ -14,36 +15,36 @@ export default function Dashboard() {
   const isWholesaler = user?.role === "WHOLESALER";
   const isAdmin = user?.role === "ADMIN" || user?.is_staff;
 
-  // Calculate stats based on role
+  // Totals come from GET /orders/stats/ (all orders, server-side); `orders` is only the recent page
   const getStats = () => {
+    const byStatus = orderStats.by_status || {};
+    const common = {
+      totalOrders: orderStats.count || 0,
+      avgOrderValue: Math.round(Number(orderStats.avg_order_value) || 0),
+      placedOrders: byStatus.PLACED || 0,
+      confirmedOrders: byStatus.CONFIRMED || 0,
+      dispatchedOrders: byStatus.DISPATCHED || 0,
+      deliveredOrders: byStatus.DELIVERED || 0,
+    };
     if (isWholesaler || isAdmin) {
       // Supplier perspective: orders received from buyers
-      const totalRevenue = orders.reduce((sum, o) => sum + (Number(o.total) || 0), 0);
       const totalProducts = materials.length;
       const totalInventory = materials.reduce((sum, m) => sum + (Number(m.stock_qty) || 0), 0);
       const lowStockCount = materials.filter(m => (Number(m.stock_qty) || 0) < (Number(m.min_stock) || 5)).length;
 
       return {
-        totalOrders: orders.length,
-        totalRevenue: totalRevenue,
-        avgOrderValue: orders.length > 0 ? Math.round(totalRevenue / orders.length) : 0,
+        ...common,
+        totalRevenue: Number(orderStats.total) || 0,
         totalProducts: totalProducts,
         totalInventory: totalInventory,
         lowStockCount: lowStockCount,
-        pendingOrders: orders.filter(o => o.status === "PLACED").length,
-        confirmedOrders: orders.filter(o => o.status === "CONFIRMED").length,
-        dispatchedOrders: orders.filter(o => o.status === "DISPATCHED").length,
-        deliveredOrders: orders.filter(o => o.status === "DELIVERED").length,
+        pendingOrders: common.placedOrders,
       };
     } else {
       // Customer perspective
       return {
-        totalOrders: orders.length,
-        totalSpent: orders.reduce((sum, o) => sum + (Number(o.total) || 0), 0),
-        avgOrderValue: orders.length > 0 ? Math.round(orders.reduce((sum, o) => sum + (Number(o.total) || 0), 0) / orders.length) : 0,
-        placedOrders: orders.filter(o => o.status === "PLACED").length,
-        confirmedOrders: orders.filter(o => o.status === "CONFIRMED").length,
-        deliveredOrders: orders.filter(o => o.status === "DELIVERED").length,
+        ...common,
+        totalSpent: Number(orderStats.total) || 0,
       };
     }
   };
@@ -57,8 +58,12 @@ export default function Dashboard() {
         if (!user && typeof loadProfile === "function") {
           await loadProfile();
         }
-        const { data } = await client.get("/orders/");
-        setOrders(Array.isArray(data) ? data : data.results ?? data);
+        const [{ data }, { data: statsData }] = await Promise.all([
+          client.get("/orders/"),        // first page = most recent orders
+          client.get("/orders/stats/"),
+        ]);
+        setOrders(data.results ?? []);
+        setOrderStats(statsData ?? {});
 
         // Load materials for wholesaler/admin inventory stats
         if (isWholesaler || isAdmin) {
@@ -158,7 +163,7 @@ export default function Dashboard() {
         </div>
 
         {/* Admin KPI Cards */}
-        {isAdmin && orders.length > 0 && (
+        {isAdmin && stats.totalOrders > 0 && (
           <div style={{ display: "grid", gridTemplateColumns: "repeat(auto-fit, minmax(220px, 1fr))", gap: 16, marginBottom: 24 }}>
             <div style={{ background: "white", padding: 20, borderRadius: 12, boxShadow: "0 2px 8px rgba(0,0,0,0.12)", borderLeft: "4px solid #ff8a00" }}>
               <div style={{ fontSize: 12, color: "#999" }}>Total Orders</div>
@@ -184,7 +189,7 @@ export default function Dashboard() {
         )}
 
         {/* Wholesaler Supplier KPI Cards */}
-        {isWholesaler && orders.length > 0 && (
+        {isWholesaler && stats.totalOrders > 0 && (
           <div style={{ display: "grid", gridTemplateColumns: "repeat(auto-fit, minmax(200px, 1fr))", gap: 16, marginBottom: 24 }}>
             <div style={{ background: "white", padding: 20, borderRadius: 12, boxShadow: "0 2px 8px rgba(0,0,0,0.1)", borderLeft: "4px solid #00897b" }}>
               <div style={{ fontSize: 12, color: "#999" }}>Supply Orders</div>
@@ -231,7 +236,7 @@ export default function Dashboard() {
         )}
 
         {/* Wholesaler Order Status Breakdown */}
-        {isWholesaler && orders.length > 0 && (
+        {isWholesaler && stats.totalOrders > 0 && (
           <div style={{ background: "white", padding: 20, borderRadius: 12, marginBottom: 24, boxShadow: "0 2px 8px rgba(0,0,0,0.1)" }}>
             <h2 style={{ margin: "0 0 16px", fontSize: 18, color: "#333" }}>📊 Supply Order Status</h2>
             <div style={{ display: "grid", gridTemplateColumns: "repeat(auto-fit, minmax(150px, 1fr))", gap: 12 }}>
@@ -251,7 +256,7 @@ export default function Dashboard() {
         )}
 
         {/* Customer KPI Cards */}
-        {!isWholesaler && !isAdmin && orders.length > 0 && (
+        {!isWholesaler && !isAdmin && stats.totalOrders > 0 && (
           <div style={{ display: "grid", gridTemplateColumns: "repeat(auto-fit, minmax(200px, 1fr))", gap: 16, marginBottom: 24 }}>
             <div style={{ background: "white", padding: 20, borderRadius: 12, boxShadow: "0 2px 8px rgba(0,0,0,0.1)", borderLeft: "4px solid #667eea" }}>
               <div style={{ fontSize: 12, color: "#999" }}>Total Orders</div>
@@ -273,14 +278,14 @@ export default function Dashboard() {
         )}
 
         {/* Customer Status Breakdown */}
-        {!isWholesaler && !isAdmin && orders.length > 0 && (
+        {!isWholesaler && !isAdmin && stats.totalOrders > 0 && (
           <div style={{ background: "white", padding: 20, borderRadius: 12, marginBottom: 24, boxShadow: "0 2px 8px rgba(0,0,0,0.1)" }}>
             <h2 style={{ margin: "0 0 16px", fontSize: 18, color: "#333" }}>📊 Order Status Breakdown</h2>
             <div style={{ display: "grid", gridTemplateColumns: "repeat(auto-fit, minmax(150px, 1fr))", gap: 12 }}>
               {[
                 { label: "Placed", count: stats.placedOrders, color: "#FF9800" },
                 { label: "Confirmed", count: stats.confirmedOrders, color: "#2196F3" },
-                { label: "Dispatched", count: stats.deliveredOrders, color: "#9C27B0" },
+                { label: "Dispatched", count: stats.dispatchedOrders, color: "#9C27B0" },
                 { label: "Delivered", count: stats.deliveredOrders, color: "#4CAF50" },
               ].map((s, i) => (
                 <div key={i} style={{ padding: 12, background: `${s.color}15`, borderLeft: `4px solid ${s.color}`, borderRadius: 6 }}>
@@ -6,6 +6,7 @@ export default function MyOrders() {
   const [rows, setRows] = useState([]);
   const [loading, setLoading] = useState(true);
   const [err, setErr] = useState("");
+  const [next, setNext] = useState(null);
   
   const downloadInvoice = async (id) => {
     try {
@@ -23,19 +24,21 @@ export default function MyOrders() {
     }
   };
 
-  useEffect(() => {
-    (async () => {
-      try {
-        const { data } = await client.get("/orders/");
-        setRows(data);
-      } catch (e) {
-        setErr("Failed to load orders");
-        console.error(e);
-      } finally {
-        setLoading(false);
-      }
-    })();
-  }, []);
+  // cursor pages: "Load more" follows the `next` link
+  const loadPage = async (url = "/orders/", params = { pagination: "cursor" }) => {
+    try {
+      const { data } = await client.get(url, { params });
+      setRows(prev => (url === "/orders/" ? data.results : [...prev, ...data.results]));
+      setNext(data.next);
+    } catch (e) {
+      setErr("Failed to load orders");
+      console.error(e);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  useEffect(() => { loadPage(); }, []);
 
   if (loading) return <div style={{ padding: 16 }}>Loading…</div>;
   if (err) return <div style={{ padding: 16, color: "red" }}>{err}</div>;
@@ -60,7 +63,7 @@ export default function MyOrders() {
               <tr key={o.id} style={{ borderTop: "1px solid #eee" }}>
                 <td align="left">{o.id}</td>
                 <td align="center">{o.status}</td>
-                <td align="center">{o.item_count}</td>
+                <td align="center">{o.items_count}</td>
                 <td align="right">{Number(o.total).toLocaleString()}</td>
                 <td align="center">{new Date(o.created_at).toLocaleString()}</td>
                 <td align="center">
@@ -71,6 +74,7 @@ export default function MyOrders() {
           </tbody>
         </table>
       )}
+      {next && <button style={{ marginTop: 12 }} onClick={() => loadPage(next, {})}>Load more</button>}
    
     </div>
   );
@@ -47,7 +47,7 @@ export default function Reports() {
           <tbody>
             {rows.map((r, idx) => (
               <tr key={idx} style={{ borderTop: "1px solid #eee" }}>
-                <td>{r.day}</td>
+                <td>{r.date}</td>
                 <td align="center">{r.orders}</td>
                 <td align="right">{Number(r.revenue).toLocaleString()}</td>
               </tr>
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import client from "../api/client";
+import client, { fetchAllPages } from "../api/client";
 import Stars from "../components/Stars";
 
 export default function Reviews() {
@@ -9,10 +9,10 @@ export default function Reviews() {
 
   const load = async () => {
     const [o, r] = await Promise.all([
-      client.get("/orders/"),        // you may filter delivered on backend later
+      fetchAllPages("/orders/"),     // every page, not just the first; you may filter delivered later (?status=)
       client.get("/reviews/mine/"),
     ]);
-    setOrders(o.data);
+    setOrders(o);
     setReviews(r.data);
   };
 
@@ -16,6 +16,7 @@ from pathlib import Path
 # ye lines add ki hain
 from pathlib import Path
 from datetime import timedelta   # ← yeh line add karo (JWT lifetimes ke liye)
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -109,6 +110,8 @@ MIDDLEWARE = [
 # ----  ye lines add ki hain
 # ----
 CORS_ALLOW_ALL_ORIGINS = True
+# custom request headers the SPA sends (Idempotency-Key on checkout, guest cart token)
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key", "x-cart-token")
 
 
 
@@ -213,4 +216,84 @@ EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = "noreply@cs619.local"
 
 # (optional but handy in templates)
-STATIC_URL = "static/"
\ No newline at end of file
+STATIC_URL = "static/"
+
+# ---- Catalog search ----
+# Dotted path to a products.search backend. Left unset, SQLite uses the FTS5
+# index (rebuild with `manage.py rebuild_search_index`) and other databases
+# fall back to products.search.SimpleSearchBackend.
+# CATALOG_SEARCH_BACKEND = "products.search.Fts5SearchBackend"
+
+
+# ---- Caching ----
+# locmem is per process: fine for dev/tests, point "default" at a shared
+# cache (redis/memcached) in production so catalog versions agree.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "cs619-default",
+    }
+}
+CATALOG_CACHE_ALIAS = "default"
+CATALOG_CACHE_TIMEOUT = 300  # seconds
+CATALOG_FACET_BUCKET_SIZE = 1000  # default price histogram bucket width (Rs)
+
+# ---- Stock ledger ----
+# `manage.py compact_stock_ledger` folds StockMovement rows older than this
+# into StockSnapshot rows (run it daily/weekly).
+STOCK_LEDGER_RETENTION_DAYS = 90
+
+# ---- Cart reservations ----
+# When enabled, adding an item to the cart holds its qty for the TTL so
+# shortages show up at add-to-cart instead of at checkout. Sweep expired
+# holds with `manage.py sweep_reservations`.
+CART_RESERVATIONS_ENABLED = False
+CART_RESERVATION_TTL = 15 * 60  # seconds
+
+# ---- Cart summary ----
+# /api/cart/summary/ is cached per user; cart writes and price changes bump
+# version counters instead of deleting entries, so this only bounds memory.
+CART_SUMMARY_CACHE_TIMEOUT = 5 * 60  # seconds
+
+# ---- Guest carts ----
+# Anonymous carts live only in this cache (use a shared one in production)
+# and are merged into CartItem on login; see orders/cart_store.py.
+GUEST_CART_CACHE_ALIAS = "default"
+GUEST_CART_TTL = 7 * 24 * 3600  # seconds
+
+# ---- Idempotency keys ----
+# POSTs to checkout / bids / bulk requests sent with an Idempotency-Key header
+# replay their first response for this long. Duplicates of a request still in
+# flight wait up to IDEMPOTENCY_WAIT seconds for it; a claim older than
+# IDEMPOTENCY_LOCK_TIMEOUT without a response is treated as abandoned.
+# Purge expired keys with `manage.py purge_idempotency_keys`.
+IDEMPOTENCY_KEY_TTL = 24 * 3600  # seconds
+IDEMPOTENCY_WAIT = 10  # seconds
+IDEMPOTENCY_LOCK_TIMEOUT = 60  # seconds
+
+# ---- Outbox ----
+# Order notifications are queued in core.OutboxEvent and delivered by
+# `manage.py run_outbox` (one mail connection per batch). Failed deliveries
+# are retried after OUTBOX_RETRY_BASE * 2^n seconds, up to OUTBOX_RETRY_MAX.
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_BASE = 30  # seconds
+OUTBOX_RETRY_MAX = 60 * 60  # seconds
+OUTBOX_LEASE = 5 * 60  # seconds a worker holds a claimed batch
+OUTBOX_RETENTION_DAYS = 30  # delivered events kept this long (run_outbox --purge)
+
+# ---- Archival ----
+# `manage.py archive_orders` moves DELIVERED/CANCELLED orders not updated for
+# ORDER_ARCHIVE_AFTER_DAYS, and alerts resolved ALERT_ARCHIVE_AFTER_DAYS ago,
+# into archive tables. Order detail and invoices still find archived orders.
+ORDER_ARCHIVE_AFTER_DAYS = 365
+ALERT_ARCHIVE_AFTER_DAYS = 90
+
+# ---- Invoices ----
+# Invoice PDFs are rendered once per content version and kept under
+# INVOICE_DIR (see orders/invoices.py); confirming an order queues the render
+# for `manage.py run_outbox`. `manage.py render_invoices` renders missing ones
+# with INVOICE_EXPORT_WORKERS processes; the admin ZIP export renders inline.
+INVOICE_DIR = BASE_DIR / "var" / "invoices"
+INVOICE_EXPORT_WORKERS = 2
+INVOICE_EXPORT_MAX_ORDERS = 2000
@@ -2,9 +2,9 @@
 
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 
-from users.views import register_view, me_view
+from users.views import LoginView, register_view, me_view
 from myproject.views import health_view
 from users.views_admin import (
     admin_metrics,
@@ -19,7 +19,7 @@ urlpatterns = [
 
     # 🔐 Auth endpoints
     path("api/auth/register/", register_view, name="register"),   # ✅ function, no .as_view()
-    path("api/auth/login/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("api/auth/login/", LoginView.as_view(), name="token_obtain_pair"),  # merges a guest cart
     path("api/auth/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/auth/me/", me_view, name="me"),
 
@@ -0,0 +1,81 @@
+# orders/archive.py
+"""
+Cold storage for finished orders.
+
+archive_orders() moves DELIVERED / CANCELLED orders untouched since `before`
+into ArchivedOrder / ArchivedOrderItem, one transaction per batch: copy
+with bulk_create (ids kept, the review folded into ArchivedOrder.review),
+then delete the hot rows. Order listing, the admin dashboard and anything
+else scanning Order only ever see live and recent orders.
+
+Detail reads (order detail, invoice) go through find_order(), which falls
+back to the archive when the id is no longer in Order. The sales report
+adds the archive's daily totals.
+"""
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+TERMINAL_STATUSES = ("DELIVERED", "CANCELLED")
+ORDER_FIELDS = (
+    "id", "user_id", "address", "status", "subtotal", "tax", "delivery_charges",
+    "total", "payment_method", "created_at", "updated_at",
+)
+ITEM_FIELDS = ("id", "order_id", "material_id", "title", "sku", "unit", "qty", "price", "line_total")
+
+
+def archivable_orders(before):
+    return Order.objects.filter(status__in=TERMINAL_STATUSES, updated_at__lt=before)
+
+
+def archive_orders(before, batch_size=500):
+    """Move finished orders last updated before `before`. Returns orders archived."""
+    moved = 0
+    while True:
+        with transaction.atomic():
+            ids = list(archivable_orders(before).order_by("id").values_list("id", flat=True)[:batch_size])
+            if not ids:
+                return moved
+            orders = Order.objects.filter(pk__in=ids).select_related("review")
+            ArchivedOrder.objects.bulk_create([
+                ArchivedOrder(
+                    **{f: getattr(o, f) for f in ORDER_FIELDS},
+                    review=_review(o),
+                )
+                for o in orders
+            ])
+            ArchivedOrderItem.objects.bulk_create([
+                ArchivedOrderItem(**row)
+                for row in OrderItem.objects.filter(order_id__in=ids).values(*ITEM_FIELDS)
+            ], batch_size=batch_size)
+            Order.objects.filter(pk__in=ids).delete()
+            moved += len(ids)
+
+
+def _review(order):
+    review = getattr(order, "review", None)
+    if review is None:
+        return None
+    return {"rating": review.rating, "comment": review.comment, "created_at": review.created_at.isoformat()}
+
+
+def _load(model, item_model, pk, user=None):
+    qs = model.objects.select_related("user").prefetch_related(
+        Prefetch("items", queryset=item_model.objects.select_related("material"))
+    )
+    if user is not None:
+        qs = qs.filter(user=user)
+    return qs.filter(pk=pk).first()
+
+
+def find_archived_order(pk, user=None):
+    return _load(ArchivedOrder, ArchivedOrderItem, pk, user)
+
+
+def find_order(pk, user=None):
+    """
+    Order `pk`, or its archived copy, with user and items loaded; None if
+    neither exists. With `user`, only that user's order is returned.
+    """
+    return _load(Order, OrderItem, pk, user) or find_archived_order(pk, user)
@@ -0,0 +1,107 @@
+# orders/cart_bulk.py
+"""
+Bulk cart loading for wholesale purchase lists (POST /api/cart/bulk/).
+
+A pasted list of {material|sku, qty} entries becomes a fixed number of
+queries however long it is: one to resolve ids and SKUs (with the stock
+left for this user), one to read the quantities already in the cart, one
+conflict-aware bulk_create upsert on (user, material), and, with
+CART_RESERVATIONS_ENABLED, one more upsert for the holds. Entries naming
+the same material are summed first.
+
+Unknown materials and stock shortfalls are reported for the whole batch
+instead of failing on the first one. Shortfalls are informational unless
+reservations are on; then those lines are left unchanged, like a single
+add answering 409.
+"""
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from products.models import Material
+from .models import CartItem, StockReservation
+from .reservations import held_by_others, reservation_ttl, reservations_enabled
+from .summary import bump_cart_version
+
+ADD, SET = "add", "set"
+MODES = (ADD, SET)
+MAX_BULK_CART_LINES = 500
+
+
+def _resolve(user, entries, lock):
+    """{material_id: (sku, available)} for every id/sku named, plus the unknown keys."""
+    ids = {e["material"] for e in entries if "material" in e}
+    skus = {e["sku"] for e in entries if "sku" in e}
+    qs = Material.objects.filter(Q(pk__in=ids) | Q(sku__in=skus))
+    if lock:
+        qs = qs.select_for_update().annotate(available=F("stock_qty") - held_by_others(user.pk))
+    else:
+        qs = qs.annotate(available=F("stock_qty"))
+    found = {pk: (sku, available) for pk, sku, available in qs.values_list("pk", "sku", "available")}
+    by_sku = {sku: pk for pk, (sku, _) in found.items()}
+    unknown = sorted(str(i) for i in ids - found.keys()) + sorted(skus - by_sku.keys())
+    return found, by_sku, unknown
+
+
+def bulk_upsert(user, entries, mode=ADD, now=None):
+    """
+    Apply validated CartBulkLineSerializer entries to `user`'s cart.
+    mode=ADD adds to quantities already in the cart, SET replaces them.
+    Returns {"updated": [material ids], "unknown": [...], "shortages": [...]}.
+    """
+    now = now or timezone.now()
+    holds = reservations_enabled()
+    with transaction.atomic():
+        found, by_sku, unknown = _resolve(user, entries, lock=holds)
+
+        wanted = {}
+        for e in entries:
+            pk = e["material"] if "material" in e else by_sku.get(e["sku"])
+            if pk in found:
+                wanted[pk] = wanted.get(pk, 0) + e["qty"]
+
+        if mode == ADD:
+            existing = dict(
+                CartItem.objects.filter(user=user, material_id__in=wanted).values_list("material_id", "qty")
+            )
+            wanted = {pk: existing.get(pk, 0) + qty for pk, qty in wanted.items()}
+
+        shortages = []
+        for pk, qty in sorted(wanted.items()):
+            sku, available = found[pk]
+            if qty > available:
+                shortages.append({"material": pk, "sku": sku, "qty": qty, "available": max(available, 0)})
+        if holds:
+            for s in shortages:
+                del wanted[s["material"]]
+
+        if wanted:
+            items = CartItem.objects.bulk_create(
+                [CartItem(user=user, material_id=pk, qty=qty) for pk, qty in sorted(wanted.items())],
+                update_conflicts=True, unique_fields=["user", "material"], update_fields=["qty"],
+            )
+            if holds:
+                _hold(user, items, now)
+            # bulk_create sends no signals
+            bump_cart_version(user.pk)
+
+    return {"updated": sorted(wanted), "unknown": unknown, "shortages": shortages}
+
+
+def _hold(user, items, now):
+    if any(it.pk is None for it in items):
+        # backends without RETURNING on upserts: read the line ids back
+        ids = dict(
+            CartItem.objects.filter(user=user, material_id__in=[it.material_id for it in items])
+            .values_list("material_id", "pk")
+        )
+        for it in items:
+            it.pk = ids[it.material_id]
+    expires_at = now + reservation_ttl()
+    StockReservation.objects.bulk_create(
+        [
+            StockReservation(cart_item_id=it.pk, user=user, material_id=it.material_id, qty=it.qty, expires_at=expires_at)
+            for it in items
+        ],
+        update_conflicts=True, unique_fields=["cart_item"], update_fields=["qty", "expires_at"],
+    )
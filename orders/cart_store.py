@@ -0,0 +1,154 @@
+# orders/cart_store.py
+"""
+Cache-backed carts for anonymous shoppers.
+
+A guest gets a signed cart token (sent back in the X-Cart-Token header; the
+first add returns it as "cart_token"). The cart is a single cache entry
+{material_id: qty} in the GUEST_CART_CACHE_ALIAS cache, so adds and rapid
+qty edits just rewrite that entry and never touch the database or contend
+with checkout transactions. On login (and at checkout, if the header is
+still sent) merge_guest_cart() flushes it into the user's CartItem rows
+with the bulk cart upsert (stock holds included) and drops the cache entry.
+
+Use a shared cache (redis/memcached) in production; locmem only works with
+a single worker.
+"""
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+
+from products.models import Material
+from products.pricing import PriceResolver
+from .cart_bulk import ADD, bulk_upsert
+
+HEADER = "X-Cart-Token"
+SALT = "orders.guest-cart"
+KEY = "cart:guest:{}"
+MAX_LINES = 100
+
+
+def _cache():
+    return caches[getattr(settings, "GUEST_CART_CACHE_ALIAS", "default")]
+
+
+def _ttl():
+    return getattr(settings, "GUEST_CART_TTL", 7 * 24 * 3600)
+
+
+class GuestCart:
+    def __init__(self, cart_id=None):
+        self.cart_id = cart_id or uuid.uuid4().hex
+
+    @classmethod
+    def from_request(cls, request, create=False):
+        """The cart named by the request's token; a new one (or None) if missing/invalid."""
+        token = request.headers.get(HEADER)
+        if token:
+            try:
+                return cls(signing.loads(token, salt=SALT, max_age=_ttl()))
+            except signing.BadSignature:
+                pass
+        return cls() if create else None
+
+    @property
+    def token(self):
+        return signing.dumps(self.cart_id, salt=SALT)
+
+    @property
+    def key(self):
+        return KEY.format(self.cart_id)
+
+    def lines(self):
+        """{material_id: qty}"""
+        return _cache().get(self.key) or {}
+
+    def _save(self, lines):
+        _cache().set(self.key, lines, _ttl())
+
+    def set(self, material_id, qty):
+        lines = self.lines()
+        if material_id not in lines and len(lines) >= MAX_LINES:
+            raise ValueError(f"a guest cart holds at most {MAX_LINES} lines")
+        lines[material_id] = max(1, qty)
+        self._save(lines)
+        return lines[material_id]
+
+    def add(self, material_id, qty):
+        return self.set(material_id, self.lines().get(material_id, 0) + qty)
+
+    def remove(self, material_id):
+        lines = self.lines()
+        if lines.pop(material_id, None) is None:
+            return False
+        self._save(lines)
+        return True
+
+    def clear(self):
+        _cache().delete(self.key)
+
+
+def guest_items(lines, category=None):
+    """Cart lines shaped like CartItemSerializer output (line id = material id)."""
+    ids = list(lines)
+    materials = Material.objects.filter(pk__in=ids).select_related("category").in_bulk()
+    prices = PriceResolver()
+    items = []
+    for pk in ids:
+        m = materials.get(pk)
+        if m is None or (category and m.category.slug != category):
+            continue  # deleted since it was added / filtered out
+        price = prices.price(m) or Decimal("0")
+        items.append({
+            "id": pk,
+            "material": pk,
+            "material_title": m.title,
+            "material_sku": m.sku,
+            "unit": m.unit,
+            "material_category": m.category.name,
+            "material_category_slug": m.category.slug,
+            "qty": lines[pk],
+            "price": price,
+            "line_total": price * lines[pk],
+        })
+    return items
+
+
+def guest_summary(items):
+    """Same shape as orders.summary.compute_summary(), from guest_items() rows."""
+    categories = {}
+    for it in items:
+        c = categories.setdefault(it["material_category_slug"], {
+            "slug": it["material_category_slug"], "name": it["material_category"],
+            "count": 0, "qty": 0, "subtotal": Decimal("0.00"),
+        })
+        c["count"] += 1
+        c["qty"] += it["qty"]
+        c["subtotal"] += it["line_total"]
+    categories = sorted(categories.values(), key=lambda c: c["name"])
+    return {
+        "count": len(items),
+        "qty": sum(it["qty"] for it in items),
+        "subtotal": sum((c["subtotal"] for c in categories), Decimal("0.00")),
+        "categories": categories,
+    }
+
+
+def merge_guest_cart(request, user):
+    """
+    Flush the request's guest cart into `user`'s CartItem rows (quantities
+    add up) through cart_bulk.bulk_upsert(), so the merge takes stock holds
+    and reports shortfalls exactly like POST /api/cart/bulk/, then drop it.
+    Returns bulk_upsert()'s result, or None when there was no guest cart.
+    """
+    cart = GuestCart.from_request(request)
+    if cart is None:
+        return None
+    lines = cart.lines()
+    result = {"updated": [], "unknown": [], "shortages": []}
+    if lines:
+        result = bulk_upsert(user, [{"material": pk, "qty": qty} for pk, qty in lines.items()], mode=ADD)
+    cart.clear()
+    return result
@@ -0,0 +1,199 @@
+# orders/invoices.py
+"""
+Invoice PDFs rendered once and kept on disk.
+
+A file is keyed by order id and a content version: a hash of what the
+invoice prints that can change (updated_at, the buyer's name and e-mail)
+plus the template's mtime, so editing invoice.html or touching the order
+makes a new file and the old one is removed when it is written:
+
+    INVOICE_DIR/<pk // 1000>/<pk>-<version>.pdf
+
+The download view checks the version with one narrow query and serves
+the file (ETag = version, so browsers revalidate with 304s); only a
+missing file is rendered. Confirming an order queues an "invoice.render"
+outbox event (orders/signals.py) so the file is usually there before the
+first download. `manage.py render_invoices` renders the HTML here and
+runs the xhtml2pdf step in a process pool; the ZIP export renders anything
+still missing inline, never forking the web worker mid-response.
+"""
+import hashlib
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .pdf import html_to_pdf
+
+TEMPLATE = "invoice.html"
+META_FIELDS = ("pk", "user_id", "updated_at", "user__username", "user__email")
+
+
+def invoice_dir():
+    return Path(getattr(settings, "INVOICE_DIR", Path(settings.BASE_DIR) / "var" / "invoices"))
+
+
+def export_workers():
+    return getattr(settings, "INVOICE_EXPORT_WORKERS", 2)
+
+
+def _template_stamp():
+    origin = get_template(TEMPLATE).origin.name
+    try:
+        return os.stat(origin).st_mtime_ns
+    except OSError:
+        return 0
+
+
+# ---- versions / paths ----
+
+def invoice_meta(pk):
+    """The version inputs of order `pk` (live or archived) in one query each; None if missing."""
+    for model in (Order, ArchivedOrder):
+        row = model.objects.filter(pk=pk).values(*META_FIELDS).first()
+        if row is not None:
+            return row
+    return None
+
+
+def meta_of(order):
+    return {
+        "pk": order.pk, "user_id": order.user_id, "updated_at": order.updated_at,
+        "user__username": order.user.username, "user__email": order.user.email,
+    }
+
+
+def invoice_version(meta):
+    raw = "|".join(str(meta[f]) for f in META_FIELDS) + f"|{_template_stamp()}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def invoice_path(meta, version=None):
+    pk = meta["pk"]
+    return invoice_dir() / f"{pk // 1000:04d}" / f"{pk}-{version or invoice_version(meta)}.pdf"
+
+
+# ---- render / store ----
+
+def render_html(order):
+    return get_template(TEMPLATE).render({"order": order})
+
+
+def store(meta, pdf_bytes, version=None):
+    """Write atomically (temp file + rename), drop older versions. Returns the path."""
+    path = invoice_path(meta, version)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(pdf_bytes)
+    os.replace(tmp, path)
+    for old in path.parent.glob(f"{meta['pk']}-*.pdf"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return path
+
+
+def ensure_invoice(order):
+    """Path of the current invoice for a loaded order (user and items), rendering it if needed."""
+    meta = meta_of(order)
+    path = invoice_path(meta)
+    if not path.exists():
+        path = store(meta, html_to_pdf(render_html(order)))
+    return path
+
+
+def ensure_invoices(orders, workers=None):
+    """
+    ensure_invoice() for a batch: yields (order, path) in order. Missing files
+    are converted in a process pool of `workers` (inline when <= 1).
+    """
+    workers = export_workers() if workers is None else workers
+    missing, paths = [], {}
+    for order in orders:
+        meta = meta_of(order)
+        path = invoice_path(meta)
+        paths[order.pk] = path
+        if not path.exists():
+            missing.append((order, meta, render_html(order)))
+    if missing:
+        htmls = [html for _, _, html in missing]
+        if workers > 1 and len(missing) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(missing))) as pool:
+                pdfs = list(pool.map(html_to_pdf, htmls))
+        else:
+            pdfs = [html_to_pdf(html) for html in htmls]
+        for (order, meta, _), pdf in zip(missing, pdfs):
+            paths[order.pk] = store(meta, pdf)
+    for order in orders:
+        yield order, paths[order.pk]
+
+
+# ---- batches ----
+
+def _with_invoice_data(model, item_model):
+    return model.objects.select_related("user").prefetch_related(
+        Prefetch("items", queryset=item_model.objects.order_by("id"))
+    )
+
+
+def orders_between(start, end):
+    """Live and archived orders created in [start, end), oldest first."""
+    found = []
+    for model, item_model in ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)):
+        found += _with_invoice_data(model, item_model).filter(created_at__gte=start, created_at__lt=end)
+    return sorted(found, key=lambda o: (o.created_at, o.pk))
+
+
+def count_between(start, end):
+    return sum(
+        model.objects.filter(created_at__gte=start, created_at__lt=end).count()
+        for model in (Order, ArchivedOrder)
+    )
+
+
+class _Chunks:
+    """Write-only, unseekable sink for ZipFile; the stream drains it."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def stream_zip(orders, batch_size=50):
+    """
+    Yield a ZIP of the orders' invoices piece by piece. Runs inside a
+    request, so missing ones are rendered inline (no process pool).
+    """
+    sink = _Chunks()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+        for start in range(0, len(orders), batch_size):
+            for order, path in ensure_invoices(orders[start:start + batch_size], workers=1):
+                zf.write(path, arcname=f"invoice_{order.pk}.pdf")
+            yield sink.drain()
+    yield sink.drain()
+
+
+def day_range(date_from, date_to):
+    """(start, end) datetimes covering whole days date_from..date_to in the current timezone."""
+    start = timezone.make_aware(datetime.combine(date_from, time.min))
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    return start, end
@@ -0,0 +1,31 @@
+# orders/management/commands/archive_orders.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.archive import archive_orders
+from products.alerts import archive_resolved_alerts
+
+
+class Command(BaseCommand):
+    help = (
+        "Move DELIVERED/CANCELLED orders older than ORDER_ARCHIVE_AFTER_DAYS and alerts "
+        "resolved more than ALERT_ARCHIVE_AFTER_DAYS ago into the archive tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--order-days", type=int, default=getattr(settings, "ORDER_ARCHIVE_AFTER_DAYS", 365))
+        parser.add_argument("--alert-days", type=int, default=getattr(settings, "ALERT_ARCHIVE_AFTER_DAYS", 90))
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--skip-alerts", action="store_true")
+
+    def handle(self, *args, **opts):
+        now = timezone.now()
+        orders = archive_orders(now - timedelta(days=opts["order_days"]), batch_size=opts["batch_size"])
+        self.stdout.write(f"Archived {orders} orders.")
+        if not opts["skip_alerts"]:
+            alerts = archive_resolved_alerts(now - timedelta(days=opts["alert_days"]), batch_size=opts["batch_size"])
+            self.stdout.write(f"Archived {alerts} resolved alerts.")
+        self.stdout.write(self.style.SUCCESS("Archive: done"))
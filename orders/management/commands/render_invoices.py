@@ -0,0 +1,30 @@
+# orders/management/commands/render_invoices.py
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from orders.invoices import day_range, ensure_invoices, export_workers, orders_between
+
+
+class Command(BaseCommand):
+    help = "Pre-render missing invoice PDFs for orders created in a date range (default: the last 7 days)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", help="YYYY-MM-DD")
+        parser.add_argument("--to", dest="date_to", help="YYYY-MM-DD (default today)")
+        parser.add_argument("--workers", type=int, default=export_workers())
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def handle(self, *args, **opts):
+        try:
+            date_to = date.fromisoformat(opts["date_to"]) if opts["date_to"] else timezone.localdate()
+            date_from = date.fromisoformat(opts["date_from"]) if opts["date_from"] else date_to - timedelta(days=7)
+        except ValueError:
+            raise CommandError("Dates must be YYYY-MM-DD.")
+        orders = orders_between(*day_range(date_from, date_to))
+        size = opts["batch_size"]
+        for start in range(0, len(orders), size):
+            for _ in ensure_invoices(orders[start:start + size], workers=opts["workers"]):
+                pass
+        self.stdout.write(self.style.SUCCESS(f"Invoices: {len(orders)} orders up to date ({date_from}..{date_to})"))
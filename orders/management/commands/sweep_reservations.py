@@ -0,0 +1,12 @@
+# orders/management/commands/sweep_reservations.py
+from django.core.management.base import BaseCommand
+
+from orders.reservations import sweep_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired cart stock reservations (run every few minutes when CART_RESERVATIONS_ENABLED)."
+
+    def handle(self, *args, **opts):
+        deleted = sweep_expired()
+        self.stdout.write(self.style.SUCCESS(f"Swept {deleted} expired reservations."))
@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.db import models
 from django.utils import timezone
+from common.tracking import TrackedFieldsMixin
 from products.models import Material
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -20,6 +21,25 @@ class CartItem(models.Model):
         return f"{self.user.username} - {self.material.sku} x {self.qty}"
 
 
+class StockReservation(models.Model):
+    """
+    Stock held for one cart line until expires_at (only when
+    CART_RESERVATIONS_ENABLED). Available stock for everyone else is
+    stock_qty minus the unexpired holds; see orders/reservations.py.
+    """
+    cart_item = models.OneToOneField(CartItem, on_delete=models.CASCADE, related_name="reservation")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name="reservations")
+    qty = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["material", "expires_at"], name="reservation_active"),
+            models.Index(fields=["expires_at"], name="reservation_expiry"),
+        ]
+    def __str__(self): return f"{self.material_id} x {self.qty} until {self.expires_at:%H:%M}"
+
 class Address(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="addresses")
     line1 = models.CharField(max_length=200)
@@ -30,7 +50,7 @@ class Address(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     def __str__(self): return f"{self.user.username} - {self.line1}, {self.city}"
 
-class Order(models.Model):
+class Order(TrackedFieldsMixin, models.Model):
     STATUS = [
         ("PLACED", "Placed"),
         ("CONFIRMED", "Confirmed"),
@@ -51,6 +71,18 @@ class Order(models.Model):
     total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS, default="cod")
     created_at = models.DateTimeField(default=timezone.now)
+    # include "updated_at" in update_fields, it is the ETag / Last-Modified source
+    updated_at = models.DateTimeField(auto_now=True)
+
+    save_changed_only = True
+
+    class Meta:
+        # order listing: newest first, per user / per status (see OrderViewSet)
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="order_user_created"),
+            models.Index(fields=["status", "-created_at", "-id"], name="order_status_created"),
+            models.Index(fields=["-created_at", "-id"], name="order_created"),
+        ]
     def __str__(self): return f"Order #{self.pk} - {self.user.username} - {self.status}"
 
 class OrderItem(models.Model):
@@ -71,4 +103,44 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Review of Order #{self.order_id} = {self.rating}"
\ No newline at end of file
+        return f"Review of Order #{self.order_id} = {self.rating}"
+
+
+# ─────────── Archive (cold storage, see orders/archive.py) ───────────
+
+class ArchivedOrder(models.Model):
+    """
+    DELIVERED / CANCELLED order moved out of Order by `manage.py archive_orders`.
+    Keeps the original id (and its items theirs), so old links, invoices and
+    StockMovement.order_id still resolve.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_orders")
+    address = models.TextField()
+    status = models.CharField(max_length=20, choices=Order.STATUS)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    tax = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    delivery_charges = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payment_method = models.CharField(max_length=20, choices=Order.PAYMENT_METHODS, default="cod")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    # the order's Review, if any: {"rating", "comment", "created_at"}
+    review = models.JSONField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["created_at"], name="archived_order_created")]
+    def __str__(self): return f"Archived order #{self.pk} - {self.status}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name="items")
+    material = models.ForeignKey(Material, on_delete=models.PROTECT, related_name="archived_order_items")
+    title = models.CharField(max_length=160)
+    sku = models.CharField(max_length=64)
+    unit = models.CharField(max_length=10)
+    qty = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    line_total = models.DecimalField(max_digits=12, decimal_places=2)
+    def __str__(self): return f"{self.order_id} - {self.sku} x {self.qty}"
@@ -0,0 +1,15 @@
+# orders/pdf.py
+"""
+HTML -> PDF through xhtml2pdf, kept free of Django imports so it can run
+in ProcessPoolExecutor workers (orders/invoices.py renders the HTML in the
+parent and ships only the string).
+"""
+from io import BytesIO
+
+from xhtml2pdf import pisa
+
+
+def html_to_pdf(html):
+    result = BytesIO()
+    pisa.CreatePDF(src=html, dest=result)  # returns pisaStatus, but result has PDF bytes
+    return result.getvalue()
@@ -0,0 +1,108 @@
+# orders/reservations.py
+"""
+Optional cart stock reservations (settings.CART_RESERVATIONS_ENABLED).
+
+Adding to / changing a cart line holds its qty for CART_RESERVATION_TTL
+seconds, so shortages surface when the item goes into the cart instead of
+at checkout. Available stock for a user is stock_qty minus everyone else's
+unexpired holds: one SUM over the (material, expires_at) index, computed
+for a whole cart in a single query. Expired holds are simply ignored by the
+aggregate and deleted in bulk by `manage.py sweep_reservations`.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from products.models import Material
+from .models import CartItem, StockReservation
+
+
+class InsufficientStock(Exception):
+    def __init__(self, available):
+        super().__init__(f"only {available} available")
+        self.available = available
+
+
+def reservations_enabled():
+    return getattr(settings, "CART_RESERVATIONS_ENABLED", False)
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, "CART_RESERVATION_TTL", 900))
+
+
+def held_by_others(user, now=None, ref="pk"):
+    """Subquery: unexpired qty reserved for material OuterRef(ref) by anyone but `user`."""
+    now = now or timezone.now()
+    held = (
+        StockReservation.objects.filter(material=OuterRef(ref), expires_at__gt=now)
+        .exclude(user=user)
+        .order_by().values("material").annotate(total=Sum("qty")).values("total")[:1]
+    )
+    return Coalesce(Subquery(held, output_field=IntegerField()), Value(0))
+
+
+def reserve(item, now=None):
+    """
+    Hold item.qty of its material for the item's user (refreshing the expiry).
+    Raises InsufficientStock when other carts' holds leave too little.
+    Call inside a transaction: the material row is locked while checking.
+    """
+    now = now or timezone.now()
+    available = (
+        Material.objects.select_for_update()
+        .filter(pk=item.material_id)
+        .annotate(available=F("stock_qty") - held_by_others(item.user_id, now))
+        .values_list("available", flat=True)
+        .first()
+    )
+    if available is None or item.qty > available:
+        raise InsufficientStock(max(available or 0, 0))
+    StockReservation.objects.update_or_create(
+        cart_item=item,
+        defaults={
+            "user_id": item.user_id,
+            "material_id": item.material_id,
+            "qty": item.qty,
+            "expires_at": now + reservation_ttl(),
+        },
+    )
+
+
+def cart_availability(user, item_ids=None, now=None):
+    """
+    One query for the whole cart: each line with the stock left for this
+    user (stock_qty minus other users' active holds) and its own hold expiry.
+    """
+    now = now or timezone.now()
+    qs = CartItem.objects.filter(user=user)
+    if item_ids:
+        qs = qs.filter(pk__in=item_ids)
+    rows = (
+        qs.annotate(
+            available=F("material__stock_qty") - held_by_others(user, now, ref="material_id"),
+            reserved_until=F("reservation__expires_at"),
+        )
+        .order_by("id")
+        .values("id", "material_id", "material__sku", "qty", "available", "reserved_until")
+    )
+    return [
+        {
+            "id": r["id"],
+            "material": r["material_id"],
+            "sku": r["material__sku"],
+            "qty": r["qty"],
+            "available": max(r["available"], 0),
+            "ok": r["qty"] <= r["available"],
+            "reserved_until": r["reserved_until"] if r["reserved_until"] and r["reserved_until"] > now else None,
+        }
+        for r in rows
+    ]
+
+
+def sweep_expired(now=None):
+    """Delete expired holds in one statement. Returns rows deleted."""
+    return StockReservation.objects.filter(expires_at__lte=now or timezone.now()).delete()[0]
@@ -2,7 +2,11 @@
 
 # orders/serializers.py
 
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
+
+from products.pricing import resolver_from_context
 from .models import Order, OrderItem, CartItem, Address, Review
 
 
@@ -33,20 +37,11 @@ class CartItemSerializer(serializers.ModelSerializer):
         ]
 
     def get_price(self, obj):
-        # Determine effective price based on serializer context role
-        role = self.context.get("role")
-        # material.prices is a related name to PriceTier
-        prices = {p.type: p.price for p in obj.material.prices.all()}
-        desired = "WHOLESALE" if (role or "").upper() in ("WHOLESALER", "ADMIN") else "RETAIL"
-        price = prices.get(desired) or prices.get("RETAIL") or prices.get("WHOLESALE")
-        return price or 0
+        # role-based price, resolved once per material per request
+        return resolver_from_context(self.context).price(obj.material) or 0
 
     def get_line_total(self, obj):
-        try:
-            p = self.get_price(obj)
-            return p * obj.qty
-        except Exception:
-            return 0
+        return self.get_price(obj) * obj.qty
 
 
 class CartSerializer(serializers.Serializer):
@@ -61,6 +56,18 @@ class CartSerializer(serializers.Serializer):
     total = serializers.DecimalField(max_digits=12, decimal_places=2)
 
 
+class CartBulkLineSerializer(serializers.Serializer):
+    """One entry of POST /api/cart/bulk/: a material id or SKU and a qty."""
+    material = serializers.IntegerField(required=False)
+    sku = serializers.CharField(required=False, max_length=64)
+    qty = serializers.IntegerField(min_value=1)
+
+    def validate(self, attrs):
+        if ("material" in attrs) == ("sku" in attrs):
+            raise serializers.ValidationError("Give exactly one of material or sku.")
+        return attrs
+
+
 # ─────────── ADDRESS / CHECKOUT ───────────
 
 class AddressSerializer(serializers.ModelSerializer):
@@ -123,9 +130,26 @@ class OrderSerializer(serializers.ModelSerializer):
 
 # ─────────── ORDER LIST (MyOrders / Admin Orders) ───────────
 
+def with_list_annotations(qs):
+    """
+    Order queryset -> what OrderListSerializer reads: the username and the
+    item count as annotations. The count is a correlated subquery, so it is
+    only evaluated for the rows of the page, not grouped over the whole table.
+    """
+    items = (
+        OrderItem.objects.filter(order=OuterRef("pk"))
+        .order_by().values("order").annotate(n=Count("id")).values("n")[:1]
+    )
+    return qs.annotate(
+        user_username=F("user__username"),
+        item_count=Coalesce(Subquery(items, output_field=IntegerField()), Value(0)),
+    )
+
+
 class OrderListSerializer(serializers.ModelSerializer):
-    user_username = serializers.ReadOnlyField(source="user.username", default=None)
-    items_count = serializers.SerializerMethodField()
+    """Reads annotations only: pass a queryset through with_list_annotations()."""
+    user_username = serializers.CharField(read_only=True)
+    items_count = serializers.IntegerField(source="item_count", read_only=True)
 
     class Meta:
         model = Order
@@ -143,9 +167,6 @@ class OrderListSerializer(serializers.ModelSerializer):
             "items_count",
         ]
 
-    def get_items_count(self, obj):
-        return obj.items.count()
-
 
 # ─────────── REVIEW (Order review) ───────────
 
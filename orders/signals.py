@@ -1,33 +1,70 @@
 # orders/signals.py
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.core.mail import send_mail
-from .models import Order
-
-@receiver(pre_save, sender=Order)
-def remember_old_status(sender, instance: Order, **kwargs):
-    if instance.pk:
-        try:
-            old = Order.objects.get(pk=instance.pk)
-            instance._old_status = old.status
-        except Order.DoesNotExist:
-            instance._old_status = None
-    else:
-        instance._old_status = None
+
+from core.outbox import enqueue, outbox_handler
+from .archive import find_order
+from .invoices import ensure_invoice
+from .models import CartItem, Order
+from .summary import bump_cart_version
+
+ORDER_STATUS_CHANGED = "order.status_changed"
+INVOICE_RENDER = "invoice.render"
 
 @receiver(post_save, sender=Order)
-def notify_status_change(sender, instance: Order, created, **kwargs):
-    # Only notify on status change (not on creation)
-    if created:
+def notify_status_change(sender, instance: Order, created, update_fields=None, **kwargs):
+    # Only notify on status change (not on creation). The e-mail itself is
+    # sent by `manage.py run_outbox`, never inside the request. The old status
+    # comes from the values the order was loaded with (TrackedFieldsMixin).
+    if created or (update_fields is not None and "status" not in update_fields):
         return
-    old = getattr(instance, "_old_status", None)
+    old = instance.loaded_value("status")
     if old and old != instance.status:
-        subject = f"Your Order #{instance.pk} is now {instance.status}"
-        body = (
-            f"Hello,\n\n"
-            f"Order #{instance.pk} status changed from {old} -> {instance.status}.\n"
-            f"Total: Rs {instance.total}\n"
-            f"Thanks!"
-        )
-        # Console backend prints this to terminal
-        send_mail(subject, body, None, [instance.user.email or "demo@example.com"], fail_silently=True)
+        for topic, payload in status_change_events(
+            instance.pk, old, instance.status, instance.total, instance.user.email,
+        ):
+            enqueue(topic, payload)
+
+
+def status_change_events(order_id, old, new, total, email):
+    """Outbox (topic, payload) pairs for one status change; also used by bulk transitions."""
+    events = [(ORDER_STATUS_CHANGED, {
+        "order_id": order_id,
+        "old": old,
+        "new": new,
+        "total": str(total),
+        "email": email or "demo@example.com",
+    })]
+    if new == "CONFIRMED":
+        # have the invoice PDF on disk before the first download
+        events.append((INVOICE_RENDER, {"order_id": order_id}))
+    return events
+
+
+@outbox_handler(ORDER_STATUS_CHANGED)
+def send_status_email(payload, mail=None):
+    subject = f"Your Order #{payload['order_id']} is now {payload['new']}"
+    body = (
+        f"Hello,\n\n"
+        f"Order #{payload['order_id']} status changed from {payload['old']} -> {payload['new']}.\n"
+        f"Total: Rs {payload['total']}\n"
+        f"Thanks!"
+    )
+    # Console backend prints this to terminal; errors propagate so the outbox retries
+    send_mail(subject, body, None, [payload["email"]], connection=mail)
+
+
+@outbox_handler(INVOICE_RENDER)
+def render_invoice(payload, mail=None):
+    order = find_order(payload["order_id"])
+    if order is not None:  # gone since it was confirmed: nothing to render
+        ensure_invoice(order)
+
+
+# ---- Cart summary cache ----
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def invalidate_cart_summary(sender, instance: CartItem, **kwargs):
+    bump_cart_version(instance.user_id)
@@ -0,0 +1,85 @@
+# orders/summary.py
+"""
+Cart totals from one aggregate query, cached per user.
+
+    {"count": lines, "qty": units, "subtotal": ..., "categories": [{slug, name, count, qty, subtotal}]}
+
+Line prices use the PriceResolver rule expressed in SQL over Material's
+price columns (products.pricing.price_expression), grouped by category.
+Cache keys carry the user's cart version, bumped by CartItem saves/deletes
+(orders/signals.py) or bump_cart_version() on bulk writes, and the catalog
+version, bumped by every price change, so entries are never deleted by hand.
+"""
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from products.cache_version import catalog_version
+from products.pricing import preferred_tier, price_expression
+from .models import CartItem
+
+CART_VERSION_KEY = "cart:version:{}"
+SUMMARY_KEY = "cart:summary:{}:{}:{}:{}:{}"
+ZERO = Decimal("0.00")
+
+
+def cart_version(user_id):
+    key = CART_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(user_ids):
+    for user_id in user_ids:
+        key = CART_VERSION_KEY.format(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time() * 1000), None)
+
+
+def bump_cart_version(*user_ids):
+    """Invalidate the users' cached cart summaries once the transaction commits."""
+    transaction.on_commit(lambda: _bump(user_ids))
+
+
+def compute_summary(user, role=None, category=None):
+    price = Coalesce(price_expression(role, "material__"), Value(ZERO))
+    qs = CartItem.objects.filter(user=user)
+    if category:
+        qs = qs.filter(material__category__slug=category)
+    line_total = ExpressionWrapper(F("qty") * price, output_field=DecimalField(max_digits=14, decimal_places=2))
+    rows = (
+        qs.values(slug=F("material__category__slug"), name=F("material__category__name"))
+        .annotate(lines=Count("id"), units=Sum("qty"), total=Sum(line_total))
+        .order_by("name")
+    )
+    categories = [
+        {"slug": r["slug"], "name": r["name"], "count": r["lines"], "qty": r["units"], "subtotal": r["total"] or ZERO}
+        for r in rows
+    ]
+    return {
+        "count": sum(c["count"] for c in categories),
+        "qty": sum(c["qty"] for c in categories),
+        "subtotal": sum((c["subtotal"] for c in categories), ZERO),
+        "categories": categories,
+    }
+
+
+def cart_summary(user, role=None, category=None):
+    key = SUMMARY_KEY.format(
+        user.pk, cart_version(user.pk), catalog_version(), preferred_tier(role), category or "",
+    )
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute_summary(user, role, category)
+        cache.set(key, summary, getattr(settings, "CART_SUMMARY_CACHE_TIMEOUT", 300))
+    return summary
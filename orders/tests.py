@@ -1,3 +1,920 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from core.idempotency import idempotent
+from bids.models import BulkRequest
+from core.models import IdempotencyKey, OutboxEvent
+from core.outbox import HANDLERS, drain, enqueue
+from products.models import Category, Material, PriceTier, StockMovement
+from users.models import User
+from . import invoices
+from .cart_store import GuestCart
+from .models import ArchivedOrder, CartItem, Order, OrderItem, StockReservation
+from .reservations import cart_availability
+from .signals import INVOICE_RENDER, ORDER_STATUS_CHANGED
+from .transitions import NOT_ALLOWED, NOT_FOUND, STATUS_TRANSITIONS, UNCHANGED, bulk_set_status
+from .views import ALLOWED_STATUSES
+
+ADDRESS = {"address": {"line1": "12 Mall Road", "city": "Lahore", "phone": "0300"}}
+
+
+class CheckoutQueryBudgetTest(TestCase):
+    """Checkout must cost the same number of queries for 1 line or 50."""
+
+    # cart, address, order, items, stock UPDATE, ledger, cart delete (3),
+    # order re-read (2) + savepoint/release
+    BUDGET = 13
+
+    def setUp(self):
+        cache.clear()  # throttling history lives in the cache
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.materials = [
+            Material.objects.create(title=f"Item {i}", sku=f"SKU-{i}", category=category, stock_qty=100)
+            for i in range(50)
+        ]
+        for m in self.materials:
+            PriceTier.objects.create(material=m, type=PriceTier.RETAIL, price=Decimal("10.00"))
+        self.user = User.objects.create_user("buyer", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def checkout_queries(self, lines):
+        CartItem.objects.bulk_create([CartItem(user=self.user, material=m, qty=2) for m in self.materials[:lines]])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/api/orders/checkout/", ADDRESS, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_is_constant(self):
+        small, _ = self.checkout_queries(1)
+        large, response = self.checkout_queries(50)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, self.BUDGET)
+
+        self.assertEqual(response.data["total"], "1000.00")
+        self.assertEqual(OrderItem.objects.filter(order_id=response.data["id"]).count(), 50)
+        self.assertEqual(Material.objects.get(pk=self.materials[0].pk).stock_qty, 96)
+        self.assertEqual(StockMovement.objects.filter(order_id=response.data["id"]).count(), 50)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_insufficient_stock_rolls_back(self):
+        CartItem.objects.create(user=self.user, material=self.materials[0], qty=2)
+        CartItem.objects.create(user=self.user, material=self.materials[1], qty=101)
+        response = self.client.post("/api/orders/checkout/", ADDRESS, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["items"], [{"sku": "SKU-1", "available": 100, "requested": 101}])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Material.objects.get(pk=self.materials[0].pk).stock_qty, 100)
+        self.assertEqual(CartItem.objects.count(), 2)
+
+
+class BulkCartUpsertTest(TestCase):
+    """POST /api/cart/bulk/: whole purchase lists in a fixed number of queries."""
+
+    # resolve, existing qty, upsert, savepoint/release, cart read, summary
+    BUDGET = 7
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.materials = [
+            Material.objects.create(title=f"Item {i}", sku=f"SKU-{i}", category=category, stock_qty=20)
+            for i in range(60)
+        ]
+        for m in self.materials:
+            PriceTier.objects.create(material=m, type=PriceTier.RETAIL, price=Decimal("10.00"))
+        self.user = User.objects.create_user("buyer", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def bulk(self, items, **extra):
+        return self.client.post("/api/cart/bulk/", {"items": items, **extra}, format="json")
+
+    def qty(self, material):
+        return CartItem.objects.get(user=self.user, material=material).qty
+
+    def test_query_count_is_constant(self):
+        counts = []
+        for lines in (self.materials[:1], self.materials[1:60]):
+            # run the cart-version bump, so each call recomputes the summary as in production
+            with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as ctx:
+                response = self.bulk([{"sku": m.sku, "qty": 1} for m in lines])
+            self.assertEqual(response.status_code, 200, response.data)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[1], self.BUDGET, counts)
+        self.assertEqual(len(response.data["items"]), 60)
+        self.assertEqual(response.data["summary"]["count"], 60)
+
+    def test_add_and_set_modes(self):
+        m = self.materials[0]
+        CartItem.objects.create(user=self.user, material=m, qty=3)
+        self.bulk([{"material": m.pk, "qty": 2}])
+        self.assertEqual(self.qty(m), 5)
+        self.bulk([{"material": m.pk, "qty": 2}], mode="set")
+        self.assertEqual(self.qty(m), 2)
+        self.assertEqual(self.bulk([{"material": m.pk, "qty": 2}], mode="replace").status_code, 400)
+
+    def test_sku_and_id_entries_for_one_material_are_summed(self):
+        m = self.materials[0]
+        response = self.bulk([{"sku": m.sku, "qty": 2}, {"material": m.pk, "qty": 3}, {"sku": m.sku, "qty": 1}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.qty(m), 6)
+        self.assertEqual(len(response.data["items"]), 1)
+
+    def test_unknown_materials_are_reported_not_fatal(self):
+        response = self.bulk([{"sku": "NOPE", "qty": 1}, {"material": 999999, "qty": 1}, {"sku": "SKU-1", "qty": 1}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["unknown"], ["999999", "NOPE"])
+        self.assertEqual(self.qty(self.materials[1]), 1)
+
+    def test_shortage_is_informational_without_reservations(self):
+        response = self.bulk([{"sku": "SKU-2", "qty": 25}])
+        self.assertEqual(response.data["shortages"], [
+            {"material": self.materials[2].pk, "sku": "SKU-2", "qty": 25, "available": 20},
+        ])
+        self.assertEqual(self.qty(self.materials[2]), 25)
+
+    def test_shortage_skips_line_under_reservations(self):
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("other", password="x"))
+        with self.settings(CART_RESERVATIONS_ENABLED=True):
+            self.assertEqual(other.post("/api/cart/", {"material": self.materials[3].pk, "qty": 15}, format="json").status_code, 201)
+            response = self.bulk([{"sku": "SKU-3", "qty": 10}, {"sku": "SKU-4", "qty": 10}])
+        self.assertEqual(response.data["shortages"], [
+            {"material": self.materials[3].pk, "sku": "SKU-3", "qty": 10, "available": 5},
+        ])
+        self.assertFalse(CartItem.objects.filter(user=self.user, material=self.materials[3]).exists())
+        self.assertEqual(StockReservation.objects.get(user=self.user).material_id, self.materials[4].pk)
+        self.assertEqual(StockReservation.objects.get(user=self.user).qty, 10)
+
+    def test_invalid_entries_reject_the_batch(self):
+        self.assertEqual(self.bulk([]).status_code, 400)
+        self.assertEqual(self.bulk([{"sku": "SKU-1", "material": self.materials[1].pk, "qty": 1}]).status_code, 400)
+        self.assertEqual(self.bulk([{"sku": "SKU-1", "qty": 0}]).status_code, 400)
+        self.assertFalse(CartItem.objects.exists())
+
+
+class BulkStatusTransitionTest(TestCase):
+    """POST /api/orders/status_bulk/ and orders.transitions.bulk_set_status()."""
+
+    def setUp(self):
+        cache.clear()
+        self.buyer = User.objects.create_user("buyer", password="x", email="buyer@example.com")
+        self.admin = User.objects.create_user("boss", password="x", role="ADMIN")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def make(self, status, n=1):
+        return [Order.objects.create(user=self.buyer, address="x", status=status, total=Decimal("50.00")).pk for _ in range(n)]
+
+    def bulk(self, body):
+        return self.client.post("/api/orders/status_bulk/", body, format="json")
+
+    def test_allowed_and_disallowed_transitions(self):
+        for source, targets in STATUS_TRANSITIONS.items():
+            for target in ALLOWED_STATUSES - {source}:
+                pk = self.make(source)[0]
+                response = self.bulk({"ids": [pk], "status": target})
+                self.assertEqual(response.status_code, 200, response.data)
+                if target in targets:
+                    self.assertEqual(response.data["updated"], {target: [pk]})
+                    self.assertEqual(Order.objects.get(pk=pk).status, target)
+                else:
+                    self.assertEqual(response.data["skipped"], [
+                        {"id": pk, "reason": NOT_ALLOWED, "from": source, "to": target},
+                    ])
+                    self.assertEqual(Order.objects.get(pk=pk).status, source)
+
+    def test_not_found_and_unchanged_are_skipped(self):
+        confirmed = self.make("CONFIRMED")[0]
+        dispatched = self.make("DISPATCHED")[0]
+        response = self.bulk({"ids": [confirmed, dispatched, 999999], "status": "DISPATCHED"})
+        self.assertEqual(response.data["updated"], {"DISPATCHED": [confirmed]})
+        self.assertEqual(response.data["skipped"], [
+            {"id": dispatched, "reason": UNCHANGED, "status": "DISPATCHED"},
+            {"id": 999999, "reason": NOT_FOUND},
+        ])
+
+    def test_one_update_per_target_status(self):
+        confirmed = self.make("CONFIRMED", 40)
+        placed = self.make("PLACED", 40)
+        changes = [{"id": pk, "status": "DISPATCHED"} for pk in confirmed]
+        changes += [{"id": pk, "status": "CANCELLED"} for pk in placed]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.bulk({"changes": changes})
+        self.assertEqual(sorted(response.data["updated"]["DISPATCHED"]), confirmed)
+        self.assertEqual(sorted(response.data["updated"]["CANCELLED"]), placed)
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "orders_order"')]
+        self.assertEqual(len(updates), 2)
+        inserts = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('INSERT INTO "core_outboxevent"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_updated_at_moves_and_events_are_queued(self):
+        pk = self.make("PLACED")[0]
+        before = Order.objects.get(pk=pk).updated_at
+        updated, skipped = bulk_set_status({pk: "CONFIRMED"})
+        self.assertEqual((updated, skipped), ({"CONFIRMED": [pk]}, []))
+        self.assertGreater(Order.objects.get(pk=pk).updated_at, before)
+
+        events = {e.topic: e.payload for e in OutboxEvent.objects.all()}
+        self.assertEqual(events[ORDER_STATUS_CHANGED], {
+            "order_id": pk, "old": "PLACED", "new": "CONFIRMED", "total": "50.00", "email": "buyer@example.com",
+        })
+        self.assertEqual(events[INVOICE_RENDER], {"order_id": pk})
+
+    def test_single_order_endpoint_uses_the_same_rules(self):
+        delivered = self.make("DELIVERED")[0]
+        response = self.client.patch(f"/api/orders/{delivered}/status/", {"status": "PLACED"}, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((response.data["from"], response.data["to"]), ("DELIVERED", "PLACED"))
+        self.assertEqual(Order.objects.get(pk=delivered).status, "DELIVERED")
+
+        placed = self.make("PLACED")[0]
+        response = self.client.patch(f"/api/orders/{placed}/status/", {"status": "confirmed"}, format="json")
+        self.assertEqual(response.data, {"id": placed, "status": "CONFIRMED"})
+        response = self.client.patch(f"/api/orders/{placed}/status/", {"status": "CONFIRMED"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        # one status change, one notification (plus the invoice render)
+        self.assertEqual(OutboxEvent.objects.filter(topic=ORDER_STATUS_CHANGED).count(), 1)
+
+    def test_admin_only_and_validation(self):
+        pk = self.make("PLACED")[0]
+        buyer = APIClient()
+        buyer.force_authenticate(self.buyer)
+        self.assertEqual(buyer.post("/api/orders/status_bulk/", {"ids": [pk], "status": "CONFIRMED"}, format="json").status_code, 403)
+        self.assertEqual(self.bulk({"ids": [pk], "status": "SHIPPED"}).status_code, 400)
+        self.assertEqual(self.bulk({"changes": [{"id": pk, "status": "CONFIRMED"}, {"id": pk, "status": "CANCELLED"}]}).status_code, 400)
+        self.assertEqual(Order.objects.get(pk=pk).status, "PLACED")
+        self.assertFalse(OutboxEvent.objects.exists())
+
+
+class OutboxDrainTest(TestCase):
+    """core.outbox.drain(): dispatch by topic, retries with backoff, unknown topics."""
+
+    def setUp(self):
+        self.payload = {"order_id": 1, "old": "PLACED", "new": "DISPATCHED", "total": "50.00", "email": "buyer@example.com"}
+
+    def test_dispatches_to_the_topic_handler_with_one_connection(self):
+        handler = mock.Mock()
+        enqueue(ORDER_STATUS_CHANGED, self.payload)
+        enqueue("test.topic", {"n": 1})
+        with mock.patch.dict(HANDLERS, {"test.topic": handler}), \
+                mock.patch("django.core.mail.backends.locmem.EmailBackend.open") as open_connection:
+            self.assertEqual(drain(), (2, 0))
+        self.assertEqual(open_connection.call_count, 1)
+        self.assertEqual(handler.call_args.args, ({"n": 1},))
+        self.assertIn("mail", handler.call_args.kwargs)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["buyer@example.com"])
+        self.assertEqual(set(OutboxEvent.objects.values_list("status", flat=True)), {OutboxEvent.SENT})
+        self.assertEqual(drain(), (0, 0))
+
+    def test_failed_handler_is_retried_then_marked_failed(self):
+        event = enqueue(ORDER_STATUS_CHANGED, self.payload)
+        with self.settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_BASE=30), \
+                mock.patch("orders.signals.send_mail", side_effect=OSError("smtp down")):
+            self.assertEqual(drain(), (0, 1))
+            event.refresh_from_db()
+            self.assertEqual((event.status, event.attempts), (OutboxEvent.PENDING, 1))
+            self.assertGreater(event.available_at, timezone.now() + timedelta(seconds=20))
+            self.assertEqual(drain(), (0, 0))  # not due yet
+            self.assertEqual(drain(now=timezone.now() + timedelta(minutes=1)), (0, 1))
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), (OutboxEvent.FAILED, 2))
+        self.assertEqual(event.last_error, "OSError: smtp down")
+        self.assertEqual(mail.outbox, [])
+
+    def test_unknown_topic_fails_without_retry(self):
+        event = enqueue("no.such.topic", {})
+        self.assertEqual(drain(), (0, 1))
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), (OutboxEvent.FAILED, 1))
+        self.assertIn("no outbox handler", event.last_error)
+
+
+@api_view(["POST"])
+@idempotent
+def created_view(request):
+    response = Response({"id": 7}, status=201)
+    response["Location"] = "/api/things/7/"
+    response["ETag"] = '"v1"'
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+@api_view(["POST"])
+@idempotent
+def unavailable_view(request):
+    return Response({"detail": "try later"}, status=503)
+
+
+class IdempotencyKeyTest(TestCase):
+    """core.idempotency.idempotent, on checkout and on a bare view."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.material = Material.objects.create(title="Bag", sku="BAG", category=category, stock_qty=10)
+        PriceTier.objects.create(material=self.material, type=PriceTier.RETAIL, price=Decimal("100.00"))
+        self.user = User.objects.create_user("buyer", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        CartItem.objects.create(user=self.user, material=self.material, qty=3)
+
+    def test_first_call_and_replay_keep_view_headers(self):
+        factory = APIRequestFactory()
+        responses = []
+        for _ in range(2):
+            request = factory.post("/api/things/", {"a": 1}, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+            force_authenticate(request, self.user)
+            responses.append(created_view(request))
+        first, replay = responses
+        for response in responses:
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response["Location"], "/api/things/7/")
+            self.assertEqual(response["ETag"], '"v1"')
+            self.assertEqual(response["Cache-Control"], "no-store")
+        self.assertEqual(first.content, replay.content)
+        self.assertNotIn("Idempotent-Replayed", first)
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+
+    def checkout(self, key, body=ADDRESS):
+        return self.client.post("/api/orders/checkout/", body, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def claim(self, fingerprint, locked_at):
+        return IdempotencyKey.objects.create(
+            user=self.user, key="k1", fingerprint=fingerprint, locked_at=locked_at,
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+    def test_replay_returns_first_response_without_a_second_order(self):
+        first = self.checkout("k1")
+        replay = self.checkout("k1")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(first.content, replay.content)
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Material.objects.get().stock_qty, 7)
+
+    def test_same_key_with_another_body_is_422(self):
+        self.checkout("k1")
+        other = {"address": {**ADDRESS["address"], "line1": "14 Mall Road"}}
+        response = self.checkout("k1", other)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_no_header_is_not_recorded(self):
+        response = self.client.post("/api/orders/checkout/", ADDRESS, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_exception_releases_the_key(self):
+        self.client.raise_request_exception = False
+        with mock.patch("orders.views.decrement_stock", side_effect=RuntimeError):
+            self.assertEqual(self.checkout("k1").status_code, 500)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.checkout("k1").status_code, 201)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_server_error_releases_the_key(self):
+        request = APIRequestFactory().post("/api/things/", {}, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+        force_authenticate(request, self.user)
+        self.assertEqual(unavailable_view(request).status_code, 503)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_in_flight_duplicate_gets_409_with_retry_after(self):
+        self.claim("in-flight", timezone.now())
+        with self.settings(IDEMPOTENCY_WAIT=0.2), mock.patch("core.idempotency.fingerprint", return_value="in-flight"):
+            response = self.checkout("k1")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertFalse(Order.objects.exists())
+
+    def test_stale_claim_is_taken_over(self):
+        self.claim("in-flight", timezone.now() - timedelta(minutes=5))
+        with self.settings(IDEMPOTENCY_LOCK_TIMEOUT=60):
+            response = self.checkout("k1")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.count(), 1)
+        record = IdempotencyKey.objects.get()
+        self.assertEqual(record.status_code, 201)
+        self.assertNotEqual(record.fingerprint, "in-flight")
+
+
+class TrackedFieldsTest(TestCase):
+    """common.tracking.TrackedFieldsMixin on Order (changed-only saves) and BulkRequest (full saves)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("buyer", password="x")
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.material = Material.objects.create(title="Bag", sku="BAG", category=category, stock_qty=10)
+        self.order = Order.objects.create(user=self.user, address="x", total=Decimal("10.00"))
+
+    def test_changed_fields_and_loaded_value(self):
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual(order.changed_fields(), set())
+        order.status = "CONFIRMED"
+        self.assertEqual(order.changed_fields(), {"status"})
+        self.assertEqual(order.loaded_value("status"), "PLACED")
+
+        order.save()
+        self.assertEqual(order.loaded_value("status"), "CONFIRMED")
+        self.assertEqual(order.changed_fields(), set())
+
+        Order.objects.filter(pk=order.pk).update(status="DISPATCHED")
+        order.refresh_from_db()
+        self.assertEqual(order.loaded_value("status"), "DISPATCHED")
+        self.assertEqual(order.changed_fields(), set())
+
+    def test_opted_in_save_writes_only_changed_columns(self):
+        order = Order.objects.get(pk=self.order.pk)
+        Order.objects.filter(pk=order.pk).update(address="changed elsewhere")
+        order.status = "CONFIRMED"
+        with CaptureQueriesContext(connection) as ctx:
+            order.save()
+        update = next(q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE"))
+        self.assertIn('"status"', update)
+        self.assertIn('"updated_at"', update)
+        self.assertNotIn('"address"', update)
+        self.assertEqual(Order.objects.values_list("status", "address").get(), ("CONFIRMED", "changed elsewhere"))
+
+    def test_default_save_writes_every_column_and_sends_signals(self):
+        self.assertFalse(BulkRequest.save_changed_only)
+        request = BulkRequest.objects.create(user=self.user, material=self.material, qty=5)
+        request = BulkRequest.objects.get(pk=request.pk)
+        seen = []
+
+        def receiver(sender, update_fields=None, **kwargs):
+            seen.append(update_fields)
+
+        post_save.connect(receiver, sender=BulkRequest)
+        self.addCleanup(post_save.disconnect, receiver, sender=BulkRequest)
+        with CaptureQueriesContext(connection) as ctx:
+            request.save()  # nothing changed, no auto_now field
+        self.assertEqual(seen, [None])
+        update = next(q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE"))
+        self.assertIn('"qty"', update)
+        self.assertIn('"status"', update)
+
+
+@override_settings(CART_RESERVATIONS_ENABLED=True)
+class StockReservationTest(TestCase):
+    """Cart holds (orders.reservations): other users' active holds count as taken."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.material = Material.objects.create(title="Bag", sku="BAG", category=category, stock_qty=10)
+        PriceTier.objects.create(material=self.material, type=PriceTier.RETAIL, price=Decimal("10.00"))
+        self.alice, self.bob = (User.objects.create_user(name, password="x") for name in ("alice", "bob"))
+        self.clients = {}
+        for user in (self.alice, self.bob):
+            self.clients[user] = APIClient()
+            self.clients[user].force_authenticate(user)
+
+    def add(self, user, qty):
+        return self.clients[user].post("/api/cart/", {"material": self.material.pk, "qty": qty}, format="json")
+
+    def test_active_hold_reduces_availability_for_others(self):
+        self.assertEqual(self.add(self.alice, 6).status_code, 201)
+        self.assertEqual(StockReservation.objects.get(user=self.alice).qty, 6)
+
+        response = self.add(self.bob, 5)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["available"], 4)
+        self.assertFalse(CartItem.objects.filter(user=self.bob).exists())
+
+        self.assertEqual(self.add(self.bob, 4).status_code, 201)
+        # a user's own hold never counts against them
+        self.assertEqual([line["available"] for line in cart_availability(self.alice)], [6])
+        self.assertEqual([line["available"] for line in cart_availability(self.bob)], [4])
+
+    def test_expired_hold_is_ignored(self):
+        self.add(self.alice, 6)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.add(self.bob, 10).status_code, 201)
+        self.assertEqual(cart_availability(self.bob)[0]["available"], 10)
+
+    def test_checkout_releases_the_buyers_holds(self):
+        self.add(self.alice, 6)
+        self.add(self.bob, 4)
+        response = self.clients[self.alice].post("/api/orders/checkout/", ADDRESS, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(list(StockReservation.objects.values_list("user__username", "qty")), [("bob", 4)])
+        self.assertEqual(Material.objects.get().stock_qty, 4)
+        self.assertEqual(cart_availability(self.bob)[0]["available"], 4)
+
+
+@override_settings(CART_RESERVATIONS_ENABLED=True)
+class GuestCartMergeTest(TestCase):
+    """Anonymous carts (orders.cart_store) merged into CartItem rows on login."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.bag = Material.objects.create(title="Bag", sku="BAG", category=category, stock_qty=10)
+        self.rod = Material.objects.create(title="Rod", sku="ROD", category=category, stock_qty=3)
+        self.user = User.objects.create_user("buyer", password="pw12345")
+        CartItem.objects.create(user=self.user, material=self.bag, qty=1)
+        # another shopper already holds 2 of the 3 rods
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("other", password="x"))
+        other.post("/api/cart/", {"material": self.rod.pk, "qty": 2}, format="json")
+
+    def test_login_merges_the_guest_cart_takes_holds_and_consumes_the_token(self):
+        guest = APIClient()
+        response = guest.post("/api/cart/", {"material": self.bag.pk, "qty": 4}, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        token = response.data["cart_token"]
+        guest.credentials(HTTP_X_CART_TOKEN=token)
+        guest.post("/api/cart/", {"material": self.rod.pk, "qty": 2}, format="json")
+        # guests never write CartItem rows
+        self.assertFalse(CartItem.objects.filter(material=self.rod, user=self.user).exists())
+
+        response = guest.post("/api/auth/login/", {"username": "buyer", "password": "pw12345"}, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertIn("access", response.data)
+        self.assertEqual(
+            [(s["material"], s["available"]) for s in response.data["cart_shortages"]], [(self.rod.pk, 1)],
+        )
+
+        # quantities add to the existing line; the short line is left out
+        self.assertEqual(
+            list(CartItem.objects.filter(user=self.user).values_list("material__sku", "qty")), [("BAG", 5)],
+        )
+        self.assertEqual(
+            list(StockReservation.objects.filter(user=self.user).values_list("material__sku", "qty")), [("BAG", 5)],
+        )
+
+        self.assertIsNone(cache.get(GuestCart.from_request(response.wsgi_request).key))
+        self.assertEqual(guest.get("/api/cart/").data, [])
+        # logging in again with the spent token merges nothing twice
+        guest.post("/api/auth/login/", {"username": "buyer", "password": "pw12345"}, format="json")
+        self.assertEqual(CartItem.objects.get(user=self.user).qty, 5)
+
+
+class InvoiceTest(TestCase):
+    """On-disk invoice PDFs (orders.invoices): download, versions and the ZIP export."""
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(INVOICE_DIR=directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        category = Category.objects.create(name="Cement", slug="cement")
+        material = Material.objects.create(title="Bag", sku="BAG", category=category, stock_qty=5)
+        self.buyer = User.objects.create_user("buyer", password="x", email="buyer@example.com")
+        self.orders = []
+        for _ in range(3):
+            order = Order.objects.create(user=self.buyer, address="x", total=Decimal("10.00"))
+            OrderItem.objects.create(
+                order=order, material=material, title="Bag", sku="BAG", unit="PCS",
+                qty=1, price=Decimal("10.00"), line_total=Decimal("10.00"),
+            )
+            self.orders.append(order)
+        self.admin = APIClient()
+        self.admin.force_authenticate(User.objects.create_user("boss", password="x", role="ADMIN"))
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def download(self, order, **headers):
+        return self.client.get(f"/api/orders/{order.pk}/invoice.pdf", **headers)
+
+    def test_download_is_rendered_once_per_version(self):
+        order = self.orders[0]
+        with mock.patch("orders.invoices.html_to_pdf", side_effect=invoices.html_to_pdf) as convert:
+            response = self.download(order)
+            self.assertEqual(response.status_code, 200)
+            body = b"".join(response.streaming_content)
+            self.assertTrue(body.startswith(b"%PDF"))
+            etag = response["ETag"]
+            self.assertIn("no-cache", response["Cache-Control"])
+
+            again = self.download(order)
+            self.assertEqual((again["ETag"], b"".join(again.streaming_content)), (etag, body))
+            self.assertEqual(self.download(order, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(convert.call_count, 1)
+
+            order.address = "moved"
+            order.save()
+            changed = self.download(order, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(changed.status_code, 200)
+            self.assertNotEqual(changed["ETag"], etag)
+            self.assertEqual(convert.call_count, 2)
+        # the old version was removed when the new one was written
+        self.assertEqual(len(list(invoices.invoice_dir().rglob(f"{order.pk}-*.pdf"))), 1)
+
+    def test_download_permissions(self):
+        stranger = APIClient()
+        stranger.force_authenticate(User.objects.create_user("stranger", password="x"))
+        self.assertEqual(stranger.get(f"/api/orders/{self.orders[0].pk}/invoice.pdf").status_code, 403)
+        self.assertEqual(self.admin.get(f"/api/orders/{self.orders[0].pk}/invoice.pdf").status_code, 200)
+        self.assertEqual(self.admin.get("/api/orders/999999/invoice.pdf").status_code, 404)
+
+    def test_file_removed_before_open_is_rendered_again(self):
+        class Vanished(type(Path())):
+            """Passes the exists() check, then is gone when opened."""
+
+            def exists(self):
+                return True
+
+        order = self.orders[0]
+        gone = Vanished(invoices.invoice_dir(), "gone.pdf")
+        with mock.patch("orders.views.invoice_path", return_value=gone):
+            response = self.download(order)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+        self.assertEqual(response["ETag"], f'"{invoices.invoice_version(invoices.meta_of(order))}"')
+
+    def test_zip_export_renders_inline(self):
+        day = timezone.localdate().isoformat()
+        with mock.patch("orders.invoices.ProcessPoolExecutor") as pool:
+            response = self.admin.get(f"/api/reports/invoices.zip?from={day}&to={day}")
+            self.assertEqual(response.status_code, 200)
+            archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        pool.assert_not_called()
+        self.assertEqual(sorted(archive.namelist()), sorted(f"invoice_{o.pk}.pdf" for o in self.orders))
+        for name in archive.namelist():
+            self.assertTrue(archive.read(name).startswith(b"%PDF"))
+        self.assertEqual(len(list(invoices.invoice_dir().rglob("*.pdf"))), 3)
+
+
+class SalesReportTest(TestCase):
+    """GET /api/reports/sales/: daily rows over live and archived orders."""
+
+    def setUp(self):
+        cache.clear()
+        self.buyer = User.objects.create_user("buyer", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("boss", password="x", role="ADMIN"))
+
+    def test_rows_combine_live_and_archived_orders(self):
+        today = timezone.now()
+        earlier = today - timedelta(days=400)
+        Order.objects.create(user=self.buyer, address="x", total=Decimal("5.00"), created_at=today)
+        Order.objects.create(user=self.buyer, address="x", total=Decimal("7.50"), created_at=earlier)
+        for pk, when, total in ((900001, earlier, "20.00"), (900002, earlier - timedelta(days=1), "3.00")):
+            ArchivedOrder.objects.create(
+                id=pk, user=self.buyer, address="x", status="DELIVERED", total=Decimal(total),
+                created_at=when, updated_at=when,
+            )
+
+        response = self.client.get("/api/reports/sales/")
+        self.assertEqual(response.status_code, 200, response.data)
+
+        def day(dt):
+            return timezone.localtime(dt).date().isoformat()
+
+        self.assertEqual(
+            [(r["date"], r["orders"], r["revenue"]) for r in response.data],
+            [
+                (day(earlier - timedelta(days=1)), 1, "3.00"),
+                (day(earlier), 2, "27.50"),
+                (day(today), 1, "5.00"),
+            ],
+        )
+
+        since = day(earlier)
+        response = self.client.get(f"/api/reports/sales/?from={since}&to={since}")
+        self.assertEqual([(r["date"], r["orders"]) for r in response.data], [(since, 2)])
+
+    def test_admin_only(self):
+        customer = APIClient()
+        customer.force_authenticate(self.buyer)
+        self.assertEqual(customer.get("/api/reports/sales/").status_code, 403)
+
+
+class OrderDetailConditionalGetTest(TestCase):
+    """ETag / 304 on GET /api/orders/<id>/ from one narrow query."""
+
+    def setUp(self):
+        cache.clear()
+        self.buyer = User.objects.create_user("buyer", password="x")
+        self.order = Order.objects.create(user=self.buyer, address="x", total=Decimal("10.00"))
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def test_revalidation(self):
+        url = f"/api/orders/{self.order.pk}/"
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        order = Order.objects.get(pk=self.order.pk)
+        order.status = "CONFIRMED"
+        order.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        stranger = APIClient()
+        stranger.force_authenticate(User.objects.create_user("stranger", password="x"))
+        self.assertEqual(stranger.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 404)
+
+
+class CartPricingTest(TestCase):
+    """Cart lines and checkout price through the shared per-request PriceResolver."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.both = Material.objects.create(title="Both", sku="BOTH", category=category, stock_qty=100)
+        self.retail_only = Material.objects.create(title="Retail", sku="RET", category=category, stock_qty=100)
+        PriceTier.objects.bulk_create([
+            PriceTier(material=self.both, type=PriceTier.RETAIL, price=Decimal("100")),
+            PriceTier(material=self.both, type=PriceTier.WHOLESALE, price=Decimal("80")),
+            PriceTier(material=self.retail_only, type=PriceTier.RETAIL, price=Decimal("50")),
+        ])
+        self.client = APIClient()
+
+    def fill_cart(self, role):
+        user = User.objects.create_user(role.lower(), password="x", role=role)
+        CartItem.objects.bulk_create([
+            CartItem(user=user, material=self.both, qty=2), CartItem(user=user, material=self.retail_only, qty=1),
+        ])
+        self.client.force_authenticate(user)
+
+    def cart_prices(self):
+        data = self.client.get("/api/cart/").data
+        rows = data["results"] if isinstance(data, dict) else data
+        return sorted((r["material_sku"], Decimal(r["price"]), Decimal(r["line_total"])) for r in rows)
+
+    def test_wholesalers_pay_wholesale_with_retail_fallback(self):
+        self.fill_cart("WHOLESALER")
+        self.assertEqual(
+            self.cart_prices(), [("BOTH", Decimal("80"), Decimal("160")), ("RET", Decimal("50"), Decimal("50"))],
+        )
+        response = self.client.post("/api/orders/checkout/", ADDRESS, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["total"], "210.00")
+        self.assertEqual(
+            sorted(OrderItem.objects.values_list("sku", "price")),
+            [("BOTH", Decimal("80.00")), ("RET", Decimal("50.00"))],
+        )
+
+    def test_customers_pay_retail(self):
+        self.fill_cart("CUSTOMER")
+        self.assertEqual(
+            self.cart_prices(), [("BOTH", Decimal("100"), Decimal("200")), ("RET", Decimal("50"), Decimal("50"))],
+        )
+        response = self.client.post("/api/orders/checkout/", ADDRESS, format="json")
+        self.assertEqual(response.data["total"], "250.00")
+
+
+class CartSummaryTest(TestCase):
+    """GET /api/cart/summary/: one aggregate query, cached until the cart or a price changes."""
+
+    def setUp(self):
+        cache.clear()
+        cement = Category.objects.create(name="Cement", slug="cement")
+        steel = Category.objects.create(name="Steel", slug="steel")
+        self.bag = Material.objects.create(title="Bag", sku="BAG", category=cement, stock_qty=100)
+        self.rod = Material.objects.create(title="Rod", sku="ROD", category=steel, stock_qty=100)
+        PriceTier.objects.bulk_create([
+            PriceTier(material=self.bag, type=PriceTier.RETAIL, price=Decimal("10")),
+            PriceTier(material=self.bag, type=PriceTier.WHOLESALE, price=Decimal("8")),
+            PriceTier(material=self.rod, type=PriceTier.RETAIL, price=Decimal("5")),
+        ])
+        self.user = User.objects.create_user("buyer", password="x")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.line = CartItem.objects.create(user=self.user, material=self.bag, qty=3)
+            CartItem.objects.create(user=self.user, material=self.rod, qty=2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def summary(self, query=""):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(f"/api/cart/summary/{query}").data
+        hits = [q for q in ctx.captured_queries if "orders_cartitem" in q["sql"]]
+        return data, len(hits)
+
+    def test_totals_by_category_are_cached(self):
+        data, queries = self.summary()
+        self.assertEqual(queries, 1)
+        self.assertEqual((data["count"], data["qty"], data["subtotal"]), (2, 5, Decimal("40")))
+        self.assertEqual(
+            [(c["slug"], c["qty"], c["subtotal"]) for c in data["categories"]],
+            [("cement", 3, Decimal("30")), ("steel", 2, Decimal("10"))],
+        )
+        self.assertEqual(self.summary(), (data, 0))
+
+        data, queries = self.summary("?category=steel")
+        self.assertEqual((data["subtotal"], queries), (Decimal("10"), 1))
+
+    def test_cart_and_price_changes_invalidate(self):
+        self.summary()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.line.qty = 1
+            self.line.save()
+        data, queries = self.summary()
+        self.assertEqual((data["subtotal"], queries), (Decimal("20"), 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PriceTier.objects.filter(material=self.rod).update(price=Decimal("7"))
+        data, queries = self.summary()
+        self.assertEqual((data["subtotal"], queries), (Decimal("24"), 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CartItem.objects.filter(pk=self.line.pk).delete()
+        self.assertEqual(self.summary()[0]["count"], 1)
+
+    def test_cached_per_price_tier(self):
+        self.summary()
+        self.user.role = "WHOLESALER"
+        self.user.save()
+        data, queries = self.summary()
+        self.assertEqual((data["subtotal"], queries), (Decimal("34"), 1))
+
+
+class OrderListTest(TestCase):
+    """GET /api/orders/ (paginated, filtered, annotated) and /api/orders/stats/."""
+
+    def setUp(self):
+        cache.clear()
+        self.buyer = User.objects.create_user("buyer", password="x")
+        other = User.objects.create_user("other", password="x")
+        material = Material.objects.create(
+            title="Bag", sku="BAG", category=Category.objects.create(name="Cement", slug="cement"),
+        )
+        self.now = timezone.now()
+        self.orders = []
+        for i, status in enumerate(["PLACED", "CONFIRMED", "PLACED", "DELIVERED", "CANCELLED"]):
+            order = Order.objects.create(
+                user=self.buyer, address="x", status=status, total=Decimal(10 * (i + 1)),
+                created_at=self.now - timedelta(days=i),
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, material=material, sku="BAG", title="Bag", qty=1, price=Decimal("1"),
+                          line_total=Decimal("1"))
+                for _ in range(i + 1)
+            ])
+            self.orders.append(order)
+        Order.objects.create(user=other, address="x", status="PLACED", total=Decimal("999"))
+        ArchivedOrder.objects.create(
+            id=900001, user=self.buyer, address="x", status="DELIVERED", total=Decimal("50"),
+            created_at=self.now - timedelta(days=400), updated_at=self.now - timedelta(days=400),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def test_pages_are_newest_first_with_annotations(self):
+        with self.assertNumQueries(2):  # count + page
+            data = self.client.get("/api/orders/").data
+        self.assertEqual(data["count"], 5)
+        self.assertEqual([r["id"] for r in data["results"]], [o.pk for o in self.orders])
+        self.assertEqual(
+            [(r["user_username"], r["items_count"]) for r in data["results"]], [("buyer", n) for n in range(1, 6)],
+        )
+
+        seen, url = [], "/api/orders/?pagination=cursor&page_size=2"
+        while url:
+            with self.assertNumQueries(1):
+                data = self.client.get(url).data
+            seen += [r["id"] for r in data["results"]]
+            url = data["next"]
+        self.assertEqual(seen, [o.pk for o in self.orders])
+
+    def test_status_and_day_filters(self):
+        data = self.client.get("/api/orders/?status=placed,DELIVERED").data
+        self.assertEqual([r["status"] for r in data["results"]], ["PLACED", "PLACED", "DELIVERED"])
+
+        day = timezone.localtime(self.now - timedelta(days=1)).date().isoformat()
+        data = self.client.get(f"/api/orders/?from={day}&to={day}").data
+        self.assertEqual([r["id"] for r in data["results"]], [self.orders[1].pk])
+        self.assertEqual(self.client.get("/api/orders/?status=NOPE").status_code, 400)
+
+    def test_stats_cover_every_order_including_archived(self):
+        data = self.client.get("/api/orders/stats/").data
+        self.assertEqual((data["count"], data["total"], data["avg_order_value"]), (6, Decimal("200.00"), Decimal("33.33")))
+        self.assertEqual(
+            {s: n for s, n in data["by_status"].items() if n},
+            {"PLACED": 2, "CONFIRMED": 1, "DELIVERED": 2, "CANCELLED": 1},
+        )
+        data = self.client.get("/api/orders/stats/?status=PLACED").data
+        self.assertEqual((data["count"], data["total"]), (2, Decimal("40.00")))
+
+        self.client.force_authenticate(User.objects.create_user("boss", password="x", role="ADMIN"))
+        self.assertEqual(self.client.get("/api/orders/stats/").data["count"], 7)
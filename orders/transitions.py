@@ -0,0 +1,64 @@
+# orders/transitions.py
+"""
+Bulk order status changes (POST /api/orders/status_bulk/).
+
+The order rows are read and locked in one query, and each change is checked
+against STATUS_TRANSITIONS. Then there is one UPDATE per target status and one
+INSERT for all outbox notifications, inside a single transaction. QuerySet.update()
+sends no post_save, so the events orders/signals.py would queue for a single
+save are built here with the same status_change_events().
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from core.outbox import enqueue_many
+from .models import Order
+from .signals import status_change_events
+
+# where an order may go from each status
+STATUS_TRANSITIONS = {
+    "PLACED": {"CONFIRMED", "CANCELLED"},
+    "CONFIRMED": {"DISPATCHED", "CANCELLED"},
+    "DISPATCHED": {"DELIVERED"},
+    "DELIVERED": set(),
+    "CANCELLED": set(),
+}
+MAX_BULK_STATUS = 1000
+
+NOT_FOUND, UNCHANGED, NOT_ALLOWED = "not_found", "unchanged", "transition_not_allowed"
+
+
+def bulk_set_status(changes, now=None):
+    """
+    Apply {order_id: new_status} changes.
+    Returns ({status: [ids updated]}, [{"id", "reason", ...} for every skipped id]).
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        rows = {
+            r["pk"]: r
+            for r in Order.objects.select_for_update(of=("self",))
+            .filter(pk__in=changes)
+            .values("pk", "status", "total", "user__email")
+        }
+        targets, skipped = {}, []
+        for pk, new in sorted(changes.items()):
+            row = rows.get(pk)
+            if row is None:
+                skipped.append({"id": pk, "reason": NOT_FOUND})
+            elif row["status"] == new:
+                skipped.append({"id": pk, "reason": UNCHANGED, "status": new})
+            elif new not in STATUS_TRANSITIONS.get(row["status"], ()):
+                skipped.append({"id": pk, "reason": NOT_ALLOWED, "from": row["status"], "to": new})
+            else:
+                targets.setdefault(new, []).append(pk)
+
+        events = []
+        for new, ids in targets.items():
+            Order.objects.filter(pk__in=ids).update(status=new, updated_at=now)
+            for pk in ids:
+                row = rows[pk]
+                events += status_change_events(pk, row["status"], new, row["total"], row["user__email"])
+        if events:
+            enqueue_many(events)
+    return targets, skipped
@@ -1,7 +1,7 @@
 # orders/urls.py
 from rest_framework.routers import DefaultRouter
 from django.urls import path
-from .views import CartViewSet, checkout_view, OrderViewSet, ReviewViewSet, sales_report_view, invoice_pdf_view
+from .views import CartViewSet, checkout_view, OrderViewSet, ReviewViewSet, sales_report_view, invoice_pdf_view, invoice_export_view
 from .views_cart import cart_detail, cart_add
 
 
@@ -16,6 +16,7 @@ router.register(r'reviews', ReviewViewSet, basename='reviews')
 pre_router_urls = [
     path('orders/checkout/', checkout_view, name='orders-checkout'),
     path('reports/sales/', sales_report_view, name='reports-sales'),
+    path('reports/invoices.zip', invoice_export_view, name='reports-invoices-zip'),
     path('orders/<int:pk>/invoice.pdf', invoice_pdf_view, name='orders-invoice-pdf'),
 ]
 
@@ -2,43 +2,72 @@
 from decimal import Decimal
 from django.db import transaction
 from django.db.models import Prefetch, Sum, Count
+from django.db.models.functions import TruncDate
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, datetime, time, timedelta
 from rest_framework import viewsets, status
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from .models import CartItem, Address, Order, OrderItem, Review
-from .serializers import CartItemSerializer, CheckoutSerializer, OrderSerializer, OrderListSerializer, ReviewSerializer, SalesRowSerializer
-from products.models import PriceTier, Material
-
-from io import BytesIO
-from django.http import HttpResponse, HttpResponseForbidden
-from django.template.loader import get_template
-from xhtml2pdf import pisa
+from common.conditional import make_etag, not_modified, set_validators
+from common.pagination import PageOrKeysetPagination
+from core.idempotency import idempotent
+from .archive import find_archived_order, find_order
+from .models import ArchivedOrder, CartItem, Address, Order, OrderItem, Review
+from .serializers import CartBulkLineSerializer, CartItemSerializer, CheckoutSerializer, OrderSerializer, OrderListSerializer, ReviewSerializer, SalesRowSerializer, with_list_annotations
+from products.models import Material, StockMovement
+from products.pricing import resolver_for
+from products.stock import StockShortage, decrement_stock
+from .cart_bulk import MAX_BULK_CART_LINES, MODES, bulk_upsert
+from .cart_store import GuestCart, guest_items, guest_summary, merge_guest_cart
+from .summary import cart_summary
+from .transitions import MAX_BULK_STATUS, STATUS_TRANSITIONS, bulk_set_status
+from .reservations import InsufficientStock, cart_availability, held_by_others, reservations_enabled, reserve
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import quote_etag
+from .invoices import (
+    count_between, day_range, ensure_invoice, invoice_meta, invoice_path, invoice_version, meta_of, orders_between,
+    stream_zip,
+)
 
 
 
 class CartViewSet(viewsets.ModelViewSet):
     """
-    Auth required.
+    Auth required, except that anonymous shoppers get a cache-backed guest
+    cart (orders/cart_store.py) on list/create/update/delete/summary: send
+    the "cart_token" from the first add back as X-Cart-Token. Guest line ids
+    are material ids; the cart is merged into CartItem on login.
     Endpoints:
       GET    /api/cart/           -> list my cart
       POST   /api/cart/           -> {material, qty}
       PATCH  /api/cart/{id}/      -> {qty}
       DELETE /api/cart/{id}/
-      GET    /api/cart/summary/   -> totals
+      GET    /api/cart/summary/   -> totals (cached aggregate, per category)
+      GET    /api/cart/availability/ -> stock left per line (after reservations)
+      POST   /api/cart/bulk/      -> many {material|sku, qty} lines at once
+    With CART_RESERVATIONS_ENABLED, adding/changing a line reserves its qty
+    (409 when other carts hold too much).
     """
     permission_classes = [IsAuthenticated]
     serializer_class = CartItemSerializer
+    guest_actions = ("list", "create", "update", "partial_update", "destroy", "summary")
+
+    def get_permissions(self):
+        if self.action in self.guest_actions:
+            return [AllowAny()]
+        return super().get_permissions()
 
     def get_queryset(self):
         qs = (
             CartItem.objects
             .filter(user=self.request.user)
-            .select_related("material")
-            .prefetch_related(Prefetch("material__prices", queryset=PriceTier.objects.all()))
+            .select_related("material", "material__category")
             .order_by("id")
         )
         # allow filtering cart items by material category slug: /api/cart/?category=<slug>
@@ -52,32 +81,147 @@ class CartViewSet(viewsets.ModelViewSet):
         ctx["role"] = getattr(self.request.user, "role", None)
         return ctx
 
+    def list(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            cart = GuestCart.from_request(request)
+            lines = cart.lines() if cart else {}
+            return Response(guest_items(lines, request.query_params.get("category")))
+        return super().list(request, *args, **kwargs)
+
     def create(self, request, *args, **kwargs):
         material_id = request.data.get("material")
         qty = int(request.data.get("qty", 1))
         if not material_id:
             return Response({"detail": "material is required"}, status=400)
+        if not request.user.is_authenticated:
+            return self._guest_add(request, material_id, qty)
 
-        item, created = CartItem.objects.get_or_create(
-            user=request.user, material_id=material_id, defaults={"qty": max(1, qty)}
-        )
-        if not created:
-            item.qty = max(1, item.qty + qty)
-            item.save()
+        try:
+            with transaction.atomic():
+                item, created = CartItem.objects.get_or_create(
+                    user=request.user, material_id=material_id, defaults={"qty": max(1, qty)}
+                )
+                if not created:
+                    item.qty = max(1, item.qty + qty)
+                    item.save()
+                if reservations_enabled():
+                    reserve(item)
+        except InsufficientStock as e:
+            return Response({"detail": "Insufficient stock", "available": e.available}, status=409)
 
         ser = self.get_serializer(item)
         return Response(ser.data, status=status.HTTP_201_CREATED)
 
+    def _guest_add(self, request, material_id, qty):
+        try:
+            material_id = int(material_id)
+        except (TypeError, ValueError):
+            return Response({"detail": "material must be an id"}, status=400)
+        if not Material.objects.filter(pk=material_id).exists():
+            return Response({"detail": "Material not found"}, status=404)
+        cart = GuestCart.from_request(request, create=True)
+        try:
+            qty = cart.add(material_id, qty)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+        item = guest_items({material_id: qty})[0]
+        return Response({**item, "cart_token": cart.token}, status=status.HTTP_201_CREATED)
+
+    def _guest_line(self, request, pk):
+        cart = GuestCart.from_request(request)
+        try:
+            material_id = int(pk)
+        except (TypeError, ValueError):
+            material_id = None
+        if cart is None or material_id not in cart.lines():
+            raise NotFound()
+        return cart, material_id
+
+    def update(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            cart, material_id = self._guest_line(request, kwargs.get("pk"))
+            try:
+                qty = cart.set(material_id, int(request.data.get("qty", 1)))
+            except (TypeError, ValueError):
+                return Response({"detail": "qty must be a number"}, status=400)
+            return Response(guest_items({material_id: qty})[0])
+        try:
+            return super().update(request, *args, **kwargs)
+        except InsufficientStock as e:
+            return Response({"detail": "Insufficient stock", "available": e.available}, status=409)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            item = serializer.save()
+            if reservations_enabled():
+                reserve(item)
+
+    def destroy(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            cart, material_id = self._guest_line(request, kwargs.get("pk"))
+            cart.remove(material_id)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return super().destroy(request, *args, **kwargs)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        POST /api/cart/bulk/
+        body: {"items": [{"sku": "CEM-01", "qty": 40}, {"material": 7, "qty": 5}, ...],
+               "mode": "add" | "set"}   (default add: quantities add to what is in the cart)
+        -> {"items": [...whole cart], "summary": {...}, "unknown": [...], "shortages": [...]}
+        One upsert for all known lines; unknown materials are skipped and
+        shortfalls reported (with reservations on, short lines are skipped too).
+        """
+        items = request.data.get("items") if isinstance(request.data, dict) else request.data
+        mode = request.data.get("mode", "add") if isinstance(request.data, dict) else "add"
+        if not isinstance(items, list) or not items:
+            return Response({"items": ["A non-empty list is required."]}, status=400)
+        if len(items) > MAX_BULK_CART_LINES:
+            return Response({"items": [f"At most {MAX_BULK_CART_LINES} lines per request."]}, status=400)
+        if mode not in MODES:
+            return Response({"mode": [f"Must be one of {', '.join(MODES)}."]}, status=400)
+        ser = CartBulkLineSerializer(data=items, many=True)
+        ser.is_valid(raise_exception=True)
+
+        result = bulk_upsert(request.user, ser.validated_data, mode=mode)
+        cart = CartItem.objects.filter(user=request.user).select_related("material", "material__category").order_by("id")
+        return Response({
+            "items": self.get_serializer(cart, many=True).data,
+            "summary": cart_summary(request.user, getattr(request.user, "role", None)),
+            "unknown": result["unknown"],
+            "shortages": result["shortages"],
+        })
+
+    @action(detail=False, methods=["get"])
+    def availability(self, request):
+        """
+        GET /api/cart/availability/  -> {"ok": bool, "items": [...]}
+        Stock left per line after other carts' reservations, in one query.
+        """
+        items = cart_availability(request.user)
+        return Response({"ok": all(i["ok"] for i in items), "items": items})
+
     @action(detail=False, methods=["get"])
     def summary(self, request):
-        data = self.get_serializer(self.get_queryset(), many=True).data
-        subtotal = sum((x["line_total"] or 0) for x in data)
-        return Response({"count": len(data), "subtotal": subtotal})
+        """
+        GET /api/cart/summary/[?category=<slug>]
+          -> {count, qty, subtotal, categories: [{slug, name, count, qty, subtotal}]}
+        One aggregate query, cached until the cart or any price changes.
+        """
+        if not request.user.is_authenticated:
+            cart = GuestCart.from_request(request)
+            items = guest_items(cart.lines(), request.query_params.get("category")) if cart else []
+            return Response(guest_summary(items))
+        return Response(cart_summary(
+            request.user, getattr(request.user, "role", None), request.query_params.get("category"),
+        ))
     
 
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@idempotent
 def checkout_view(request):
     """
     POST /api/orders/checkout/
@@ -90,10 +234,9 @@ def checkout_view(request):
     }
     Steps:
       - Validate address
-      - Load cart + effective prices by role
-      - Validate stock for each material
-      - Create Order + OrderItems
-      - Decrement stock
+      - Load cart + effective prices by role, compute totals
+      - Create Order + OrderItems (one batch)
+      - Decrement stock with one guarded UPDATE (400 if any line is short)
       - Remove checked-out items from cart
     """
     ser = CheckoutSerializer(data=request.data)
@@ -103,11 +246,16 @@ def checkout_view(request):
     payment_method = request.data.get("payment_method", "cod")
     delivery_charges = Decimal(str(request.data.get("delivery_charges", 0)))
 
-    # load cart with prices
+    # a guest cart still sent along (no query without the X-Cart-Token header)
+    merged = merge_guest_cart(request, request.user)
+    if merged and merged["shortages"] and reservations_enabled():
+        # those lines were not added to the cart; don't check out without them silently
+        return Response({"detail": "Insufficient stock", "shortages": merged["shortages"]}, status=409)
+
+    # load cart; prices come from Material's denormalized price columns
     cart_qs = (CartItem.objects
                .filter(user=request.user)
                .select_related("material")
-               .prefetch_related(Prefetch("material__prices", queryset=PriceTier.objects.all()))
                .order_by("id"))
     
     # Filter by cart_item_ids if provided
@@ -117,82 +265,93 @@ def checkout_view(request):
     if not cart:
         return Response({"detail": "Cart is empty"}, status=400)
 
-    # helper to compute effective price by role
-    role = (getattr(request.user, "role", "") or "").upper()
-    def eff_price(material):
-        prices = {p.type: p.price for p in material.prices.all()}
-        desired = "WHOLESALE" if role in ("WHOLESALER", "ADMIN") else "RETAIL"
-        return prices.get(desired) or prices.get("RETAIL") or prices.get("WHOLESALE")
-
-    with transaction.atomic():
-        # stock validation
-        missing = []
-        for it in cart:
-            if it.qty <= 0:
-                missing.append({"sku": it.material.sku, "detail": "qty must be >= 1"})
-                continue
-            if it.material.stock_qty < it.qty:
-                missing.append({"sku": it.material.sku, "available": it.material.stock_qty, "requested": it.qty})
-        if missing:
-            return Response({"detail": "Insufficient stock", "items": missing}, status=400)
-
-        # snapshot address text
-        addr_text = f"{addr_data['line1']}, {addr_data['city']}"
-        if addr_data.get("state"): addr_text += f", {addr_data['state']}"
-        if addr_data.get("zip"): addr_text += f" {addr_data['zip']}"
-        addr_text += f" • {addr_data['phone']}"
-
-        # (optional) save address record for user history
-        Address.objects.create(user=request.user, **addr_data)
-
-        # build order
-        order = Order.objects.create(
-            user=request.user,
-            address=addr_text,
-            status="PLACED",
-            subtotal=Decimal("0.00"),
-            tax=Decimal("0.00"),
-            delivery_charges=delivery_charges,
-            total=Decimal("0.00"),
-            payment_method=payment_method,
-        )
-
-        subtotal = Decimal("0.00")
-        for it in cart:
-            p = eff_price(it.material)
-            if p is None:
-                return Response({"detail": f"No price set for {it.material.sku}"}, status=400)
-
-            line_total = (p * it.qty)
-            OrderItem.objects.create(
-                order=order,
-                material=it.material,
-                title=it.material.title,
-                sku=it.material.sku,
-                unit=it.material.unit,
-                qty=it.qty,
-                price=p,
-                line_total=line_total,
+    prices = resolver_for(request)
+
+    # validate lines and compute totals before writing anything
+    bad_qty = [{"sku": it.material.sku, "detail": "qty must be >= 1"} for it in cart if it.qty <= 0]
+    if bad_qty:
+        return Response({"detail": "Insufficient stock", "items": bad_qty}, status=400)
+    lines = []
+    for it in cart:
+        p = prices.price(it.material)
+        if p is None:
+            return Response({"detail": f"No price set for {it.material.sku}"}, status=400)
+        lines.append((it, p, p * it.qty))
+    subtotal = sum((line_total for _, _, line_total in lines), Decimal("0.00"))
+    tax = Decimal("0.00")  # simple tax = 0 for now (can compute later)
+
+    # snapshot address text
+    addr_text = f"{addr_data['line1']}, {addr_data['city']}"
+    if addr_data.get("state"): addr_text += f", {addr_data['state']}"
+    if addr_data.get("zip"): addr_text += f" {addr_data['zip']}"
+    addr_text += f" • {addr_data['phone']}"
+
+    # constant number of queries whatever the cart size: order, items in
+    # one batch, one guarded stock UPDATE, ledger rows in one batch
+    try:
+        with transaction.atomic():
+            # (optional) save address record for user history
+            Address.objects.create(user=request.user, **addr_data)
+
+            order = Order.objects.create(
+                user=request.user,
+                address=addr_text,
+                status="PLACED",
+                subtotal=subtotal,
+                tax=tax,
+                delivery_charges=delivery_charges,
+                total=subtotal + tax + delivery_charges,
+                payment_method=payment_method,
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    material=it.material,
+                    title=it.material.title,
+                    sku=it.material.sku,
+                    unit=it.material.unit,
+                    qty=it.qty,
+                    price=p,
+                    line_total=line_total,
+                )
+                for it, p, line_total in lines
+            ])
+            # fails (and rolls everything back) if any line lacks stock; with
+            # reservations, other carts' holds count as taken
+            decrement_stock(
+                {it.material_id: it.qty for it in cart},
+                reason=StockMovement.SALE, user=request.user, order=order,
+                held=held_by_others(request.user) if reservations_enabled() else None,
             )
-            # decrement stock
-            it.material.stock_qty = max(0, it.material.stock_qty - it.qty)
-            it.material.save(update_fields=["stock_qty"])
-
-            subtotal += line_total
-
-        # simple tax = 0 for now (can compute later)
-        order.subtotal = subtotal
-        order.tax = Decimal("0.00")
-        order.total = subtotal + order.tax + delivery_charges
-        order.save(update_fields=["subtotal", "tax", "total"])
 
-        # clear only the checked-out items from cart
-        CartItem.objects.filter(id__in=[it.id for it in cart]).delete()
+            # clear only the checked-out items from cart
+            CartItem.objects.filter(id__in=[it.id for it in cart]).delete()
+    except StockShortage:
+        return Response({"detail": "Insufficient stock", "items": _shortages(request.user, cart)}, status=400)
 
     # return summary
+    order = Order.objects.prefetch_related(
+        Prefetch("items", queryset=OrderItem.objects.select_related("material"))
+    ).get(pk=order.pk)
     out = OrderSerializer(order)
     return Response(out.data, status=201)
 
+
+def _shortages(user, cart):
+    """Lines that could not be covered, with what is left (failure path only)."""
+    if reservations_enabled():
+        return [
+            {"sku": line["sku"], "available": line["available"], "requested": line["qty"]}
+            for line in cart_availability(user, [it.id for it in cart])
+            if not line["ok"]
+        ]
+    stock = dict(Material.objects.filter(pk__in=[it.material_id for it in cart]).values_list("pk", "stock_qty"))
+    return [
+        {"sku": it.material.sku, "available": stock.get(it.material_id, 0), "requested": it.qty}
+        for it in cart
+        if stock.get(it.material_id, 0) < it.qty
+    ]
+
 class ReviewViewSet(viewsets.ModelViewSet):
     """
     Reviews for orders:
@@ -225,34 +384,110 @@ ALLOWED_STATUSES = {"PLACED", "CONFIRMED", "DISPATCHED", "DELIVERED", "CANCELLED
 
 class OrderViewSet(viewsets.ReadOnlyModelViewSet):
     """
-    GET    /api/orders/           -> list orders (mine if user, all if ADMIN)
-    GET    /api/orders/{id}/      -> detail
+    GET    /api/orders/           -> list orders (mine if user, all if ADMIN), newest first, paginated
+                                     ?status=PLACED,CONFIRMED  ?from=YYYY-MM-DD  ?to=YYYY-MM-DD
+                                     ?pagination=cursor -> keyset pages (next/previous cursors)
+    GET    /api/orders/{id}/      -> detail (falls back to archived orders)
     PATCH  /api/orders/{id}/status -> change status (Admin only)
+    POST   /api/orders/status_bulk/ -> move many orders at once (Admin only)
+    GET    /api/orders/stats/     -> count / total / per-status counts over all my (or all) orders
+    List rows come from annotations (username, item count): two queries per
+    page, one without COUNT(*) in cursor mode. The filters and the ordering
+    match the (user|status, created_at, id) indexes on Order.
     """
     permission_classes = [IsAuthenticated]
+    pagination_class = PageOrKeysetPagination
 
     def get_queryset(self):
-        qs = (
-            Order.objects
-            .select_related("user")
-            .prefetch_related("items")
-            .order_by("-created_at")
-        )
+        qs = Order.objects.order_by("-created_at", "-id")
         user = self.request.user
         # Admin sees all, others see only their own
         if getattr(user, "role", "") != "ADMIN":
             qs = qs.filter(user=user)
+        if self.action == "list":
+            return with_list_annotations(self._filter(qs))
+        if self.action == "retrieve":
+            qs = qs.select_related("user").prefetch_related("items")
         return qs
 
-    def list(self, request, *args, **kwargs):
-        qs = self.get_queryset().annotate(item_count=Count("items"))
-        ser = OrderListSerializer(qs, many=True)
-        return Response(ser.data)
+    def get_serializer_class(self):
+        return OrderListSerializer if self.action == "list" else OrderSerializer
+
+    def _filter(self, qs):
+        params = self.request.query_params
+        statuses = [s.strip().upper() for s in params.get("status", "").split(",") if s.strip()]
+        if statuses:
+            unknown = set(statuses) - ALLOWED_STATUSES
+            if unknown:
+                raise ValidationError({"status": [f"Unknown status: {', '.join(sorted(unknown))}"]})
+            qs = qs.filter(status__in=statuses)
+        # whole days in the current timezone, as created_at ranges (index friendly)
+        date_from, date_to = _parse_day(params, "from"), _parse_day(params, "to")
+        if date_from:
+            qs = qs.filter(created_at__gte=_start_of(date_from))
+        if date_to:
+            qs = qs.filter(created_at__lt=_start_of(date_to + timedelta(days=1)))
+        return qs
+
+    @action(detail=False, methods=["get"])
+    def stats(self, request):
+        """
+        GET /api/orders/stats/  (same scope and ?status/from/to filters as the list)
+          -> {count, total, avg_order_value, by_status: {PLACED: n, ...}}
+        Dashboard figures over every order, not just the first page: one
+        grouped query each for live and archived orders.
+        """
+        user = request.user
+        by_status = {s: 0 for s in sorted(ALLOWED_STATUSES)}
+        count, total = 0, Decimal("0")
+        for model in (Order, ArchivedOrder):
+            qs = model.objects.all()
+            if getattr(user, "role", "") != "ADMIN":
+                qs = qs.filter(user=user)
+            rows = self._filter(qs).order_by().values("status").annotate(n=Count("id"), revenue=Sum("total"))
+            for r in rows:
+                by_status[r["status"]] = by_status.get(r["status"], 0) + r["n"]
+                count += r["n"]
+                total += r["revenue"] or 0
+        cents = Decimal("0.01")
+        return Response({
+            "count": count,
+            "total": total.quantize(cents),
+            "avg_order_value": (total / count).quantize(cents) if count else Decimal("0.00"),
+            "by_status": by_status,
+        })
 
     def retrieve(self, request, *args, **kwargs):
+        # validators from one narrow query, so unchanged orders answer 304 before any serialization
+        try:
+            row = self.get_queryset().filter(pk=kwargs.get("pk")).values_list("updated_at", "status").first()
+        except (TypeError, ValueError):
+            row = None
+        if row is None:
+            return self._retrieve_archived(request, kwargs.get("pk"))
+        etag = make_etag("order", kwargs.get("pk"), *row)
+        updated_at = row[0]
+        nm = not_modified(request, etag, updated_at)
+        if nm is not None:
+            return nm
         obj = self.get_object()
         ser = OrderSerializer(obj)
-        return Response(ser.data)
+        return set_validators(Response(ser.data), etag, updated_at)
+
+    def _retrieve_archived(self, request, pk):
+        # finished orders moved to cold storage keep their id (orders/archive.py)
+        owner = None if getattr(request.user, "role", "") == "ADMIN" else request.user
+        try:
+            order = find_archived_order(pk, owner)
+        except (TypeError, ValueError):
+            order = None
+        if order is None:
+            raise NotFound()
+        etag = make_etag("order", order.pk, order.updated_at, order.status)
+        nm = not_modified(request, etag, order.updated_at)
+        if nm is not None:
+            return nm
+        return set_validators(Response(OrderSerializer(order).data), etag, order.updated_at)
 
     @action(detail=True, methods=["patch"], url_path="status")
     def set_status(self, request, pk=None):
@@ -266,9 +501,61 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
         if new_status not in ALLOWED_STATUSES:
             return Response({"detail": f"Invalid status. Allowed: {sorted(ALLOWED_STATUSES)}"}, status=400)
 
+        if new_status == order.status:
+            return Response({"id": order.id, "status": order.status})
+        # same rules as the bulk endpoint (orders/transitions.py)
+        if new_status not in STATUS_TRANSITIONS.get(order.status, ()):
+            return Response(
+                {"detail": "Transition not allowed", "from": order.status, "to": new_status}, status=409,
+            )
+
         order.status = new_status
-        order.save(update_fields=["status"])
+        # the notification is queued in the same transaction (see orders/signals.py)
+        with transaction.atomic():
+            order.save(update_fields=["status", "updated_at"])
         return Response({"id": order.id, "status": order.status})
+
+    @action(detail=False, methods=["post"], url_path="status_bulk")
+    def status_bulk(self, request):
+        """
+        POST /api/orders/status_bulk/   (Admin only)
+        body: {"ids": [12, 13, 14], "status": "DISPATCHED"}
+          or  {"changes": [{"id": 12, "status": "DISPATCHED"}, {"id": 20, "status": "CANCELLED"}]}
+        -> {"updated": {"DISPATCHED": [12, 13]}, "skipped": [{"id": 14, "reason": "transition_not_allowed", ...}]}
+        Allowed moves are orders.transitions.STATUS_TRANSITIONS; one UPDATE per
+        target status, notifications queued in one batch.
+        """
+        if getattr(request.user, "role", "") != "ADMIN":
+            return Response({"detail": "Admin only"}, status=403)
+
+        data = request.data if isinstance(request.data, dict) else {}
+        if "changes" in data:
+            entries = data["changes"]
+            if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+                return Response({"changes": ["A list of {id, status} is required."]}, status=400)
+            pairs = [(e.get("id"), e.get("status")) for e in entries]
+        else:
+            ids = data.get("ids")
+            if not isinstance(ids, list):
+                return Response({"ids": ["A list of order ids is required."]}, status=400)
+            pairs = [(pk, data.get("status")) for pk in ids]
+        if not pairs:
+            return Response({"detail": "Nothing to change."}, status=400)
+        if len(pairs) > MAX_BULK_STATUS:
+            return Response({"detail": f"At most {MAX_BULK_STATUS} orders per request."}, status=400)
+
+        changes = {}
+        for pk, new_status in pairs:
+            new_status = (new_status or "").upper() if isinstance(new_status, str) else ""
+            if new_status not in ALLOWED_STATUSES:
+                return Response({"detail": f"Invalid status. Allowed: {sorted(ALLOWED_STATUSES)}"}, status=400)
+            if not isinstance(pk, int) or isinstance(pk, bool):
+                return Response({"detail": f"Invalid order id: {pk!r}"}, status=400)
+            if changes.setdefault(pk, new_status) != new_status:
+                return Response({"detail": f"Order {pk} is given two different statuses."}, status=400)
+
+        updated, skipped = bulk_set_status(changes)
+        return Response({"updated": updated, "skipped": skipped})
     
 
 class ReviewViewSet(viewsets.ModelViewSet):
@@ -324,6 +611,20 @@ class ReviewViewSet(viewsets.ModelViewSet):
         ser = self.get_serializer(qs, many=True)
         return Response(ser.data)
 
+def _parse_day(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: ["Use YYYY-MM-DD."]})
+    return day
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
 # ---------- Sales Report ----------
 from rest_framework.decorators import api_view, permission_classes
 @api_view(["GET"])
@@ -331,7 +632,7 @@ from rest_framework.decorators import api_view, permission_classes
 def sales_report_view(request):
     """
     GET /api/reports/sales?from=YYYY-MM-DD&to=YYYY-MM-DD
-      returns rows grouped by day: {day, orders, revenue}
+      returns rows grouped by day: {date, orders, revenue}
     Admin only (others -> 403)
     """
     if getattr(request.user, "role", "") != "ADMIN":
@@ -339,46 +640,93 @@ def sales_report_view(request):
 
     date_from = request.query_params.get("from")
     date_to = request.query_params.get("to")
-    qs = Order.objects.all()
+
+    # archived (finished) orders still count towards the report
+    totals = {}
+    for model in (Order, ArchivedOrder):
+        for r in _daily_totals(model.objects.all(), date_from, date_to):
+            orders, revenue = totals.get(r["day"], (0, 0))
+            totals[r["day"]] = (orders + r["orders"], revenue + (r["revenue"] or 0))
+
+    # serialize
+    data = [{"date": day, "orders": n, "revenue": revenue} for day, (n, revenue) in sorted(totals.items())]
+    ser = SalesRowSerializer(data, many=True)
+    return Response(ser.data)
+
+def _daily_totals(qs, date_from=None, date_to=None):
     if date_from:
         qs = qs.filter(created_at__date__gte=date_from)
     if date_to:
         qs = qs.filter(created_at__date__lte=date_to)
-
-    rows = (
+    return (
         qs.annotate(day=TruncDate("created_at"))
           .values("day")
           .annotate(orders=Count("id"), revenue=Sum("total"))
           .order_by("day")
     )
 
-    # serialize
-    data = [{"day": r["day"], "orders": r["orders"], "revenue": r["revenue"] or 0} for r in rows]
-    ser = SalesRowSerializer(data, many=True)
-    return Response(ser.data)
-
-def _render_pdf_from_template(template_name, context):
-    html = get_template(template_name).render(context)
-    result = BytesIO()
-    pisa.CreatePDF(src=html, dest=result)  # returns pisaStatus, but result has PDF bytes
-    return result.getvalue()
-
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def invoice_pdf_view(request, pk: int):
     """
     GET /api/orders/<id>/invoice.pdf
     - Only owner or ADMIN can download
+    - Served from the on-disk copy (orders/invoices.py), rendered only when
+      missing; ETag = content version, so re-downloads can be 304s
     """
-    try:
-        order = Order.objects.select_related("user").prefetch_related("items").get(pk=pk)
-    except Order.DoesNotExist:
+    meta = invoice_meta(pk)  # live or archived order
+    if meta is None:
         return Response({"detail": "Order not found"}, status=404)
 
-    if getattr(request.user, "role", "") != "ADMIN" and order.user_id != request.user.id:
+    if getattr(request.user, "role", "") != "ADMIN" and meta["user_id"] != request.user.id:
         return Response({"detail": "Not allowed"}, status=403)
 
-    pdf_bytes = _render_pdf_from_template("invoice.html", {"order": order})
-    resp = HttpResponse(pdf_bytes, content_type="application/pdf")
-    resp["Content-Disposition"] = f'attachment; filename="invoice_{order.pk}.pdf"'
+    version = invoice_version(meta)
+    etag = quote_etag(version)
+    nm = not_modified(request, etag, meta["updated_at"])
+    if nm is not None:
+        return nm
+    path = invoice_path(meta, version)
+    if not path.exists():
+        path = ensure_invoice(find_order(pk))
+    try:
+        fh = open(path, "rb")
+    except FileNotFoundError:
+        # a concurrent re-render (the order changed) removed this version
+        # between the check and the open: serve the current one
+        order = find_order(pk)
+        if order is None:
+            return Response({"detail": "Order not found"}, status=404)
+        meta = meta_of(order)
+        etag = quote_etag(invoice_version(meta))
+        fh = open(ensure_invoice(order), "rb")
+    resp = FileResponse(fh, content_type="application/pdf",
+                        as_attachment=True, filename=f"invoice_{pk}.pdf")
+    patch_cache_control(resp, private=True, no_cache=True)
+    return set_validators(resp, etag, meta["updated_at"])
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def invoice_export_view(request):
+    """
+    GET /api/reports/invoices.zip?from=YYYY-MM-DD&to=YYYY-MM-DD
+    Admin only. Streams the invoices of every (live or archived) order created
+    in the range as a ZIP; missing ones are rendered inline (pre-render big
+    ranges with `manage.py render_invoices`).
+    """
+    if getattr(request.user, "role", "") != "ADMIN":
+        return Response({"detail": "Admin only"}, status=403)
+
+    date_from = _parse_day(request.query_params, "from")
+    date_to = _parse_day(request.query_params, "to")
+    if not (date_from and date_to):
+        return Response({"detail": "from and to are required"}, status=400)
+    start, end = day_range(date_from, date_to)
+    limit = getattr(settings, "INVOICE_EXPORT_MAX_ORDERS", 2000)
+    if count_between(start, end) > limit:
+        return Response({"detail": f"At most {limit} invoices per export; narrow the range."}, status=400)
+
+    resp = StreamingHttpResponse(stream_zip(orders_between(start, end)), content_type="application/zip")
+    resp["Content-Disposition"] = f'attachment; filename="invoices_{date_from}_{date_to}.zip"'
     return resp
\ No newline at end of file
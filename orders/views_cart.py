@@ -5,25 +5,11 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from .models import Order, OrderItem
-from products.models import Material, PriceTier
+from products.models import Material
+from products.pricing import resolver_for
 from .serializers import CartSerializer
 
 
-def pick_price_for_user(material, user):
-    # same logic as MaterialCatalogSerializer
-    role = getattr(user, "role", "").upper()
-    desired = "WHOLESALE" if role in ("WHOLESALER", "ADMIN") else "RETAIL"
-
-    prices = {p.type: p.price for p in material.prices.all()}
-    if desired in prices:
-        return prices[desired]
-    # fallback
-    for t in ("RETAIL", "WHOLESALE"):
-        if t in prices:
-            return prices[t]
-    return 0
-
-
 def get_or_create_cart(user):
     cart, _ = Order.objects.get_or_create(user=user, status="CART")
     return cart
@@ -50,7 +36,7 @@ def cart_add(request):
         return Response({"detail": "material_id required"}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        material = Material.objects.prefetch_related("prices").get(pk=material_id)
+        material = Material.objects.get(pk=material_id)
     except Material.DoesNotExist:
         return Response({"detail": "Material not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -58,7 +44,7 @@ def cart_add(request):
         return Response({"detail": "Quantity must be > 0"}, status=status.HTTP_400_BAD_REQUEST)
 
     cart = get_or_create_cart(request.user)
-    price = pick_price_for_user(material, request.user)
+    price = resolver_for(request).price(material) or 0
 
     item, created = OrderItem.objects.get_or_create(
         order=cart,
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Category, Material, PriceTier
+from .stock import record_manual_change
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -13,6 +14,10 @@ class MaterialAdmin(admin.ModelAdmin):
     list_filter = ("category", "unit")
     search_fields = ("title", "sku")
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        record_manual_change(obj, form.initial.get("stock_qty", 0) if change else 0, request.user)
+
 @admin.register(PriceTier)
 class PriceTierAdmin(admin.ModelAdmin):
     list_display = ("material", "type", "price")
@@ -0,0 +1,104 @@
+# products/alerts.py
+"""
+Set-wise LOW_STOCK alert reconciliation: open one alert for every material at
+or below min_stock that has none, resolve open alerts for materials that are
+back above it. A few queries per chunk of ids instead of a get_or_create per
+Material save.
+
+Writers call mark_stock_dirty(ids) for materials whose stock_qty/min_stock
+may have changed; the dirty set is reconciled in one go once the surrounding
+transaction commits, so checkout and bulk writes pay nothing per line. The
+periodic `manage.py reconcile_alerts` sweeps the whole table as a backstop.
+
+Resolved alerts are moved to ArchivedAlert by `manage.py archive_orders`.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Alert, ArchivedAlert, Material
+
+
+_dirty = threading.local()
+
+
+def _dirty_ids():
+    if not hasattr(_dirty, "ids"):
+        _dirty.ids = set()
+    return _dirty.ids
+
+
+def mark_stock_dirty(material_ids):
+    """Queue materials for reconciliation after the current transaction commits."""
+    ids = _dirty_ids()
+    ids.update(i for i in material_ids if i is not None)
+    # one callback per mark (the first to run flushes, the rest find the set
+    # empty): if this transaction rolls back, a later commit still flushes it
+    transaction.on_commit(flush_dirty_stock, robust=True)
+
+
+def flush_dirty_stock():
+    ids = _dirty_ids()
+    if not ids:
+        return 0, 0
+    pending = sorted(ids)
+    ids.clear()
+    return reconcile_low_stock(pending)
+
+
+def reconcile_low_stock(material_ids=None, chunk_size=500):
+    """Reconcile the given materials (all when None). Returns (opened, resolved)."""
+    if material_ids is None:
+        return _reconcile(Material.objects.all(), Alert.objects.all())
+    ids = sorted({i for i in material_ids if i is not None})
+    opened = resolved = 0
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        o, r = _reconcile(Material.objects.filter(pk__in=chunk), Alert.objects.filter(material_id__in=chunk))
+        opened += o
+        resolved += r
+    return opened, resolved
+
+
+def _reconcile(materials, alerts):
+    open_alerts = alerts.filter(type=Alert.LOW_STOCK, is_resolved=False)
+    resolved = (
+        open_alerts.filter(material__stock_qty__gt=F("material__min_stock"))
+        .update(is_resolved=True, updated_at=timezone.now())
+    )
+    missing = (
+        materials.low_stock()
+        .exclude(pk__in=open_alerts.values("material_id"))
+        .values_list("pk", flat=True)
+    )
+    # a concurrent reconcile may have opened the same alert: the partial unique
+    # constraint makes that a no-op instead of a duplicate
+    created = Alert.objects.bulk_create(
+        [Alert(material_id=pk, type=Alert.LOW_STOCK) for pk in missing],
+        ignore_conflicts=True,
+    )
+    return len(created), resolved
+
+
+def archive_resolved_alerts(before, batch_size=500):
+    """Move alerts resolved before `before` into ArchivedAlert. Returns alerts archived."""
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Alert.objects.filter(is_resolved=True, updated_at__lt=before)
+                .order_by("id").values("id", "material_id", "type", "note", "created_at", "updated_at")[:batch_size]
+            )
+            if not rows:
+                return moved
+            ArchivedAlert.objects.bulk_create([
+                ArchivedAlert(
+                    id=r["id"], material_id=r["material_id"], type=r["type"], note=r["note"],
+                    created_at=r["created_at"], resolved_at=r["updated_at"],
+                )
+                for r in rows
+            ])
+            Alert.objects.filter(pk__in=[r["id"] for r in rows]).delete()
+            moved += len(rows)
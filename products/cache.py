@@ -0,0 +1,104 @@
+# products/cache.py
+"""
+Versioned response cache for the public catalog / category reads.
+
+Entries are keyed by a global catalog version, the request path + sorted
+query params and the caller's role. Nothing is ever deleted: any write to
+Material, PriceTier, Category or a supplier link bumps the version (after
+commit) and old entries simply stop being looked up and age out via TTL.
+
+Works with any Django cache backend; use a shared one (redis/memcached) in
+production so every worker sees the same version.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from rest_framework.response import Response
+
+from common.conditional import not_modified, set_validators
+# the version itself lives in cache_version (no DRF imports); re-exported here
+from .cache_version import VERSION_KEY, bump_catalog_version, catalog_cache, catalog_version
+
+STATS_KEY = "catalog:stats:{}"
+
+
+def _count(name):
+    c = catalog_cache()
+    key = STATS_KEY.format(name)
+    try:
+        c.incr(key)
+    except ValueError:
+        c.add(key, 1, None)
+
+
+def cache_stats():
+    c = catalog_cache()
+    return {
+        "version": c.get(VERSION_KEY),
+        "hits": c.get(STATS_KEY.format("hits"), 0),
+        "misses": c.get(STATS_KEY.format("misses"), 0),
+    }
+
+
+def request_role(request):
+    user = getattr(request, "user", None)
+    if not (user and user.is_authenticated):
+        return "ANON"
+    return (getattr(user, "role", "") or "").upper() or "USER"
+
+
+def response_cache_key(request, prefix="catalog"):
+    params = sorted((k, v) for k in request.query_params for v in request.query_params.getlist(k))
+    raw = f"{request.get_host()}{request.path}?{urlencode(params)}|{request_role(request)}"
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f"{prefix}:resp:{catalog_version()}:{digest}"
+
+
+class CachedReadMixin:
+    """
+    Cache list/retrieve responses (200 only) for viewsets.
+    Adds an X-Cache: HIT|MISS header. Views that implement get_validators()
+    also get ETag / Last-Modified and 304s; the validators are stored with the
+    cached body, so a conditional hit costs no queries at all.
+    """
+
+    cached_actions = ("list", "retrieve")
+    vary_headers = ("Authorization",)
+
+    def get_validators(self, request, *args, **kwargs):
+        """(etag, last_modified) computed without serializing; (None, None) to skip."""
+        return None, None
+
+    def cached_response(self, request, render, *args, **kwargs):
+        c = catalog_cache()
+        key = response_cache_key(request)
+        entry = c.get(key)
+        if entry is not None:
+            _count("hits")
+            etag, last_modified = entry["etag"], entry["last_modified"]
+            response = not_modified(request, etag, last_modified) or Response(entry["data"])
+            response["X-Cache"] = "HIT"
+            return set_validators(response, etag, last_modified, self.vary_headers)
+
+        _count("misses")
+        etag, last_modified = self.get_validators(request, *args, **kwargs)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = render(request, *args, **kwargs)
+            if response.status_code == 200:
+                timeout = getattr(settings, "CATALOG_CACHE_TIMEOUT", 300)
+                entry = {"data": response.data, "etag": etag, "last_modified": last_modified}
+                c.set(key, entry, timeout)
+        response["X-Cache"] = "MISS"
+        return set_validators(response, etag, last_modified, self.vary_headers)
+
+    def list(self, request, *args, **kwargs):
+        if "list" not in self.cached_actions:
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if "retrieve" not in self.cached_actions:
+            return super().retrieve(request, *args, **kwargs)
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
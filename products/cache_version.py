@@ -0,0 +1,40 @@
+# products/cache_version.py
+"""
+The global catalog version that keys every cached catalog response
+(products/cache.py) and the cart summaries. Kept free of DRF / HTTP
+imports so models and stock writers can bump it.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_KEY = "catalog:version"
+
+
+def catalog_cache():
+    return caches[getattr(settings, "CATALOG_CACHE_ALIAS", "default")]
+
+
+def catalog_version():
+    c = catalog_cache()
+    version = c.get(VERSION_KEY)
+    if version is None:
+        # seed from the clock so an evicted counter never restarts at an old value
+        c.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = c.get(VERSION_KEY)
+    return version
+
+
+def _bump():
+    c = catalog_cache()
+    try:
+        c.incr(VERSION_KEY)
+    except ValueError:
+        c.add(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response once the current transaction commits."""
+    transaction.on_commit(_bump)
@@ -0,0 +1,127 @@
+# products/export.py
+"""
+Constant-memory catalog export (NDJSON or CSV, optionally gzipped).
+
+Materials are walked with .iterator(chunk_size) as plain values; price tiers
+and supplier links are fetched per chunk (two extra queries per chunk, never
+per row) and output is flushed in ~64 KB pieces, so memory stays flat
+whatever the catalog size. Used by /api/catalog/export/ and
+`manage.py export_catalog`.
+"""
+import csv
+import io
+import json
+import zlib
+from collections import defaultdict
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from suppliers.models import MaterialSupplier
+from .models import PriceTier
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+MATERIAL_COLUMNS = [
+    "id", "sku", "title", "category__slug", "unit", "stock_qty", "min_stock",
+    "description", "retail_price", "wholesale_price", "min_price", "updated_at",
+]
+CSV_HEADER = [
+    "id", "sku", "title", "category", "unit", "stock_qty", "min_stock",
+    "description", "retail_price", "wholesale_price", "min_price", "updated_at",
+    "suppliers",
+]
+FLUSH_BYTES = 64 * 1024
+
+
+def iter_catalog_rows(qs, chunk_size=1000):
+    rows = qs.order_by("pk").values(*MATERIAL_COLUMNS)
+    batch = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield from _attach_relations(batch)
+            batch = []
+    yield from _attach_relations(batch)
+
+
+def _attach_relations(batch):
+    if not batch:
+        return
+    ids = [r["id"] for r in batch]
+    tiers = defaultdict(dict)
+    for material_id, tier_type, price in (
+        PriceTier.objects.filter(material_id__in=ids).values_list("material_id", "type", "price")
+    ):
+        tiers[material_id][tier_type] = price
+    links = defaultdict(list)
+    for material_id, supplier_id, name, price, primary, lead in (
+        MaterialSupplier.objects.filter(material_id__in=ids)
+        .order_by("-is_primary", "supplier__name")
+        .values_list("material_id", "supplier_id", "supplier__name", "wholesale_price", "is_primary", "lead_time_days")
+    ):
+        links[material_id].append({
+            "id": supplier_id,
+            "name": name,
+            "wholesale_price": price,
+            "is_primary": primary,
+            "lead_time_days": lead,
+        })
+    for row in batch:
+        row["category"] = row.pop("category__slug")
+        row["prices"] = tiers.get(row["id"], {})
+        row["suppliers"] = links.get(row["id"], [])
+        yield row
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, separators=(",", ":")) + "\n"
+
+
+def _csv_lines(rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def take(values):
+        writer.writerow(values)
+        line = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return line
+
+    yield take(CSV_HEADER)
+    for row in rows:
+        yield take([
+            row["id"], row["sku"], row["title"], row["category"], row["unit"],
+            row["stock_qty"], row["min_stock"], row["description"],
+            row["retail_price"], row["wholesale_price"], row["min_price"],
+            row["updated_at"].isoformat() if row["updated_at"] else "",
+            "|".join(s["name"] for s in row["suppliers"]),
+        ])
+
+
+def stream_catalog(qs, fmt="ndjson", gzip=False, chunk_size=1000):
+    """Yield the export as bytes chunks."""
+    lines = (_csv_lines if fmt == "csv" else _ndjson_lines)(iter_catalog_rows(qs, chunk_size))
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if gzip else None
+    pending = []
+    size = 0
+    for line in lines:
+        data = line.encode("utf-8")
+        pending.append(data)
+        size += len(data)
+        if size >= FLUSH_BYTES:
+            out = b"".join(pending)
+            pending, size = [], 0
+            if compressor:
+                out = compressor.compress(out)
+            if out:
+                yield out
+    out = b"".join(pending)
+    if compressor:
+        out = compressor.compress(out) + compressor.flush()
+    if out:
+        yield out
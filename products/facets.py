@@ -0,0 +1,85 @@
+# products/facets.py
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Floor
+
+from .filters import filter_catalog
+from .models import Material
+
+
+# histogram widths a client may ask for (Rs); keeps the bucket count sane
+MIN_BUCKET_SIZE = Decimal("1")
+MAX_BUCKET_SIZE = Decimal("1000000")
+
+
+def bucket_size_from(params):
+    default = Decimal(str(getattr(settings, "CATALOG_FACET_BUCKET_SIZE", 1000)))
+    try:
+        size = Decimal(params.get("bucket_size") or default)
+    except InvalidOperation:
+        return default
+    # NaN / Infinity parse fine but break the comparison and the SQL
+    if not size.is_finite() or size <= 0:
+        return default
+    return min(max(size, MIN_BUCKET_SIZE), MAX_BUCKET_SIZE)
+
+
+def catalog_facets(params):
+    """
+    Category counts, in-stock counts and a min_price histogram for the
+    catalog filters in `params`, from ONE grouped query over
+    (category, price bucket).
+
+    Category counts ignore ?category= itself (so the filter UI can show every
+    option); totals and the histogram are restricted to the selected category.
+    """
+    selected = params.get("category") or None
+    width = bucket_size_from(params)
+
+    rows = (
+        filter_catalog(Material.objects.all(), params, exclude={"category"})
+        .order_by()
+        .annotate(price_bucket=Floor(F("min_price") / Value(width)))
+        .values("category_id", "category__name", "category__slug", "price_bucket")
+        .annotate(n=Count("id"), in_stock=Count("id", filter=Q(stock_qty__gt=0)))
+    )
+
+    categories = {}
+    buckets = {}
+    total = in_stock = unpriced = 0
+    for row in rows:
+        cat = categories.setdefault(row["category_id"], {
+            "id": row["category_id"],
+            "name": row["category__name"],
+            "slug": row["category__slug"],
+            "count": 0,
+            "in_stock": 0,
+        })
+        cat["count"] += row["n"]
+        cat["in_stock"] += row["in_stock"]
+
+        if selected and row["category__slug"] != selected:
+            continue
+        total += row["n"]
+        in_stock += row["in_stock"]
+        if row["price_bucket"] is None:
+            unpriced += row["n"]
+        else:
+            b = int(row["price_bucket"])
+            buckets[b] = buckets.get(b, 0) + row["n"]
+
+    return {
+        "total": total,
+        "in_stock": in_stock,
+        "categories": sorted(categories.values(), key=lambda c: c["name"]),
+        "price_histogram": {
+            "bucket_size": float(width),
+            "buckets": [
+                {"min": float(b * width), "max": float((b + 1) * width), "count": buckets[b]}
+                for b in sorted(buckets)
+            ],
+            "unpriced": unpriced,
+        },
+    }
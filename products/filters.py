@@ -0,0 +1,43 @@
+# products/filters.py
+"""
+Catalog query-param filters, shared by the catalog list, facets and export
+so all of them accept exactly the same ?category / ?search / ?min_price /
+?max_price parameters.
+"""
+from .search import get_search_backend
+
+CATALOG_FILTERS = ("category", "search", "min_price", "max_price")
+
+
+def _price(value):
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def filter_catalog(qs, params, exclude=()):
+    """
+    Apply the catalog filters in `params` to a Material queryset.
+    Filters named in `exclude` are skipped (facets count every category).
+    Search results come back ordered best match first.
+    """
+    slug = params.get("category") if "category" not in exclude else None
+    search = params.get("search") if "search" not in exclude else None
+    min_price = _price(params.get("min_price")) if "min_price" not in exclude else None
+    max_price = _price(params.get("max_price")) if "max_price" not in exclude else None
+
+    if slug:
+        qs = qs.filter(category__slug=slug)
+
+    if search:
+        # full-text index lookup, ranked best match first unless ordering is given
+        qs = get_search_backend().filter(qs, search).order_by("search_rank", "title")
+
+    if min_price is not None:
+        qs = qs.filter(min_price__gte=min_price)
+
+    if max_price is not None:
+        qs = qs.filter(min_price__lte=max_price)
+
+    return qs
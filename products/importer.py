@@ -0,0 +1,237 @@
+# products/importer.py
+"""
+Bulk material + price import (CSV or NDJSON).
+
+Rows use the catalog export columns: sku, title, category (slug), unit,
+stock_qty, min_stock, description, retail_price, wholesale_price. NDJSON rows
+may carry "prices": {"RETAIL": .., "WHOLESALE": ..} instead, so an export
+file can be fed straight back in. Only sku is required for a material that
+already exists; columns left out keep their stored value and an empty price
+cell leaves that tier alone.
+
+Each batch is validated with the model fields' own validators and then
+written set-wise: one lookup of existing skus, one INSERT .. ON CONFLICT(sku)
+for materials, one ON CONFLICT(material, type) for price tiers, the price
+column sync, stock ledger rows and a search index refresh; low-stock alerts
+are reconciled after commit for the rows whose stock or threshold changed.
+Nothing is saved row by row, so no per-row signals fire.
+Every batch commits on its own; invalid rows are skipped and reported.
+"""
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .alerts import mark_stock_dirty
+from .cache_version import bump_catalog_version
+from .models import Category, Material, PriceTier, StockMovement
+from .search import get_search_backend
+
+FORMATS = ("csv", "ndjson")
+MATERIAL_FIELDS = ("title", "unit", "stock_qty", "min_stock", "description")
+PRICE_COLUMNS = {"retail_price": PriceTier.RETAIL, "wholesale_price": PriceTier.WHOLESALE}
+MAX_REPORTED_ERRORS = 1000
+
+
+def guess_format(filename):
+    return "csv" if (filename or "").lower().endswith(".csv") else "ndjson"
+
+
+def read_rows(fh, fmt):
+    """Yield (line_no, row) pairs; a line that cannot be parsed yields (line_no, None)."""
+    if isinstance(fh.read(0), bytes):
+        fh = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(fh)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(fh, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if isinstance(row, dict) and isinstance(row.get("prices"), dict):
+            for column, tier in PRICE_COLUMNS.items():
+                row.setdefault(column, row["prices"].get(tier))
+        yield line_no, row if isinstance(row, dict) else None
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _text(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+class _Batch:
+    """Validation state for one batch of rows."""
+
+    def __init__(self, rows, categories, seen, user=None):
+        self.rows = rows
+        self.user = user
+        self.categories = categories
+        self.seen = seen
+        self.errors = []
+        self.valid = []  # (fields, prices, stored values or None)
+        self.created = 0
+
+    def validate(self):
+        skus = []
+        for line_no, raw in self.rows:
+            sku = _text(raw.get("sku")) if raw else None
+            if sku:
+                skus.append(sku)
+        existing = {
+            row["sku"]: row
+            for row in Material.objects.filter(sku__in=skus).values(
+                "sku", "category_id", *MATERIAL_FIELDS
+            )
+        }
+        for line_no, raw in self.rows:
+            if raw is None:
+                self.error(line_no, None, {"row": ["Malformed row."]})
+                continue
+            self.clean(line_no, raw, existing)
+
+    def error(self, line_no, sku, errors):
+        self.errors.append({"line": line_no, "sku": sku, "errors": errors})
+
+    def clean(self, line_no, raw, existing):
+        errors = {}
+        sku = _text(raw.get("sku"))
+        try:
+            sku = Material._meta.get_field("sku").clean(sku, None)
+        except ValidationError as e:
+            self.error(line_no, sku, {"sku": e.messages})
+            return
+        if sku in self.seen:
+            self.error(line_no, sku, {"sku": [f"Duplicate sku (first seen on line {self.seen[sku]})."]})
+            return
+        self.seen[sku] = line_no
+
+        current = existing.get(sku)
+        fields = dict(current) if current else {"sku": sku, "description": ""}
+        for name in MATERIAL_FIELDS:
+            value = _text(raw.get(name))
+            if name not in raw or (_blank(value) and name != "description"):
+                continue
+            try:
+                fields[name] = Material._meta.get_field(name).clean(value if value is not None else "", None)
+            except ValidationError as e:
+                errors[name] = e.messages
+
+        slug = _text(raw.get("category"))
+        if not _blank(slug):
+            if slug in self.categories:
+                fields["category_id"] = self.categories[slug]
+            else:
+                errors["category"] = [f"Unknown category '{slug}'."]
+
+        if current is None:
+            for name, column in (("title", "title"), ("category_id", "category")):
+                if name not in fields and column not in errors:
+                    errors[column] = ["This field is required for a new material."]
+
+        prices = {}
+        price_field = PriceTier._meta.get_field("price")
+        for column, tier in PRICE_COLUMNS.items():
+            value = _text(raw.get(column))
+            if _blank(value):
+                continue
+            try:
+                price = price_field.clean(str(value), None)
+            except ValidationError as e:
+                errors[column] = e.messages
+                continue
+            if price < 0:
+                errors[column] = ["Ensure this value is greater than or equal to 0."]
+            else:
+                prices[tier] = price
+
+        if errors:
+            self.error(line_no, sku, errors)
+            return
+        if current is None:
+            self.created += 1
+        self.valid.append((fields, prices, current))
+
+    def write(self):
+        if not self.valid:
+            return
+        materials = [Material(**fields) for fields, _, _ in self.valid]
+        Material.objects.bulk_create(
+            materials,
+            update_conflicts=True,
+            unique_fields=["sku"],
+            update_fields=["category", *MATERIAL_FIELDS, "updated_at"],
+        )
+        if any(m.pk is None for m in materials):
+            ids = dict(Material.objects.filter(sku__in=[m.sku for m in materials]).values_list("sku", "pk"))
+            for m in materials:
+                m.pk = ids[m.sku]
+
+        tiers = [
+            PriceTier(material_id=m.pk, type=tier, price=price)
+            for m, (_, prices, _) in zip(materials, self.valid)
+            for tier, price in prices.items()
+        ]
+        if tiers:
+            # PriceTierQuerySet.bulk_create re-syncs the material price columns
+            PriceTier.objects.bulk_create(
+                tiers,
+                update_conflicts=True,
+                unique_fields=["material", "type"],
+                update_fields=["price", "updated_at"],
+            )
+        stock_before = [current["stock_qty"] if current else 0 for _, _, current in self.valid]
+        StockMovement.objects.bulk_create([
+            StockMovement(material_id=m.pk, delta=m.stock_qty - before, reason=StockMovement.IMPORT, user=self.user)
+            for m, before in zip(materials, stock_before)
+            if m.stock_qty != before
+        ])
+        get_search_backend().index_materials(materials)
+        mark_stock_dirty(
+            m.pk for m, (_, _, current) in zip(materials, self.valid)
+            if current is None or (m.stock_qty, m.min_stock) != (current["stock_qty"], current["min_stock"])
+        )
+        bump_catalog_version()
+
+
+def import_materials(rows, batch_size=1000, dry_run=False, user=None):
+    """
+    Import (line_no, row) pairs as produced by read_rows().
+    Returns {"rows", "created", "updated", "error_count", "errors"}; at most
+    MAX_REPORTED_ERRORS errors are listed.
+    """
+    categories = dict(Category.objects.values_list("slug", "pk"))
+    seen = {}
+    report = {"rows": 0, "created": 0, "updated": 0, "error_count": 0, "errors": []}
+
+    def run(chunk):
+        batch = _Batch(chunk, categories, seen, user)
+        batch.validate()
+        if not dry_run:
+            with transaction.atomic():
+                batch.write()
+        report["created"] += batch.created
+        report["updated"] += len(batch.valid) - batch.created
+        report["error_count"] += len(batch.errors)
+        room = MAX_REPORTED_ERRORS - len(report["errors"])
+        report["errors"].extend(batch.errors[:max(room, 0)])
+
+    chunk = []
+    for item in rows:
+        report["rows"] += 1
+        chunk.append(item)
+        if len(chunk) >= batch_size:
+            run(chunk)
+            chunk = []
+    if chunk:
+        run(chunk)
+    return report
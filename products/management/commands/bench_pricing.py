@@ -0,0 +1,60 @@
+# products/management/commands/bench_pricing.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from products.models import Material
+from products.pricing import PriceResolver
+
+
+def _tier_dict_price(material, role):
+    # the old per-call lookup: rebuild a dict from the prefetched PriceTier rows
+    prices = {p.type: p.price for p in material.prices.all()}
+    desired = "WHOLESALE" if (role or "").upper() in ("WHOLESALER", "ADMIN") else "RETAIL"
+    return prices.get(desired) or prices.get("RETAIL") or prices.get("WHOLESALE") or 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Time per-line price resolution for a cart-sized batch of materials: "
+        "per-call PriceTier dicts (before) vs the shared PriceResolver (after)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, default=500, help="Materials per batch (default 500).")
+        parser.add_argument("--role", default="RETAILER")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **opts):
+        ids = list(Material.objects.order_by("pk").values_list("pk", flat=True)[:opts["lines"]])
+        if not ids:
+            raise CommandError("No materials to price.")
+        role = opts["role"]
+
+        def before():
+            # price + line_total each priced the line again
+            for m in Material.objects.filter(pk__in=ids).prefetch_related("prices"):
+                _tier_dict_price(m, role)
+                _tier_dict_price(m, role)
+
+        def after():
+            resolver = PriceResolver(role)
+            for m in Material.objects.filter(pk__in=ids):
+                resolver.price(m)
+                resolver.price(m)
+
+        self.stdout.write(f"{len(ids)} lines, role {role}, best of {opts['repeat']}:")
+        for label, run in (("before", before), ("after", after)):
+            best = None
+            for _ in range(opts["repeat"]):
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    run()
+                    elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            self.stdout.write(
+                f"  {label:<7} {best * 1000:8.2f} ms  {best * 1e6 / len(ids):7.1f} us/line  "
+                f"{len(ctx.captured_queries)} queries"
+            )
@@ -0,0 +1,29 @@
+# products/management/commands/compact_stock_ledger.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from products.stock import compact_ledger
+
+
+class Command(BaseCommand):
+    help = (
+        "Snapshot stock per material and drop ledger movements older than the "
+        "retention window (STOCK_LEDGER_RETENTION_DAYS). Run it periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=getattr(settings, "STOCK_LEDGER_RETENTION_DAYS", 90))
+        parser.add_argument("--keep-movements", action="store_true", help="Only write snapshots.")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        before = timezone.now() - timedelta(days=opts["days"])
+        created, deleted = compact_ledger(
+            before, delete=not opts["keep_movements"], chunk_size=opts["chunk_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshots at {before:%Y-%m-%d %H:%M}: {created} written, {deleted} movements compacted."
+        ))
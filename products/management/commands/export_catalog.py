@@ -0,0 +1,47 @@
+# products/management/commands/export_catalog.py
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.export import FORMATS, stream_catalog
+from products.filters import filter_catalog
+from products.models import Material
+
+
+class Command(BaseCommand):
+    help = "Stream the catalog as NDJSON or CSV (same filters as /api/catalog/export/)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fmt", choices=sorted(FORMATS), default="ndjson")
+        parser.add_argument("--output", "-o", help="File path (default: stdout).")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--category", help="Category slug.")
+        parser.add_argument("--search")
+        parser.add_argument("--min-price")
+        parser.add_argument("--max-price")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        params = {
+            "category": opts["category"],
+            "search": opts["search"],
+            "min_price": opts["min_price"],
+            "max_price": opts["max_price"],
+        }
+        qs = filter_catalog(Material.objects.all(), params)
+        chunks = stream_catalog(qs, fmt=opts["fmt"], gzip=opts["gzip"], chunk_size=opts["chunk_size"])
+
+        if not opts["output"]:
+            if opts["gzip"] and sys.stdout.isatty():
+                raise CommandError("Refusing to write gzip to a terminal; use --output.")
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.flush()
+            return
+
+        written = 0
+        with open(opts["output"], "wb") as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+                written += len(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Wrote {written} bytes to {opts['output']}"))
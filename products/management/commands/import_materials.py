@@ -0,0 +1,48 @@
+# products/management/commands/import_materials.py
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import FORMATS, guess_format, import_materials, read_rows
+
+
+class Command(BaseCommand):
+    help = "Upsert materials and price tiers by sku from a CSV or NDJSON file ('-' for stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--fmt", choices=FORMATS, help="Default: from the file extension.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Validate and report only.")
+        parser.add_argument("--strict", action="store_true", help="Exit non-zero if any row failed.")
+
+    def handle(self, *args, **opts):
+        path = opts["path"]
+        fmt = opts["fmt"] or guess_format(path)
+        started = time.monotonic()
+        if path == "-":
+            report = self._run(sys.stdin.buffer, fmt, opts)
+        else:
+            try:
+                fh = open(path, "rb")
+            except OSError as e:
+                raise CommandError(str(e))
+            with fh:
+                report = self._run(fh, fmt, opts)
+        elapsed = time.monotonic() - started
+
+        for err in report["errors"]:
+            self.stderr.write(f"  line {err['line']} ({err['sku'] or '-'}): {err['errors']}")
+        if report["error_count"] > len(report["errors"]):
+            self.stderr.write(f"  ... {report['error_count'] - len(report['errors'])} more")
+        summary = (
+            f"{'Validated' if opts['dry_run'] else 'Imported'} {report['rows']} rows in {elapsed:.1f}s: "
+            f"{report['created']} new, {report['updated']} updated, {report['error_count']} errors"
+        )
+        if report["error_count"] and opts["strict"]:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def _run(self, fh, fmt, opts):
+        return import_materials(read_rows(fh, fmt), batch_size=opts["batch_size"], dry_run=opts["dry_run"])
@@ -0,0 +1,22 @@
+# products/management/commands/rebuild_search_index.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the catalog search index from the Material table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        backend = get_search_backend()
+        started = time.monotonic()
+        count = backend.rebuild(chunk_size=opts["chunk_size"])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{type(backend).__name__}: indexed {count} materials in {elapsed:.2f}s"
+        ))
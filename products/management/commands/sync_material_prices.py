@@ -0,0 +1,45 @@
+# products/management/commands/sync_material_prices.py
+from django.core.management.base import BaseCommand, CommandError
+
+from products.models import Material, sync_material_prices
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare Material.retail_price/wholesale_price/min_price with PriceTier rows "
+        "and repair any drift (use --verify to only report)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify", action="store_true", help="Report drift without fixing it.")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        rows = (
+            Material.objects.with_tier_prices()
+            .order_by("pk")
+            .values_list(
+                "pk", "sku",
+                "retail_price", "tier_retail",
+                "wholesale_price", "tier_wholesale",
+                "min_price", "tier_min",
+            )
+        )
+        drift = []
+        checked = 0
+        for pk, sku, retail, t_retail, whole, t_whole, low, t_low in rows.iterator(chunk_size=opts["chunk_size"]):
+            checked += 1
+            if (retail, whole, low) != (t_retail, t_whole, t_low):
+                drift.append(pk)
+                if opts["verbosity"] > 1:
+                    self.stdout.write(f"  {sku}: stored {(retail, whole, low)} != tiers {(t_retail, t_whole, t_low)}")
+
+        self.stdout.write(f"Checked {checked} materials, {len(drift)} out of sync.")
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Prices: OK"))
+            return
+        if opts["verify"]:
+            raise CommandError(f"{len(drift)} materials have stale price columns")
+
+        sync_material_prices(drift)
+        self.stdout.write(self.style.SUCCESS(f"Re-synced {len(drift)} materials."))
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+FTS_TABLE = "products_material_fts"
+
+
+def create_index(apps, schema_editor):
+    # FTS5 only exists on SQLite; other databases use SimpleSearchBackend
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "title, sku, description, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    # default ORDER BY rank scoring: bm25 weighted title, sku, description
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 8.0, 1.0)')"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE} (rowid, title, sku, description) "
+        "SELECT id, title, sku, description FROM products_material"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_material_suppliers'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:02
+
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+
+
+def backfill_prices(apps, schema_editor):
+    Material = apps.get_model("products", "Material")
+    PriceTier = apps.get_model("products", "PriceTier")
+    tiers = PriceTier.objects.filter(material=OuterRef("pk")).order_by()
+    Material.objects.update(
+        retail_price=Subquery(tiers.filter(type="RETAIL").values("price")[:1]),
+        wholesale_price=Subquery(tiers.filter(type="WHOLESALE").values("price")[:1]),
+        min_price=Subquery(tiers.values("material").annotate(p=Min("price")).values("p")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_material_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='min_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='retail_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='wholesale_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.RunPython(backfill_prices, migrations.RunPython.noop),
+    ]
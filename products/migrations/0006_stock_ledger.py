@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def opening_snapshots(apps, schema_editor):
+    """The ledger starts here: one snapshot of the current stock per material."""
+    Material = apps.get_model("products", "Material")
+    StockSnapshot = apps.get_model("products", "StockSnapshot")
+    now = django.utils.timezone.now()
+    rows = Material.objects.order_by().values_list("pk", "stock_qty")
+    StockSnapshot.objects.bulk_create(
+        (StockSnapshot(material_id=pk, stock_qty=qty, taken_at=now) for pk, qty in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_updated_at'),
+        ('products', '0005_material_price_columns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('reason', models.CharField(choices=[('ADJUSTMENT', 'Stock adjustment'), ('SALE', 'Sale (checkout)'), ('IMPORT', 'Bulk import'), ('MANUAL', 'Manual edit')], max_length=12)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='products.material')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='orders.order')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['material', '-created_at', '-id'], name='stockmove_material_time')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock_qty', models.PositiveIntegerField()),
+                ('taken_at', models.DateTimeField()),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='products.material')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('material', 'taken_at'), name='uniq_stock_snapshot')],
+            },
+        ),
+        migrations.RunPython(opening_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_stock_ledger'),
+        ('suppliers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(condition=models.Q(('stock_qty__lte', models.F('min_stock'))), fields=['stock_qty'], name='material_low_stock'),
+        ),
+    ]
@@ -1,7 +1,11 @@
 # products/models.py
+from django.conf import settings
 from django.db import models
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models import F, Min, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from common.tracking import TrackedFieldsMixin
+from .cache_version import bump_catalog_version
 
 class Timestamped(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -14,7 +18,44 @@ class Category(Timestamped):
     slug = models.SlugField(max_length=140, unique=True)
     def __str__(self): return self.name
 
-class Material(Timestamped):
+class MaterialQuerySet(models.QuerySet):
+    def low_stock(self):
+        """At or below min_stock; same predicate as the material_low_stock partial index."""
+        return self.filter(stock_qty__lte=F("min_stock"))
+
+    def with_tier_prices(self):
+        """Annotate tier_retail / tier_wholesale / tier_min straight from PriceTier rows."""
+        return self.annotate(**_tier_price_expressions())
+
+    def sync_prices(self):
+        """Recompute the denormalized price columns from PriceTier rows (one UPDATE)."""
+        exprs = _tier_price_expressions()
+        return self.update(
+            retail_price=exprs["tier_retail"],
+            wholesale_price=exprs["tier_wholesale"],
+            min_price=exprs["tier_min"],
+            updated_at=timezone.now(),
+        )
+
+
+def _tier_price_expressions():
+    tiers = PriceTier.objects.filter(material=OuterRef("pk")).order_by()
+    return {
+        "tier_retail": Subquery(tiers.filter(type=PriceTier.RETAIL).values("price")[:1]),
+        "tier_wholesale": Subquery(tiers.filter(type=PriceTier.WHOLESALE).values("price")[:1]),
+        "tier_min": Subquery(tiers.values("material").annotate(p=Min("price")).values("p")[:1]),
+    }
+
+
+def sync_material_prices(material_ids, batch_size=500):
+    ids = sorted({i for i in material_ids if i is not None})
+    for start in range(0, len(ids), batch_size):
+        Material.objects.filter(pk__in=ids[start:start + batch_size]).sync_prices()
+    if ids:
+        bump_catalog_version()
+
+
+class Material(TrackedFieldsMixin, Timestamped):
     UNIT_CHOICES = [("BAG","Bag"),("TON","Ton"),("PCS","Pieces"),("PKG","Package")]
     title = models.CharField(max_length=160)
     sku = models.CharField(max_length=64, unique=True)
@@ -23,6 +64,12 @@ class Material(Timestamped):
     stock_qty = models.PositiveIntegerField(default=0)
     min_stock = models.PositiveIntegerField(default=0)
     description = models.TextField(blank=True)
+    # Denormalized from PriceTier rows so catalog filters/sorting are plain
+    # index scans. Never written directly: PriceTier saves, deletes and bulk
+    # queryset writes call sync_material_prices().
+    retail_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, db_index=True, editable=False)
+    wholesale_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, db_index=True, editable=False)
+    min_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, db_index=True, editable=False)
     # Suppliers providing this material. Uses a through model in the suppliers app.
     suppliers = models.ManyToManyField(
         "suppliers.Supplier",
@@ -30,18 +77,105 @@ class Material(Timestamped):
         related_name="materials",
         blank=True,
     )
+
+    objects = MaterialQuerySet.as_manager()
+    save_changed_only = True
+
+    class Meta:
+        indexes = [
+            # only low-stock rows are indexed: alert reconcile + admin low-stock list
+            models.Index(fields=["stock_qty"], condition=Q(stock_qty__lte=F("min_stock")), name="material_low_stock"),
+        ]
+
     def __str__(self): return f"{self.title} ({self.sku})"
 
+class PriceTierQuerySet(models.QuerySet):
+    """Bulk write paths keep Material's price columns in sync too."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        sync_material_prices(o.material_id for o in objs)
+        return objs
+
+    def update(self, **kwargs):
+        # also reached by bulk_update(), once per batch
+        material_ids = set(self.values_list("material_id", flat=True))
+        rows = super().update(**kwargs)
+        moved_to = kwargs.get("material_id", kwargs.get("material"))
+        if moved_to is not None:
+            material_ids.add(getattr(moved_to, "pk", moved_to))
+        sync_material_prices(material_ids)
+        return rows
+
+    def delete(self):
+        material_ids = set(self.values_list("material_id", flat=True))
+        result = super().delete()
+        sync_material_prices(material_ids)
+        return result
+
 class PriceTier(Timestamped):
     RETAIL, WHOLESALE = "RETAIL", "WHOLESALE"
     TYPE_CHOICES = [(RETAIL,"Retail"), (WHOLESALE,"Wholesale")]
     material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name="prices")
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)
     price = models.DecimalField(max_digits=12, decimal_places=2)
+
+    objects = PriceTierQuerySet.as_manager()
+
     class Meta:
         unique_together = ("material","type")
     def __str__(self): return f"{self.material.sku} {self.type} {self.price}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        sync_material_prices([self.material_id])
+
+    def delete(self, *args, **kwargs):
+        material_id = self.material_id
+        result = super().delete(*args, **kwargs)
+        sync_material_prices([material_id])
+        return result
+
+# ---- Stock ledger ----
+# Every stock_qty change appends a StockMovement (delta actually applied, after
+# clamping at 0). StockSnapshot rows fold old movements into a balance, so
+# stock-at-time reads one snapshot plus the movements after it; see
+# products/stock.py and `manage.py compact_stock_ledger`.
+
+class StockMovement(models.Model):
+    ADJUSTMENT, SALE, IMPORT, MANUAL = "ADJUSTMENT", "SALE", "IMPORT", "MANUAL"
+    REASONS = [
+        (ADJUSTMENT, "Stock adjustment"),
+        (SALE, "Sale (checkout)"),
+        (IMPORT, "Bulk import"),
+        (MANUAL, "Manual edit"),
+    ]
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name="movements")
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=12, choices=REASONS)
+    # no FK constraint: archived orders leave Order but keep their id
+    # (orders.ArchivedOrder), and the ledger keeps pointing at them
+    order = models.ForeignKey(
+        "orders.Order", on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name="stock_movements",
+    )
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["material", "-created_at", "-id"], name="stockmove_material_time")]
+    def __str__(self): return f"{self.material_id} {self.delta:+d} {self.reason}"
+
+class StockSnapshot(models.Model):
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name="stock_snapshots")
+    stock_qty = models.PositiveIntegerField()
+    # covers every movement with created_at <= taken_at
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["material", "taken_at"], name="uniq_stock_snapshot")]
+    def __str__(self): return f"{self.material_id} = {self.stock_qty} @ {self.taken_at:%Y-%m-%d %H:%M}"
+
 # ---- Day 8: Alerts ----
 class Alert(Timestamped):
     LOW_STOCK = "LOW_STOCK"
@@ -59,11 +193,13 @@ class Alert(Timestamped):
         ]
     def __str__(self): return f"{self.material.sku} - {self.type} ({'resolved' if self.is_resolved else 'open'})"
 
-@receiver(post_save, sender=Material)
-def create_or_resolve_low_stock_alert(sender, instance: Material, **kwargs):
-    # if at/below threshold → ensure one OPEN alert exists
-    if instance.stock_qty <= instance.min_stock:
-        Alert.objects.get_or_create(material=instance, type=Alert.LOW_STOCK, is_resolved=False)
-    else:
-        # above threshold → resolve any open alerts
-        Alert.objects.filter(material=instance, type=Alert.LOW_STOCK, is_resolved=False).update(is_resolved=True)
+class ArchivedAlert(models.Model):
+    """Resolved alert moved out of Alert by `manage.py archive_orders` (same id)."""
+    id = models.BigIntegerField(primary_key=True)
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name="archived_alerts")
+    type = models.CharField(max_length=20, choices=Alert.TYPES)
+    note = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField()
+    resolved_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    def __str__(self): return f"{self.material_id} - {self.type} (archived)"
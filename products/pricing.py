@@ -0,0 +1,101 @@
+# products/pricing.py
+"""
+Role-based price resolution shared by the catalog, cart and checkout.
+
+WHOLESALER / ADMIN pay the WHOLESALE tier, everyone else RETAIL; when the
+preferred tier is missing the other one is used (RETAIL first). Prices come
+from Material's denormalized retail_price / wholesale_price columns, so a
+material already loaded costs no query and bare ids are loaded in one query
+per batch. A PriceResolver remembers every material it has priced and one
+is kept per request, so price + line total on the same line, or the same
+material on several lines, is resolved once.
+"""
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from .models import Material, PriceTier
+
+RETAIL, WHOLESALE = PriceTier.RETAIL, PriceTier.WHOLESALE
+FALLBACK = (RETAIL, WHOLESALE)
+COLUMNS = {RETAIL: "retail_price", WHOLESALE: "wholesale_price"}
+WHOLESALE_ROLES = ("WHOLESALER", "ADMIN")
+
+
+def preferred_tier(role):
+    return WHOLESALE if (role or "").upper() in WHOLESALE_ROLES else RETAIL
+
+
+def pick_price(prices, tier):
+    """(price, tier) from a {tier: price} dict, falling back RETAIL -> WHOLESALE."""
+    if prices.get(tier) is not None:
+        return prices[tier], tier
+    for t in FALLBACK:
+        if prices.get(t) is not None:
+            return prices[t], t
+    return None, None
+
+
+def price_expression(role, prefix=""):
+    """SQL twin of PriceResolver.price(): the role's tier column, else RETAIL, else WHOLESALE."""
+    tier = preferred_tier(role)
+    order = [tier] + [t for t in FALLBACK if t != tier]
+    return Coalesce(*[F(prefix + COLUMNS[t]) for t in order])
+
+
+class PriceResolver:
+    def __init__(self, role=None):
+        self.tier = preferred_tier(role)
+        self._resolved = {}
+
+    def _remember(self, pk, retail, wholesale):
+        self._resolved[pk] = pick_price({RETAIL: retail, WHOLESALE: wholesale}, self.tier)
+        return self._resolved[pk]
+
+    def load(self, material_ids):
+        """Price every id not seen yet with one query."""
+        missing = {pk for pk in material_ids if pk is not None} - self._resolved.keys()
+        if not missing:
+            return
+        rows = Material.objects.filter(pk__in=missing).values_list("pk", "retail_price", "wholesale_price")
+        for pk, retail, wholesale in rows:
+            self._remember(pk, retail, wholesale)
+            missing.discard(pk)
+        for pk in missing:
+            self._resolved[pk] = (None, None)
+
+    def resolve(self, material):
+        """(price, tier) for a Material instance or id; (None, None) when unpriced."""
+        if isinstance(material, Material):
+            if material.pk in self._resolved:
+                return self._resolved[material.pk]
+            return self._remember(material.pk, material.retail_price, material.wholesale_price)
+        if material not in self._resolved:
+            self.load([material])
+        return self._resolved[material]
+
+    def price(self, material):
+        return self.resolve(material)[0]
+
+
+def resolver_for(request, role=None):
+    """The request's resolver for `role` (defaults to the request user's role)."""
+    if role is None:
+        role = getattr(getattr(request, "user", None), "role", None)
+    # keep it on the Django request so the DRF wrapper and the view share it
+    target = getattr(request, "_request", request)
+    resolvers = target.__dict__.setdefault("_price_resolvers", {})
+    tier = preferred_tier(role)
+    if tier not in resolvers:
+        resolvers[tier] = PriceResolver(role)
+    return resolvers[tier]
+
+
+def resolver_from_context(context):
+    """Serializer helper: per-request resolver honouring context["role"]."""
+    request = context.get("request")
+    role = context.get("role")
+    if request is not None:
+        return resolver_for(request, role=role or "")
+    if "price_resolver" not in context:
+        context["price_resolver"] = PriceResolver(role)
+    return context["price_resolver"]
@@ -0,0 +1,171 @@
+# products/search.py
+"""
+Catalog search backends.
+
+CatalogViewSet hands ``?search=`` to ``get_search_backend().filter(qs, term)``
+instead of OR-ing three ``icontains`` lookups. Backends are pluggable through
+the ``CATALOG_SEARCH_BACKEND`` setting (dotted path); when it is not set,
+SQLite databases use the FTS5 index and everything else uses the portable
+LIKE based backend.
+
+Every backend annotates ``search_rank`` on the filtered queryset (lower is a
+better match) so the view can order by relevance.
+"""
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models import Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+FTS_TABLE = "products_material_fts"
+
+# only word characters reach MATCH, so user input can never inject FTS syntax
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TERMS = 8
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text or "")[:MAX_TERMS]
+
+
+class BaseSearchBackend:
+    def filter(self, qs, query):
+        raise NotImplementedError
+
+    @staticmethod
+    def empty(qs):
+        return qs.annotate(search_rank=Value(0, output_field=IntegerField())).none()
+
+    def index_materials(self, materials):
+        """Add or refresh index rows for the given Material instances."""
+
+    def remove_materials(self, ids):
+        """Drop index rows for the given material ids."""
+
+    def rebuild(self, chunk_size=2000):
+        """Re-create the whole index from the Material table. Returns row count."""
+        return 0
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """
+    Portable fallback for databases without a full-text index.
+    Every term must match title, sku or description; SKU prefix hits rank first.
+    """
+
+    def filter(self, qs, query):
+        terms = tokenize(query)
+        if not terms:
+            return self.empty(qs)
+        cond = Q()
+        for t in terms:
+            cond &= Q(title__icontains=t) | Q(sku__icontains=t) | Q(description__icontains=t)
+        first = terms[0]
+        rank = Case(
+            When(sku__iexact=first, then=Value(0)),
+            When(sku__istartswith=first, then=Value(1)),
+            When(title__istartswith=first, then=Value(2)),
+            When(title__icontains=first, then=Value(3)),
+            default=Value(4),
+            output_field=IntegerField(),
+        )
+        return qs.filter(cond).annotate(search_rank=rank)
+
+
+class Fts5SearchBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 index (table created by migration 0004_material_search_index).
+    Rows are keyed by rowid = material id; every term is matched as a prefix so
+    partial SKUs like "CEM-0" still hit.
+
+    Matching ids come from one ``rowid IN (... MATCH ...)`` subquery; each
+    matched row's ``rank`` (bm25 weighted title 10, sku 8, description 1, as
+    configured by the migration) is read by a rowid lookup in the index, so
+    only matched rows are scored.
+    """
+
+    def __init__(self):
+        if connection.vendor != "sqlite":
+            raise ImproperlyConfigured("Fts5SearchBackend requires an SQLite database")
+
+    @staticmethod
+    def match_expression(query):
+        return " ".join(f'"{t}"*' for t in tokenize(query))
+
+    def filter(self, qs, query):
+        match = self.match_expression(query)
+        if not match:
+            return self.empty(qs)
+        table = qs.model._meta.db_table
+        matched = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+        rank = RawSQL(
+            f"SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+            (match,),
+            output_field=FloatField(),
+        )
+        # a real annotation so it can be ordered and filtered on, e.g. by keyset pagination
+        return qs.filter(pk__in=matched).annotate(search_rank=rank)
+
+    def index_materials(self, materials):
+        rows = [(m.pk, m.title, m.sku, m.description or "") for m in materials]
+        if not rows:
+            return
+        with connection.cursor() as cur:
+            self._delete(cur, [r[0] for r in rows])
+            self._insert(cur, rows)
+
+    def remove_materials(self, ids):
+        ids = list(ids)
+        if ids:
+            with connection.cursor() as cur:
+                self._delete(cur, ids)
+
+    def rebuild(self, chunk_size=2000):
+        from .models import Material
+
+        total = 0
+        batch = []
+        with connection.cursor() as cur:
+            cur.execute(f"DELETE FROM {FTS_TABLE}")
+            rows = Material.objects.order_by().values_list("id", "title", "sku", "description")
+            for row in rows.iterator(chunk_size=chunk_size):
+                batch.append(row)
+                if len(batch) >= chunk_size:
+                    total += self._insert(cur, batch)
+                    batch = []
+            total += self._insert(cur, batch)
+            cur.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        return total
+
+    @staticmethod
+    def _insert(cur, rows):
+        if rows:
+            cur.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, sku, description) VALUES (%s, %s, %s, %s)",
+                rows,
+            )
+        return len(rows)
+
+    @staticmethod
+    def _delete(cur, ids):
+        marks = ", ".join(["%s"] * len(ids))
+        cur.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({marks})", ids)
+
+
+_backends = {}
+
+
+def get_search_backend():
+    path = getattr(settings, "CATALOG_SEARCH_BACKEND", None)
+    if not path:
+        path = (
+            "products.search.Fts5SearchBackend"
+            if connection.vendor == "sqlite"
+            else "products.search.SimpleSearchBackend"
+        )
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
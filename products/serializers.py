@@ -2,7 +2,9 @@
 
 from rest_framework import serializers
 
-from .models import Category, Material, PriceTier, Alert
+from common.fieldsets import SparseFieldsMixin
+from .models import Category, Material, PriceTier, Alert, StockMovement
+from .pricing import resolver_from_context
 from suppliers.models import Supplier
 
 
@@ -20,7 +22,7 @@ class PriceTierSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class MaterialSerializer(serializers.ModelSerializer):
+class MaterialSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category_name = serializers.ReadOnlyField(source="category.name")
     prices = PriceTierSerializer(many=True, read_only=True)
     suppliers = serializers.SerializerMethodField()
@@ -53,7 +55,11 @@ class MaterialSerializer(serializers.ModelSerializer):
 
 # ─────────── Catalog ke liye lightweight Material ───────────
 
-class MaterialCatalogSerializer(serializers.ModelSerializer):
+class MaterialCatalogSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Prices come from Material's denormalized columns, so list pages need no
+    PriceTier prefetch. Honours context["fields"] / context["omit"].
+    """
     category_name = serializers.ReadOnlyField(source="category.name")
     price_retail = serializers.SerializerMethodField()
     price_wholesale = serializers.SerializerMethodField()
@@ -74,6 +80,7 @@ class MaterialCatalogSerializer(serializers.ModelSerializer):
             "description",
             "price_retail",
             "price_wholesale",
+            "min_price",
             "prices",
             "suppliers",
             "created_at",
@@ -81,37 +88,16 @@ class MaterialCatalogSerializer(serializers.ModelSerializer):
         ]
 
     def get_price_retail(self, obj):
-        prices = {p.type: p.price for p in obj.prices.all()}
-        return prices.get("RETAIL")
+        return obj.retail_price
 
     def get_price_wholesale(self, obj):
-        prices = {p.type: p.price for p in obj.prices.all()}
-        return prices.get("WHOLESALE")
-
-    def _pick_price(self, obj, desired):
-        """
-        returns (price, type) or (None, None)
-        """
-        prices = {p.type: p.price for p in obj.prices.all()}
-        if desired in prices:
-            return prices[desired], desired
-        # fallback order
-        for t in ("RETAIL", "WHOLESALE"):
-            if t in prices:
-                return prices[t], t
-        return None, None
+        return obj.wholesale_price
 
     def get_price(self, obj):
-        role = (self.context.get("role") or "").upper()
-        desired = "WHOLESALE" if role in ("WHOLESALER", "ADMIN") else "RETAIL"
-        price, _ = self._pick_price(obj, desired)
-        return price
+        return resolver_from_context(self.context).resolve(obj)[0]
 
     def get_price_type(self, obj):
-        role = (self.context.get("role") or "").upper()
-        desired = "WHOLESALE" if role in ("WHOLESALER", "ADMIN") else "RETAIL"
-        _, t = self._pick_price(obj, desired)
-        return t
+        return resolver_from_context(self.context).resolve(obj)[1]
 
     def get_suppliers(self, obj):
         return [{"id": s.id, "name": s.name} for s in obj.suppliers.all()]
@@ -136,3 +122,22 @@ class AlertSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+
+
+# ─────────── Stock adjustments (single + bulk) ───────────
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    sku = serializers.CharField(required=False, max_length=64)
+    delta = serializers.IntegerField()
+
+    def validate(self, attrs):
+        if ("id" in attrs) == ("sku" in attrs):
+            raise serializers.ValidationError("Give exactly one of id or sku.")
+        return attrs
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockMovement
+        fields = ["id", "delta", "reason", "order", "user", "created_at"]
@@ -0,0 +1,56 @@
+# products/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .alerts import mark_stock_dirty
+from .cache_version import bump_catalog_version
+from .models import Category, Material
+from .search import get_search_backend
+
+
+# ---- Search index sync ----
+# Runs on the same connection as the Material write, so a rolled back
+# transaction rolls the index row back with it.
+
+# what the index holds; stock-only saves (update_fields without these) skip it
+INDEXED_FIELDS = {"title", "sku", "description", "category", "category_id"}
+
+
+@receiver(post_save, sender=Material)
+def index_material(sender, instance: Material, update_fields=None, **kwargs):
+    if update_fields is not None and not INDEXED_FIELDS & set(update_fields):
+        return
+    get_search_backend().index_materials([instance])
+
+
+@receiver(post_delete, sender=Material)
+def unindex_material(sender, instance: Material, **kwargs):
+    get_search_backend().remove_materials([instance.pk])
+
+
+# ---- Low-stock alerts ----
+# No queries here: the material is queued and reconciled with everything
+# else dirtied in the same transaction once it commits.
+
+STOCK_FIELDS = {"stock_qty", "min_stock"}
+
+
+@receiver(post_save, sender=Material)
+def queue_low_stock_check(sender, instance: Material, update_fields=None, **kwargs):
+    if update_fields is None or STOCK_FIELDS & set(update_fields):
+        mark_stock_dirty([instance.pk])
+
+
+# ---- Catalog cache invalidation ----
+# PriceTier writes bump through sync_material_prices().
+
+@receiver(post_save, sender=Material)
+@receiver(post_delete, sender=Material)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender="suppliers.Supplier")
+@receiver(post_delete, sender="suppliers.Supplier")
+@receiver(post_save, sender="suppliers.MaterialSupplier")
+@receiver(post_delete, sender="suppliers.MaterialSupplier")
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_catalog_version()
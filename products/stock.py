@@ -0,0 +1,246 @@
+# products/stock.py
+"""
+Race-free stock adjustments.
+
+stock_qty is never read into Python and written back: every adjustment is
+an UPDATE stock_qty = MAX(0, stock_qty + delta), so concurrent writers
+cannot lose each other's changes. A batch updates all its materials in one
+statement through a CASE on id; a material listed twice is applied in a
+second round so clamping at zero happens in the order given. Low-stock
+alerts are reconciled set-wise after commit (no per-row save, no signal).
+
+Every change is also appended to the StockMovement ledger. Reads of past
+stock start from the latest StockSnapshot and add the movements after it;
+compact_ledger() periodically folds old movements into a new snapshot.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Min, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from suppliers.models import MaterialSupplier
+from .alerts import mark_stock_dirty
+from .cache_version import bump_catalog_version
+from .models import Material, StockMovement, StockSnapshot
+
+MAX_BULK_ADJUSTMENTS = 1000
+CHUNK_SIZE = 500
+
+
+def can_adjust_all(user):
+    return bool(
+        user and user.is_authenticated
+        and (getattr(user, "role", "") == "ADMIN" or getattr(user, "is_staff", False))
+    )
+
+
+def adjustable_ids(user, material_ids):
+    """Subset of material_ids the user may adjust: admins any, suppliers their own materials."""
+    material_ids = set(material_ids)
+    if can_adjust_all(user):
+        return material_ids
+    supplier = getattr(user, "supplier_profile", None) if user and user.is_authenticated else None
+    if supplier is None:
+        return set()
+    return set(
+        MaterialSupplier.objects.filter(supplier=supplier, material_id__in=material_ids)
+        .values_list("material_id", flat=True)
+    )
+
+
+def _rounds(adjustments):
+    rounds = []
+    for pk, delta in adjustments:
+        for deltas in rounds:
+            if pk not in deltas:
+                deltas[pk] = delta
+                break
+        else:
+            rounds.append({pk: delta})
+    return rounds
+
+
+def apply_adjustments(adjustments, reason=StockMovement.ADJUSTMENT, user=None, order=None):
+    """
+    Apply (material_id, delta) pairs atomically and log them to the ledger.
+    Returns {material_id: new stock_qty} for every material touched.
+    """
+    adjustments = list(adjustments)
+    rounds = _rounds(adjustments)
+    ids = sorted(rounds[0]) if rounds else []
+    now = timezone.now()
+    with transaction.atomic():
+        # row locks keep the logged deltas equal to what the UPDATEs below apply
+        stock = dict(
+            Material.objects.select_for_update().filter(pk__in=ids).values_list("pk", "stock_qty")
+        )
+        movements = []
+        for pk, delta in adjustments:
+            if pk not in stock:
+                continue
+            new = max(0, stock[pk] + delta)
+            if new != stock[pk]:
+                movements.append(StockMovement(
+                    material_id=pk, delta=new - stock[pk], reason=reason,
+                    user=user, order=order, created_at=now,
+                ))
+            stock[pk] = new
+
+        for deltas in rounds:
+            pks = sorted(deltas)
+            for start in range(0, len(pks), CHUNK_SIZE):
+                chunk = pks[start:start + CHUNK_SIZE]
+                if len(chunk) == 1:
+                    change = Value(deltas[chunk[0]])
+                else:
+                    change = Case(
+                        *[When(pk=pk, then=Value(deltas[pk])) for pk in chunk],
+                        output_field=IntegerField(),
+                    )
+                Material.objects.filter(pk__in=chunk).update(
+                    stock_qty=Greatest(F("stock_qty") + change, Value(0)),
+                    updated_at=now,
+                )
+        StockMovement.objects.bulk_create(movements)
+        mark_stock_dirty(ids)
+        if ids:
+            bump_catalog_version()
+    return stock
+
+
+class StockShortage(Exception):
+    """Some materials lacked the stock to cover a guarded decrement."""
+
+
+def decrement_stock(quantities, reason=StockMovement.SALE, user=None, order=None, held=None):
+    """
+    Take {material_id: qty} out of stock with one guarded UPDATE per chunk:
+    only rows with stock_qty >= qty (+ `held`, an optional expression for
+    stock reserved by others) are touched. If any row is short nothing is
+    logged and StockShortage is raised; run inside transaction.atomic() so
+    the partial update and the caller's writes roll back with it.
+    """
+    ids = sorted(quantities)
+    now = timezone.now()
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        if len(chunk) == 1:
+            need = Value(quantities[chunk[0]])
+        else:
+            need = Case(
+                *[When(pk=pk, then=Value(quantities[pk])) for pk in chunk],
+                output_field=IntegerField(),
+            )
+        floor = need + held if held is not None else need
+        updated = (
+            Material.objects.filter(pk__in=chunk, stock_qty__gte=floor)
+            .update(stock_qty=F("stock_qty") - need, updated_at=now)
+        )
+        if updated != len(chunk):
+            raise StockShortage()
+    StockMovement.objects.bulk_create([
+        StockMovement(material_id=pk, delta=-quantities[pk], reason=reason, user=user, order=order, created_at=now)
+        for pk in ids
+    ])
+    mark_stock_dirty(ids)
+    if ids:
+        bump_catalog_version()
+
+
+def record_manual_change(material, before, user=None):
+    """Log a stock_qty edit made through a form / serializer save."""
+    if material.stock_qty != before:
+        StockMovement.objects.create(
+            material=material, delta=material.stock_qty - before,
+            reason=StockMovement.MANUAL, user=user,
+        )
+
+
+# ---- Ledger reads / compaction ----
+
+class HistoryCompacted(Exception):
+    """The movements needed to answer a point-in-time read were compacted away."""
+
+    def __init__(self, cutoff):
+        super().__init__(f"history before {cutoff.isoformat()} was compacted")
+        self.cutoff = cutoff
+
+
+def stock_at(material_id, at):
+    """
+    stock_qty at time `at`: latest snapshot <= at plus the movements after it.
+    Raises HistoryCompacted when a later snapshot exists but the movements
+    between `at` and it were deleted by compact_ledger(delete=True).
+    """
+    snapshots = StockSnapshot.objects.filter(material_id=material_id).aggregate(
+        first=Min("taken_at"), last=Max("taken_at"),
+    )
+    latest = snapshots["last"]
+    if latest is not None and at < latest:
+        oldest = (
+            StockMovement.objects.filter(material_id=material_id)
+            .aggregate(first=Min("created_at"))["first"]
+        )
+        # compaction deletes every movement up to its cutoff, so the kept ones
+        # reach back past `at` only if nothing after `at` was deleted; a
+        # movement at or before the first snapshot means nothing ever was
+        deleted = oldest is None or oldest > snapshots["first"]
+        if deleted and (oldest is None or oldest > at):
+            raise HistoryCompacted(latest)
+    snapshot = (
+        StockSnapshot.objects.filter(material_id=material_id, taken_at__lte=at)
+        .order_by("-taken_at").values_list("taken_at", "stock_qty").first()
+    )
+    tail = StockMovement.objects.filter(material_id=material_id, created_at__lte=at)
+    base = 0
+    if snapshot:
+        tail = tail.filter(created_at__gt=snapshot[0])
+        base = snapshot[1]
+    return base + (tail.aggregate(total=Sum("delta"))["total"] or 0)
+
+
+def _latest_snapshot(field, before, ref="material_id"):
+    return Subquery(
+        StockSnapshot.objects.filter(material=OuterRef(ref), taken_at__lte=before)
+        .order_by("-taken_at").values(field)[:1]
+    )
+
+
+def compact_ledger(before, delete=True, chunk_size=CHUNK_SIZE):
+    """
+    Fold every movement up to `before` into one StockSnapshot per material
+    taken at `before`; with delete=True the folded movements are removed.
+    Returns (snapshots_created, movements_deleted).
+    """
+    material_ids = list(
+        StockMovement.objects.filter(created_at__lte=before)
+        .order_by("material_id").values_list("material_id", flat=True).distinct()
+    )
+    created = deleted = 0
+    for start in range(0, len(material_ids), chunk_size):
+        chunk = material_ids[start:start + chunk_size]
+        with transaction.atomic():
+            previous = {
+                pk: (taken_at, qty)
+                for pk, taken_at, qty in Material.objects.filter(pk__in=chunk).annotate(
+                    snap_at=_latest_snapshot("taken_at", before, ref="pk"),
+                    snap_qty=_latest_snapshot("stock_qty", before, ref="pk"),
+                ).values_list("pk", "snap_at", "snap_qty")
+            }
+            totals = (
+                StockMovement.objects.filter(material_id__in=chunk, created_at__lte=before)
+                .annotate(snap_at=_latest_snapshot("taken_at", before))
+                .filter(Q(snap_at__isnull=True) | Q(created_at__gt=F("snap_at")))
+                .order_by().values("material_id").annotate(total=Sum("delta"))
+                .values_list("material_id", "total")
+            )
+            snapshots = []
+            for pk, total in totals:
+                taken_at, qty = previous.get(pk, (None, None))
+                if taken_at != before:
+                    snapshots.append(StockSnapshot(material_id=pk, stock_qty=max(0, (qty or 0) + total), taken_at=before))
+            StockSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+            created += len(snapshots)
+            if delete:
+                deleted += StockMovement.objects.filter(material_id__in=chunk, created_at__lte=before).delete()[0]
+    return created, deleted
@@ -1,3 +1,784 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from common.pagination import estimate_count
+from suppliers.models import MaterialSupplier, Supplier
+from users.models import User
+from .alerts import flush_dirty_stock
+from .cache_version import VERSION_KEY
+from .export import stream_catalog
+from .facets import MAX_BUCKET_SIZE, MIN_BUCKET_SIZE, bucket_size_from
+from .importer import import_materials, read_rows
+from .models import Alert, Category, Material, PriceTier, StockMovement, StockSnapshot
+from .pricing import PriceResolver, price_expression, resolver_for, resolver_from_context
+from .search import get_search_backend, tokenize
+from .stock import HistoryCompacted, apply_adjustments, compact_ledger, stock_at
+
+
+class KeysetPaginationTest(TestCase):
+    """?pagination=cursor on /api/catalog/ (common.pagination.KeysetPagination)."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        prices = [Decimal("5.00"), Decimal("10.00"), Decimal("15.00")]
+        for i in range(29):
+            # only 7 distinct titles and 3 prices: most sort values are tied
+            material = Material.objects.create(
+                title=f"Item {i % 7}", sku=f"SKU-{i}", category=category,
+                description="cement bag" if i % 2 else "sand",
+            )
+            if i % 4:  # every fourth material has no price (NULL min_price)
+                PriceTier.objects.create(material=material, type=PriceTier.RETAIL, price=prices[i % 3])
+        self.client = APIClient()
+        # enough requests to trip the anonymous throttle
+        self.client.force_authenticate(User.objects.create_user("buyer", password="x"))
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def walk(self, query):
+        """ids page by page following `next`, then the pages again following `previous` back."""
+        page = self.get(f"/api/catalog/?pagination=cursor&page_size=4&{query}")
+        self.assertIsNone(page["previous"])
+        forward = [[m["id"] for m in page["results"]]]
+        while page["next"]:
+            page = self.get(page["next"])
+            forward.append([m["id"] for m in page["results"]])
+        backward = [forward[-1]]
+        while page["previous"]:
+            page = self.get(page["previous"])
+            backward.insert(0, [m["id"] for m in page["results"]])
+        return forward, backward
+
+    def test_walks_every_ordering_both_ways_without_gaps_or_duplicates(self):
+        for query in ("", "ordering=price-low", "ordering=price-high", "ordering=newest",
+                      "search=cement", "search=cement&ordering=price-low"):
+            with self.subTest(query=query):
+                expected = [m["id"] for m in self.get(f"/api/catalog/?pagination=cursor&page_size=100&{query}")["results"]]
+                forward, backward = self.walk(query)
+                self.assertEqual(sum(forward, []), expected)
+                self.assertEqual(backward, forward)
+                self.assertTrue(all(len(ids) == 4 for ids in forward[:-1]))
+
+    def test_ties_break_on_id_and_nulls_sort_last(self):
+        forward, _ = self.walk("ordering=price-low")
+        rows = {m.pk: m.min_price for m in Material.objects.all()}
+        expected = sorted(rows, key=lambda pk: (rows[pk] is None, rows[pk] or 0, pk))
+        self.assertEqual(sum(forward, []), expected)
+
+        forward, _ = self.walk("ordering=price-high")
+        expected = sorted(rows, key=lambda pk: (rows[pk] is not None, -(rows[pk] or 0), -pk))
+        self.assertEqual(sum(forward, []), expected)
+
+    def test_estimated_total_and_bad_cursor(self):
+        page = self.get("/api/catalog/?pagination=cursor&with_total=1")
+        self.assertEqual(page["estimated_total"], 29)
+        self.assertNotIn("estimated_total", self.get("/api/catalog/?pagination=cursor"))
+        self.assertEqual(self.client.get("/api/catalog/?cursor=not-a-cursor").status_code, 404)
+        # the default stays numbered pages
+        self.assertEqual(self.get("/api/catalog/")["count"], 29)
+
+    def test_estimate_count_is_reused_for_the_ttl(self):
+        qs = Material.objects.filter(description="sand")
+        self.assertEqual(estimate_count(qs), 15)
+        Material.objects.create(title="Extra", sku="SKU-X", category=Category.objects.get(), description="sand")
+        with self.assertNumQueries(0):
+            self.assertEqual(estimate_count(qs), 15)
+        cache.clear()
+        self.assertEqual(estimate_count(qs), 16)
+
+
+class StockLedgerTest(TestCase):
+    """StockMovement ledger: adjustments, point-in-time reads and compaction (products.stock)."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.material = Material.objects.create(title="Bag", sku="BAG", category=category, stock_qty=10)
+        self.t0 = timezone.now() - timedelta(days=10)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("boss", password="x", role="ADMIN"))
+
+    def at(self, days):
+        return self.t0 + timedelta(days=days)
+
+    def move(self, days, delta):
+        StockMovement.objects.create(
+            material=self.material, delta=delta, reason=StockMovement.ADJUSTMENT, created_at=self.at(days),
+        )
+
+    def ledger(self):
+        return list(StockMovement.objects.filter(material=self.material).order_by("id").values_list("delta", flat=True))
+
+    def test_reads_before_between_and_after_snapshots(self):
+        self.move(0, 10)
+        self.move(1, -3)
+        self.assertEqual(compact_ledger(self.at(2), delete=False), (1, 0))
+        self.move(3, 5)
+        self.assertEqual(compact_ledger(self.at(4), delete=False), (1, 0))
+        self.move(5, -2)
+        self.assertEqual(
+            list(StockSnapshot.objects.order_by("taken_at").values_list("stock_qty", flat=True)), [7, 12],
+        )
+
+        pk = self.material.pk
+        self.assertEqual(stock_at(pk, self.at(-1)), 0)
+        self.assertEqual(stock_at(pk, self.at(0.5)), 10)
+        self.assertEqual(stock_at(pk, self.at(2)), 7)
+        self.assertEqual(stock_at(pk, self.at(3.5)), 12)
+        self.assertEqual(stock_at(pk, self.at(4.5)), 12)
+        self.assertEqual(stock_at(pk, self.at(6)), 10)
+        # compacting at an existing snapshot's cutoff adds nothing
+        self.assertEqual(compact_ledger(self.at(4), delete=False), (0, 0))
+
+    def test_reads_past_deleted_history_raise(self):
+        self.move(0, 10)
+        self.move(1, -3)
+        self.move(3, 5)
+        self.assertEqual(compact_ledger(self.at(2)), (1, 2))
+        self.assertEqual(self.ledger(), [5])
+
+        pk = self.material.pk
+        self.assertEqual(stock_at(pk, self.at(2)), 7)
+        self.assertEqual(stock_at(pk, self.at(4)), 12)
+        with self.assertRaises(HistoryCompacted) as raised:
+            stock_at(pk, self.at(1.5))
+        self.assertEqual(raised.exception.cutoff, self.at(2))
+
+        response = self.client.get(f"/api/materials/{pk}/stock_at/", {"at": self.at(1.5).isoformat()})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("compacted", response.data["detail"])
+
+    def test_clamped_delta_logs_what_was_applied(self):
+        self.assertEqual(apply_adjustments([(self.material.pk, -25)]), {self.material.pk: 0})
+        self.assertEqual(Material.objects.get().stock_qty, 0)
+        self.assertEqual(self.ledger(), [-10])
+        # nothing left to take: no movement at all
+        apply_adjustments([(self.material.pk, -1)])
+        self.assertEqual(self.ledger(), [-10])
+
+    def test_bulk_adjust_applies_repeated_materials_in_order(self):
+        body = {"adjustments": [{"sku": "BAG", "delta": -12}, {"id": self.material.pk, "delta": 3}]}
+        response = self.client.post("/api/materials/adjust_stock_bulk/", body, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["results"], [{"id": self.material.pk, "sku": "BAG", "stock_qty": 3}])
+        self.assertEqual(Material.objects.get().stock_qty, 3)
+        self.assertEqual(self.ledger(), [-10, 3])
+
+
+class CatalogSearchTest(TestCase):
+    """?search= on /api/catalog/ through the FTS5 index (products.search)."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.portland = Material.objects.create(title="Portland Cement", sku="CEM-001", category=category, description="grey bag")
+        self.white = Material.objects.create(title="White cement", sku="CEM-002", category=category, description="for tiles")
+        self.rebar = Material.objects.create(title="Steel rebar", sku="STL-10", category=category, description="portland grade")
+        self.client = APIClient()
+
+    def search(self, term):
+        response = self.client.get("/api/catalog/", {"search": term})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [m["id"] for m in response.data["results"]]
+
+    def test_prefix_terms_and_rank(self):
+        self.assertEqual(set(self.search("cem-0")), {self.portland.pk, self.white.pk})
+        self.assertEqual(self.search("ste"), [self.rebar.pk])
+        # a title hit ranks above a description hit
+        self.assertEqual(self.search("portland"), [self.portland.pk, self.rebar.pk])
+        self.assertEqual(self.search("grey portland"), [self.portland.pk])
+
+    def test_fts_syntax_in_input_is_plain_text(self):
+        self.assertEqual(tokenize('"cem* OR NEAR(title: x) -steel'), ["cem", "OR", "NEAR", "title", "x", "steel"])
+        self.assertEqual(get_search_backend().match_expression('cem" OR *'), '"cem"* "OR"*')
+        for term in ('"', "*", '"*', "title:", "NEAR(", "-", "AND OR NOT", "^cem"):
+            with self.subTest(term=term):
+                self.search(term)  # 200, no FTS syntax error
+        self.assertEqual(self.search('"*'), [])
+        self.assertEqual(self.search("title: portland"), [])
+
+    def test_index_follows_saves_deletes_and_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rebar.description = "no grade"
+            self.rebar.save()
+        self.assertEqual(self.search("portland"), [self.portland.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.white.delete()
+        self.assertEqual(self.search("cement"), [self.portland.pk])
+
+        with connection.cursor() as cur:
+            cur.execute("DELETE FROM products_material_fts")
+        cache.clear()  # a raw index write does not bump the catalog version
+        self.assertEqual(self.search("cement"), [])
+        call_command("rebuild_search_index", stdout=io.StringIO())
+        cache.clear()
+        self.assertEqual(self.search("cement"), [self.portland.pk])
+
+    def test_stock_only_save_skips_the_index(self):
+        material = Material.objects.get(pk=self.portland.pk)
+        material.stock_qty = 9
+        with CaptureQueriesContext(connection) as ctx:
+            material.save()
+        self.assertFalse(any("fts" in q["sql"] for q in ctx.captured_queries))
+        material.title = "Portland grey"
+        with CaptureQueriesContext(connection) as ctx:
+            material.save()
+        self.assertTrue(any("fts" in q["sql"] for q in ctx.captured_queries))
+
+    @override_settings(CATALOG_SEARCH_BACKEND="products.search.SimpleSearchBackend")
+    def test_portable_backend_matches_the_same_rows(self):
+        self.assertEqual(self.search("CEM-001"), [self.portland.pk])
+        self.assertEqual(set(self.search("cement")), {self.portland.pk, self.white.pk})
+        self.assertEqual(self.search('"*'), [])
+
+
+class MaterialPriceColumnsTest(TestCase):
+    """Material.retail_price / wholesale_price / min_price kept in sync with PriceTier writes."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.bag = Material.objects.create(title="Bag", sku="BAG", category=category)
+        self.rod = Material.objects.create(title="Rod", sku="ROD", category=category)
+
+    def prices(self, material):
+        material.refresh_from_db()
+        return material.retail_price, material.wholesale_price, material.min_price
+
+    def test_single_and_bulk_writes_resync(self):
+        retail = PriceTier.objects.create(material=self.bag, type=PriceTier.RETAIL, price=Decimal("100"))
+        self.assertEqual(self.prices(self.bag), (Decimal("100"), None, Decimal("100")))
+
+        PriceTier.objects.bulk_create([
+            PriceTier(material=self.bag, type=PriceTier.WHOLESALE, price=Decimal("80")),
+            PriceTier(material=self.rod, type=PriceTier.RETAIL, price=Decimal("5")),
+        ])
+        self.assertEqual(self.prices(self.bag), (Decimal("100"), Decimal("80"), Decimal("80")))
+        self.assertEqual(self.prices(self.rod), (Decimal("5"), None, Decimal("5")))
+
+        PriceTier.objects.filter(material=self.bag).update(price=Decimal("50"))
+        self.assertEqual(self.prices(self.bag), (Decimal("50"), Decimal("50"), Decimal("50")))
+
+        retail.price = Decimal("40")
+        retail.save()
+        self.assertEqual(self.prices(self.bag), (Decimal("40"), Decimal("50"), Decimal("40")))
+
+        PriceTier.objects.bulk_update([PriceTier(pk=retail.pk, price=Decimal("30"))], ["price"])
+        self.assertEqual(self.prices(self.bag), (Decimal("30"), Decimal("50"), Decimal("30")))
+
+        # moving a tier to another material resyncs both
+        PriceTier.objects.filter(type=PriceTier.WHOLESALE).update(material=self.rod)
+        self.assertEqual(self.prices(self.bag), (Decimal("30"), None, Decimal("30")))
+        self.assertEqual(self.prices(self.rod), (Decimal("5"), Decimal("50"), Decimal("5")))
+
+        PriceTier.objects.filter(material=self.rod).delete()
+        self.assertEqual(self.prices(self.rod), (None, None, None))
+        retail.delete()
+        self.assertEqual(self.prices(self.bag), (None, None, None))
+
+    def test_sync_command_verifies_and_repairs_drift(self):
+        PriceTier.objects.create(material=self.rod, type=PriceTier.RETAIL, price=Decimal("5"))
+        Material.objects.filter(pk=self.rod.pk).update(min_price=Decimal("999"))
+        out = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command("sync_material_prices", "--verify", stdout=out)
+        self.assertEqual(self.prices(self.rod)[2], Decimal("999"))
+
+        call_command("sync_material_prices", stdout=out)
+        self.assertEqual(self.prices(self.rod), (Decimal("5"), None, Decimal("5")))
+        call_command("sync_material_prices", "--verify", stdout=out)
+        self.assertIn("Prices: OK", out.getvalue())
+
+    def test_catalog_filters_and_sorts_on_the_columns(self):
+        PriceTier.objects.create(material=self.bag, type=PriceTier.RETAIL, price=Decimal("100"))
+        PriceTier.objects.create(material=self.rod, type=PriceTier.RETAIL, price=Decimal("10"))
+        response = APIClient().get("/api/catalog/?ordering=price-low&min_price=5&max_price=50")
+        results = response.data["results"]
+        self.assertEqual([m["sku"] for m in results], ["ROD"])
+        self.assertNotIn("prices", results[0])
+        response = APIClient().get("/api/catalog/?ordering=price-high")
+        self.assertEqual([m["sku"] for m in response.data["results"]], ["BAG", "ROD"])
+
+
+class ConditionalGetTest(TestCase):
+    """ETag / Last-Modified and 304s on catalog and material reads (common.conditional)."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.material = Material.objects.create(title="Bag", sku="BAG", category=category)
+        self.client = APIClient()
+
+    def test_catalog_list_revalidates_without_queries(self):
+        response = self.client.get("/api/catalog/")
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/catalog/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        # response cache evicted, same catalog version: one aggregate, still a 304
+        version = cache.get(VERSION_KEY)
+        cache.clear()
+        cache.set(VERSION_KEY, version)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/catalog/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PriceTier.objects.create(material=self.material, type=PriceTier.RETAIL, price=Decimal("3.00"))
+        self.assertEqual(self.client.get("/api/catalog/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_etag_and_if_modified_since(self):
+        url = f"/api/catalog/{self.material.pk}/"
+        response = self.client.get(url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+        self.assertEqual(self.client.get("/api/catalog/999999/").status_code, 404)
+
+        Material.objects.filter(pk=self.material.pk).update(updated_at=timezone.now() + timedelta(minutes=5))
+        cache.clear()  # a queryset update does not bump the catalog version
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_material_detail_for_admins(self):
+        self.client.force_authenticate(User.objects.create_user("boss", password="x", role="ADMIN"))
+        url = f"/api/materials/{self.material.pk}/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.material.title = "Bag, grey"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.material.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["title"], "Bag, grey")
+
+
+class SparseFieldsetTest(TestCase):
+    """?fields= / ?omit= trim material payloads and the queries behind them (common.fieldsets)."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        for i in range(3):
+            material = Material.objects.create(title=f"Item {i}", sku=f"SKU-{i}", category=category, description="x" * 50)
+            PriceTier.objects.create(material=material, type=PriceTier.RETAIL, price=Decimal("3.00"))
+        self.client = APIClient()
+
+    def test_catalog_fields_and_omit(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/catalog/?fields=title,price_retail")
+        self.assertEqual(set(response.data["results"][0]), {"id", "title", "price_retail"})
+        page = ctx.captured_queries[-1]["sql"]
+        self.assertNotIn('"description"', page)
+        self.assertNotIn("products_category", page)
+
+        row = self.client.get("/api/catalog/?omit=description,suppliers").data["results"][0]
+        self.assertNotIn("description", row)
+        self.assertNotIn("suppliers", row)
+        self.assertIn("sku", row)
+        # list rows never carry the nested tiers; the detail does
+        self.assertNotIn("prices", row)
+        self.assertIn("prices", self.client.get(f"/api/catalog/{row['id']}/").data)
+        # id cannot be dropped
+        self.assertIn("id", self.client.get("/api/catalog/?omit=id").data["results"][0])
+
+    def test_material_list_skips_unrequested_prefetches(self):
+        self.client.force_authenticate(User.objects.create_user("boss", password="x", role="ADMIN"))
+        with self.assertNumQueries(4):  # count, page, suppliers, prices
+            response = self.client.get("/api/materials/")
+        self.assertEqual(len(response.data["results"][0]["prices"]), 1)
+        with self.assertNumQueries(2):  # count, page
+            response = self.client.get("/api/materials/?fields=title,sku")
+        self.assertEqual(set(response.data["results"][0]), {"id", "title", "sku"})
+        with self.assertNumQueries(3):  # count, page, suppliers
+            response = self.client.get("/api/materials/?omit=prices")
+        self.assertNotIn("prices", response.data["results"][0])
+
+
+class CatalogFacetsTest(TestCase):
+    """GET /api/catalog/facets/: category counts and a price histogram from one query."""
+
+    def setUp(self):
+        cache.clear()
+        cement = Category.objects.create(name="Cement", slug="cement")
+        brick = Category.objects.create(name="Brick", slug="brick")
+        rows = [(cement, "500", 1), (cement, "1500", 0), (cement, None, 3), (brick, "700", 5)]
+        for i, (category, price, stock) in enumerate(rows):
+            material = Material.objects.create(title=f"cement {i}", sku=f"SKU-{i}", category=category, stock_qty=stock)
+            if price:
+                PriceTier.objects.create(material=material, type=PriceTier.RETAIL, price=Decimal(price))
+        self.client = APIClient()
+
+    def test_counts_and_histogram(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/catalog/facets/?category=cement")
+        data = response.data
+        self.assertEqual((data["total"], data["in_stock"]), (3, 2))
+        # every category is listed even with ?category= set
+        self.assertEqual([(c["slug"], c["count"], c["in_stock"]) for c in data["categories"]],
+                         [("brick", 1, 1), ("cement", 3, 2)])
+        self.assertEqual(data["price_histogram"], {
+            "bucket_size": 1000.0,
+            "buckets": [{"min": 0.0, "max": 1000.0, "count": 1}, {"min": 1000.0, "max": 2000.0, "count": 1}],
+            "unpriced": 1,
+        })
+
+        with self.assertNumQueries(0):
+            cached = self.client.get("/api/catalog/facets/?category=cement")
+        self.assertEqual(cached["X-Cache"], "HIT")
+        self.assertEqual(
+            self.client.get("/api/catalog/facets/?category=cement", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304,
+        )
+
+    def test_other_filters_and_bucket_size(self):
+        data = self.client.get("/api/catalog/facets/?search=cement&bucket_size=500&max_price=1000").data
+        self.assertEqual(data["total"], 2)
+        self.assertEqual(data["price_histogram"]["buckets"], [{"min": 500.0, "max": 1000.0, "count": 2}])
+
+    def test_bad_bucket_sizes_fall_back_or_clamp(self):
+        default = bucket_size_from({})
+        for value in ("NaN", "Infinity", "-Infinity", "sNaN", "-5", "0", "abc"):
+            with self.subTest(value=value):
+                self.assertEqual(bucket_size_from({"bucket_size": value}), default)
+                self.assertEqual(self.client.get(f"/api/catalog/facets/?bucket_size={value}").status_code, 200)
+        self.assertEqual(bucket_size_from({"bucket_size": "1e30"}), MAX_BUCKET_SIZE)
+        self.assertEqual(bucket_size_from({"bucket_size": "0.0001"}), MIN_BUCKET_SIZE)
+
+
+class CatalogExportTest(TestCase):
+    """GET /api/catalog/export/ and products.export.stream_catalog()."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        supplier = Supplier.objects.create(name="Acme")
+        for i in range(25):
+            material = Material.objects.create(
+                title=f"cement {i}", sku=f"SKU-{i}", category=category, description='he said "x",\nok',
+            )
+            PriceTier.objects.create(material=material, type=PriceTier.RETAIL, price=Decimal(100 + i))
+            MaterialSupplier.objects.create(supplier=supplier, material=material)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("boss", password="x", role="ADMIN"))
+
+    def test_queries_per_chunk_not_per_row(self):
+        with self.assertNumQueries(7):  # material rows + (tiers, suppliers) for each of 3 chunks
+            data = b"".join(stream_catalog(Material.objects.all(), chunk_size=10))
+        lines = [json.loads(line) for line in data.decode().splitlines()]
+        self.assertEqual([line["sku"] for line in lines], [f"SKU-{i}" for i in range(25)])
+        self.assertEqual(lines[0]["prices"], {"RETAIL": "100.00"})
+        self.assertEqual(lines[0]["suppliers"][0]["name"], "Acme")
+
+    def test_ndjson_honours_catalog_filters(self):
+        response = self.client.get("/api/catalog/export/?min_price=110")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 15)
+
+    def test_gzipped_csv_round_trips(self):
+        response = self.client.get("/api/catalog/export/?fmt=csv&gzip=1&search=cement")
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn('filename="catalog.csv.gz"', response["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(gzip.decompress(b"".join(response.streaming_content)).decode())))
+        self.assertEqual(len(rows), 26)
+        self.assertEqual(rows[1][rows[0].index("description")], 'he said "x",\nok')
+        self.assertEqual(self.client.get("/api/catalog/export/?fmt=xml").status_code, 400)
+
+    def test_admin_only(self):
+        self.assertIn(APIClient().get("/api/catalog/export/").status_code, (401, 403))
+        customer = APIClient()
+        customer.force_authenticate(User.objects.create_user("buyer", password="x"))
+        self.assertEqual(customer.get("/api/catalog/export/").status_code, 403)
+
+
+IMPORT_CSV = b"""sku,title,category,unit,stock_qty,min_stock,retail_price,wholesale_price
+A1,Cement A,cement,BAG,10,5,100.50,90
+A2,Cement B,cement,BAG,1,5,200,
+A3,,cement,BAG,1,5,,
+A4,Bad,nope,XXX,-1,5,abc,
+A1,Dup,cement,BAG,1,1,,
+"""
+
+
+class MaterialImportTest(TestCase):
+    """Bulk CSV / NDJSON import (products.importer) and POST /api/materials/import/."""
+
+    def setUp(self):
+        cache.clear()
+        Category.objects.create(name="Cement", slug="cement")
+        self.admin = User.objects.create_user("boss", password="x", role="ADMIN")
+
+    def run_import(self, data, fmt="csv", **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return import_materials(read_rows(io.BytesIO(data), fmt), user=self.admin, **kwargs)
+
+    def ledger(self):
+        return list(
+            StockMovement.objects.order_by("id").values_list("material__sku", "delta", "reason", "user__username")
+        )
+
+    def test_rows_are_validated_and_written_set_wise(self):
+        result = self.run_import(IMPORT_CSV)
+        self.assertEqual(
+            (result["rows"], result["created"], result["updated"], result["error_count"]), (5, 2, 0, 3),
+        )
+        errors = {e["line"]: e["errors"] for e in result["errors"]}
+        self.assertIn("title", errors[4])
+        self.assertEqual(set(errors[5]), {"category", "unit", "stock_qty", "retail_price"})
+        self.assertIn(6, errors)  # second A1 in the same file
+
+        a1 = Material.objects.get(sku="A1")
+        self.assertEqual((a1.retail_price, a1.wholesale_price, a1.min_price),
+                         (Decimal("100.50"), Decimal("90.00"), Decimal("90.00")))
+        self.assertEqual(list(Alert.objects.filter(is_resolved=False).values_list("material__sku", flat=True)), ["A2"])
+        self.assertEqual(
+            set(get_search_backend().filter(Material.objects.all(), "cement").values_list("sku", flat=True)),
+            {"A1", "A2"},
+        )
+
+    def test_stock_changes_land_in_the_ledger_as_import(self):
+        self.run_import(IMPORT_CSV)
+        self.assertEqual(self.ledger(), [("A1", 10, StockMovement.IMPORT, "boss"), ("A2", 1, StockMovement.IMPORT, "boss")])
+
+        # partial columns keep the rest; only the stock change is logged
+        result = self.run_import(b"sku,stock_qty,retail_price\nA2,50,150\nA1,10,\n")
+        self.assertEqual((result["created"], result["updated"]), (0, 2))
+        a2 = Material.objects.get(sku="A2")
+        self.assertEqual((a2.title, a2.stock_qty, a2.retail_price), ("Cement B", 50, Decimal("150.00")))
+        self.assertEqual(self.ledger()[2:], [("A2", 49, StockMovement.IMPORT, "boss")])
+        self.assertFalse(Alert.objects.filter(is_resolved=False).exists())
+
+    def test_export_feeds_back_in(self):
+        self.run_import(IMPORT_CSV)
+        exported = b"".join(stream_catalog(Material.objects.all()))
+        Material.objects.update(title="x")
+        with self.assertNumQueries(9):
+            result = self.run_import(exported, fmt="ndjson")
+        self.assertEqual((result["updated"], result["error_count"]), (2, 0))
+        self.assertEqual(Material.objects.get(sku="A1").title, "Cement A")
+
+    def test_endpoint_dry_run_and_permissions(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post(
+            "/api/materials/import/", {"file": SimpleUploadedFile("list.csv", IMPORT_CSV), "dry_run": "1"},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["created"], 2)
+        self.assertFalse(Material.objects.exists())
+
+        client.force_authenticate(User.objects.create_user("seller", password="x", role="WHOLESALER"))
+        response = client.post(
+            "/api/materials/import/", {"file": SimpleUploadedFile("list.csv", IMPORT_CSV)}, format="multipart",
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class StockAdjustmentTest(TestCase):
+    """adjust_stock / adjust_stock_bulk: one UPDATE per round, permissions and the after-commit alert reconcile."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.bag = Material.objects.create(title="Bag", sku="BAG", category=category, stock_qty=10, min_stock=5)
+        self.rod = Material.objects.create(title="Rod", sku="ROD", category=category, stock_qty=10, min_stock=5)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("boss", password="x", role="ADMIN"))
+
+    def post(self, url, body):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url, body, format="json")
+
+    def open_alerts(self):
+        return sorted(Alert.objects.filter(is_resolved=False).values_list("material__sku", flat=True))
+
+    def test_single_adjust_opens_and_resolves_the_alert(self):
+        response = self.post(f"/api/materials/{self.bag.pk}/adjust_stock/", {"delta": -6})
+        self.assertEqual(response.data, {"id": self.bag.pk, "stock_qty": 4})
+        self.assertEqual(self.open_alerts(), ["BAG"])
+
+        self.post(f"/api/materials/{self.bag.pk}/adjust_stock/", {"delta": 1})
+        self.assertEqual(Alert.objects.count(), 1)  # still low: the open alert is kept, not duplicated
+        self.post(f"/api/materials/{self.bag.pk}/adjust_stock/", {"delta": 5})
+        self.assertEqual(self.open_alerts(), [])
+        self.assertEqual(self.post(f"/api/materials/{self.bag.pk}/adjust_stock/", {"delta": "x"}).status_code, 400)
+
+    def test_bulk_adjust_is_one_update_per_round(self):
+        body = {"adjustments": [{"sku": "BAG", "delta": -8}, {"sku": "ROD", "delta": 2}, {"sku": "BAG", "delta": 1}]}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.post("/api/materials/adjust_stock_bulk/", body)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual([r["stock_qty"] for r in response.data["results"]], [3, 12])
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "products_material"')]
+        self.assertEqual(len(updates), 2)  # BAG and ROD together, then the repeated BAG
+        self.assertEqual(self.open_alerts(), ["BAG"])
+
+    def test_bad_batches_change_nothing(self):
+        body = {"adjustments": [{"sku": "BAG", "delta": -8}, {"sku": "NOPE", "delta": 1}]}
+        response = self.post("/api/materials/adjust_stock_bulk/", body)
+        self.assertEqual((response.status_code, response.data["missing"]), (400, ["NOPE"]))
+        self.assertEqual(self.post("/api/materials/adjust_stock_bulk/", {"adjustments": []}).status_code, 400)
+        self.assertEqual(Material.objects.get(pk=self.bag.pk).stock_qty, 10)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_suppliers_adjust_only_their_own_materials(self):
+        seller = User.objects.create_user("seller", password="x", role="WHOLESALER")
+        MaterialSupplier.objects.create(supplier=Supplier.objects.create(user=seller, name="Acme"), material=self.bag)
+        self.client.force_authenticate(seller)
+
+        self.assertEqual(self.post(f"/api/materials/{self.bag.pk}/adjust_stock/", {"delta": 1}).status_code, 200)
+        self.assertEqual(self.post(f"/api/materials/{self.rod.pk}/adjust_stock/", {"delta": 1}).status_code, 403)
+        body = {"adjustments": [{"sku": "BAG", "delta": 1}, {"sku": "ROD", "delta": 1}]}
+        response = self.post("/api/materials/adjust_stock_bulk/", body)
+        self.assertEqual((response.status_code, response.data["ids"]), (403, [self.rod.pk]))
+        self.assertEqual(
+            list(Material.objects.order_by("sku").values_list("stock_qty", flat=True)), [11, 10],
+        )
+
+
+class LowStockAlertTest(TestCase):
+    """Low-stock alerts reconciled after commit, the reconcile_alerts sweep and the material_low_stock index."""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name="Cement", slug="cement")
+
+    def make(self, sku, stock_qty, min_stock=5):
+        return Material.objects.create(title=sku, sku=sku, category=self.category, stock_qty=stock_qty, min_stock=min_stock)
+
+    def open_alerts(self):
+        return sorted(Alert.objects.filter(is_resolved=False).values_list("material__sku", flat=True))
+
+    def test_saves_reconcile_once_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            low = self.make("LOW", 2)
+            self.make("OK", 20)
+            self.assertFalse(Alert.objects.exists())  # nothing written until commit
+        self.assertEqual(callbacks.count(flush_dirty_stock), 2)
+        self.assertEqual(self.open_alerts(), ["LOW"])
+
+        # saves that leave stock_qty/min_stock alone are not queued
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            low.title = "Renamed"
+            low.save(update_fields=["title"])
+        self.assertNotIn(flush_dirty_stock, callbacks)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            low.min_stock = 1
+            low.save(update_fields=["min_stock"])
+        self.assertEqual(self.open_alerts(), [])
+        self.assertTrue(Alert.objects.get().is_resolved)
+
+    def test_command_sweeps_writes_that_skipped_the_hooks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make("A", 2)
+            self.make("B", 20)
+        Material.objects.filter(sku="A").update(stock_qty=50)
+        Material.objects.filter(sku="B").update(stock_qty=0)
+
+        out = io.StringIO()
+        call_command("reconcile_alerts", stdout=out)
+        self.assertIn("1 opened, 1 resolved", out.getvalue())
+        self.assertEqual(self.open_alerts(), ["B"])
+        call_command("reconcile_alerts", stdout=out)  # idempotent: no duplicate open alert
+        self.assertEqual(Alert.objects.filter(is_resolved=False).count(), 1)
+
+    def test_low_stock_query_uses_the_partial_index(self):
+        for i in range(5):
+            self.make(f"M{i}", i * 3)
+        self.assertEqual(list(Material.objects.low_stock().order_by("sku").values_list("sku", flat=True)), ["M0", "M1"])
+        self.assertIn("material_low_stock", Material.objects.low_stock().explain())
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("boss", password="x", role="ADMIN"))
+        rows = client.get("/api/admin/low-stock/").data
+        self.assertEqual([r["sku"] for r in rows], ["M0", "M1"])
+
+
+class PriceResolverTest(TestCase):
+    """Role-based price selection shared by the catalog, cart and checkout (products.pricing)."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.both = Material.objects.create(title="Both", sku="BOTH", category=category)
+        self.retail_only = Material.objects.create(title="Retail", sku="RET", category=category)
+        self.wholesale_only = Material.objects.create(title="Wholesale", sku="WHO", category=category)
+        self.free = Material.objects.create(title="Free", sku="FREE", category=category)
+        self.unpriced = Material.objects.create(title="Unpriced", sku="NONE", category=category)
+        PriceTier.objects.bulk_create([
+            PriceTier(material=self.both, type=PriceTier.RETAIL, price=Decimal("100")),
+            PriceTier(material=self.both, type=PriceTier.WHOLESALE, price=Decimal("80")),
+            PriceTier(material=self.retail_only, type=PriceTier.RETAIL, price=Decimal("50")),
+            PriceTier(material=self.wholesale_only, type=PriceTier.WHOLESALE, price=Decimal("30")),
+            PriceTier(material=self.free, type=PriceTier.RETAIL, price=Decimal("0")),
+            PriceTier(material=self.free, type=PriceTier.WHOLESALE, price=Decimal("9")),
+        ])
+        self.materials = [self.both, self.retail_only, self.wholesale_only, self.free, self.unpriced]
+
+    def test_tier_by_role_with_fallback(self):
+        expected = {
+            "CUSTOMER": [("100.00", "RETAIL"), ("50.00", "RETAIL"), ("30.00", "WHOLESALE"), ("0.00", "RETAIL"), None],
+            "WHOLESALER": [("80.00", "WHOLESALE"), ("50.00", "RETAIL"), ("30.00", "WHOLESALE"), ("9.00", "WHOLESALE"), None],
+        }
+        for role, rows in expected.items():
+            resolver = PriceResolver(role)
+            got = [resolver.resolve(m.pk) for m in self.materials]
+            self.assertEqual(
+                got, [(Decimal(r[0]), r[1]) if r else (None, None) for r in rows], role,
+            )
+            # the SQL twin used by the cart summary agrees with the resolver
+            annotated = (
+                Material.objects.filter(pk__in=[m.pk for m in self.materials])
+                .annotate(p=price_expression(role)).order_by("pk").values_list("p", flat=True)
+            )
+            self.assertEqual(list(annotated), [price for price, _ in got])
+        self.assertEqual(PriceResolver("admin").tier, PriceTier.WHOLESALE)
+        self.assertEqual(PriceResolver(None).tier, PriceTier.RETAIL)
+
+    def test_ids_load_in_one_query_and_are_memoized(self):
+        resolver = PriceResolver()
+        with self.assertNumQueries(1):
+            resolver.load([m.pk for m in self.materials] + [999999, None])
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.price(self.both.pk), Decimal("100"))
+            self.assertEqual(resolver.resolve(999999), (None, None))
+        material = Material.objects.get(pk=self.retail_only.pk)
+        with self.assertNumQueries(0):  # a loaded instance is priced from its own columns
+            self.assertEqual(PriceResolver().price(material), Decimal("50"))
+
+    def test_one_resolver_per_request_and_tier(self):
+        django_request = APIRequestFactory().get("/")
+        django_request.user = User.objects.create_user("seller", password="x", role="WHOLESALER")
+        request = Request(django_request)
+        request.user = django_request.user
+        resolver = resolver_for(request)
+        self.assertIs(resolver_for(django_request), resolver)
+        self.assertEqual(resolver.tier, PriceTier.WHOLESALE)
+        self.assertIsNot(resolver_for(request, role="CUSTOMER"), resolver)
+        # the serializer context's role is what counts; none means retail
+        self.assertIs(resolver_from_context({"request": request, "role": "WHOLESALER"}), resolver)
+        self.assertEqual(resolver_from_context({"request": request}).tier, PriceTier.RETAIL)
+
+        context = {"role": "WHOLESALER"}
+        self.assertIs(resolver_from_context(context), resolver_from_context(context))
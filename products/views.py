@@ -1,6 +1,11 @@
 # products/views.py
+from datetime import datetime, time
 
-from django.db.models import Prefetch, Min, Q
+from django.db.models import Count, Max, Prefetch, Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import is_naive, make_aware
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import (
@@ -10,13 +15,31 @@ from rest_framework.permissions import (
 )
 from rest_framework.response import Response
 
-from .models import Category, Material, PriceTier, Alert
+from common.conditional import make_etag, not_modified, set_validators
+from common.fieldsets import SparseFieldsViewMixin
+from common.pagination import KeysetPagination, PageOrKeysetPagination
+from .cache import CachedReadMixin, catalog_version, response_cache_key
+from .models import Category, Material, PriceTier, Alert, StockMovement
+from .export import FORMATS, stream_catalog
+from .facets import catalog_facets
+from .filters import filter_catalog
+from .importer import FORMATS as IMPORT_FORMATS, guess_format, import_materials, read_rows
 from .serializers import (
     CategorySerializer,
     MaterialSerializer,
     PriceTierSerializer,
     MaterialCatalogSerializer,
     AlertSerializer,
+    StockAdjustmentSerializer,
+    StockMovementSerializer,
+)
+from .stock import (
+    MAX_BULK_ADJUSTMENTS,
+    HistoryCompacted,
+    adjustable_ids,
+    apply_adjustments,
+    record_manual_change,
+    stock_at as ledger_stock_at,
 )
 
 
@@ -50,9 +73,46 @@ class IsAdmin(BasePermission):
         )
 
 
+def _updated_at(qs, pk):
+    """updated_at of one row (None if missing or pk is malformed), no model load."""
+    try:
+        return qs.filter(pk=pk).values_list("updated_at", flat=True).first()
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_time(value, end_of_day=False):
+    """
+    ISO date/datetime query param -> aware datetime (None if missing).
+    A bare date means its start, or its end with end_of_day. ValueError if malformed.
+    """
+    if not value:
+        return None
+    dt = parse_datetime(value)
+    if dt is None:
+        d = parse_date(value)
+        if d is None:
+            raise ValueError(value)
+        dt = datetime.combine(d, time.max if end_of_day else time.min)
+    return make_aware(dt) if is_naive(dt) else dt
+
+
+def _prune_for_fieldset(qs, view):
+    """Join / prefetch / load only what the requested ?fields= / ?omit= renders."""
+    if view.wants("category_name"):
+        qs = qs.select_related("category")
+    if view.wants("suppliers"):
+        qs = qs.prefetch_related(Prefetch("suppliers"))
+    if view.wants("prices"):
+        qs = qs.prefetch_related(Prefetch("prices", queryset=PriceTier.objects.all()))
+    if not view.wants("description"):
+        qs = qs.defer("description")
+    return qs
+
+
 # ─────────── Category CRUD ───────────
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CachedReadMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all().order_by("name")
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrWholesaler]
@@ -60,38 +120,159 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 # ─────────── Material CRUD ───────────
 
-class MaterialViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Material.objects.select_related("category").prefetch_related("suppliers").all().order_by("title")
-    )
+class MaterialViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
+    """
+    Supports ?fields=title,sku / ?omit=prices,suppliers to trim both the
+    payload and the queries behind it. Bulk upserts: POST /api/materials/import/.
+    Stock ledger: GET /api/materials/{id}/movements/ and /stock_at/?at=.
+    """
+    queryset = Material.objects.all().order_by("title")
     serializer_class = MaterialSerializer
     permission_classes = [IsAdminOrWholesaler]
 
+    def get_queryset(self):
+        return _prune_for_fieldset(super().get_queryset(), self)
+
+    def retrieve(self, request, *args, **kwargs):
+        # ETag from updated_at (price syncs touch it) + catalog version (supplier links)
+        updated_at = _updated_at(Material.objects.all(), kwargs.get("pk"))
+        etag = make_etag("material", kwargs.get("pk"), updated_at, catalog_version()) if updated_at else None
+        return (
+            not_modified(request, etag, updated_at)
+            or set_validators(super().retrieve(request, *args, **kwargs), etag, updated_at)
+        )
+
+    def perform_create(self, serializer):
+        material = serializer.save()
+        record_manual_change(material, 0, self.request.user)
+
+    def perform_update(self, serializer):
+        before = serializer.instance.stock_qty
+        material = serializer.save()
+        record_manual_change(material, before, self.request.user)
+
+    def _ledger_material(self, request, pk):
+        """(material_id, None) or (None, error response) for the ledger reads."""
+        material_id = get_object_or_404(Material.objects.values_list("pk", flat=True), pk=pk)
+        if material_id not in adjustable_ids(request.user, [material_id]):
+            return None, Response({"detail": "Not allowed to view stock history"}, status=403)
+        return material_id, None
+
+    @action(detail=True, methods=["get"])
+    def movements(self, request, pk=None):
+        """
+        GET /api/materials/{id}/movements/?since=&until=&reason=
+        Newest first, cursor paginated (admin or supplier of this material).
+        """
+        material_id, error = self._ledger_material(request, pk)
+        if error:
+            return error
+        qs = StockMovement.objects.filter(material_id=material_id)
+        try:
+            since = _parse_time(request.query_params.get("since"))
+            until = _parse_time(request.query_params.get("until"), end_of_day=True)
+        except ValueError:
+            return Response({"detail": "since/until must be ISO dates or datetimes"}, status=400)
+        if since:
+            qs = qs.filter(created_at__gte=since)
+        if until:
+            qs = qs.filter(created_at__lte=until)
+        if request.query_params.get("reason"):
+            qs = qs.filter(reason=request.query_params["reason"].upper())
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(qs.order_by("-created_at", "-id"), request, view=self)
+        return paginator.get_paginated_response(StockMovementSerializer(page, many=True).data)
+
+    @action(detail=True, methods=["get"])
+    def stock_at(self, request, pk=None):
+        """GET /api/materials/{id}/stock_at/?at=2025-01-31T18:00  ->  {"id", "at", "stock_qty"}"""
+        material_id, error = self._ledger_material(request, pk)
+        if error:
+            return error
+        try:
+            at = _parse_time(request.query_params.get("at"), end_of_day=True)
+        except ValueError:
+            at = None
+        if at is None:
+            return Response({"detail": "at must be an ISO date or datetime"}, status=400)
+        try:
+            qty = ledger_stock_at(material_id, at)
+        except HistoryCompacted as e:
+            return Response({"detail": str(e)}, status=400)
+        return Response({"id": material_id, "at": at, "stock_qty": qty})
+
     @action(detail=True, methods=["post"])
     def adjust_stock(self, request, pk=None):
         """
         POST /api/materials/{id}/adjust_stock/
         body: { "delta": -5 } ya { "delta": 10 }
+        Applied as one UPDATE (clamped at 0), so concurrent calls never lose updates.
         """
-        m = self.get_object()
+        material_id = get_object_or_404(Material.objects.values_list("pk", flat=True), pk=pk)
         # permission: admin or supplier of this material
-        user = request.user
-        is_admin = user and user.is_authenticated and (getattr(user, 'role', '') == 'ADMIN' or getattr(user, 'is_staff', False))
-        is_supplier_owner = False
-        try:
-            supplier = getattr(user, 'supplier_profile', None)
-            if supplier and m.suppliers.filter(id=supplier.id).exists():
-                is_supplier_owner = True
-        except Exception:
-            is_supplier_owner = False
-
-        if not (is_admin or is_supplier_owner):
+        if material_id not in adjustable_ids(request.user, [material_id]):
             return Response({"detail": "Not allowed to adjust stock"}, status=403)
 
-        delta = int(request.data.get("delta", 0))
-        m.stock_qty = max(0, m.stock_qty + delta)
-        m.save()
-        return Response({"id": m.id, "stock_qty": m.stock_qty})
+        try:
+            delta = int(request.data.get("delta", 0))
+        except (TypeError, ValueError):
+            return Response({"delta": ["A valid integer is required."]}, status=400)
+        stock = apply_adjustments([(material_id, delta)], user=request.user)
+        return Response({"id": material_id, "stock_qty": stock[material_id]})
+
+    @action(detail=False, methods=["post"])
+    def adjust_stock_bulk(self, request):
+        """
+        POST /api/materials/adjust_stock_bulk/
+        body: {"adjustments": [{"sku": "CEM-01", "delta": -5}, {"id": 7, "delta": 10}, ...]}
+        One transaction: unknown materials or ones you may not adjust reject the whole batch.
+        """
+        items = request.data.get("adjustments") if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({"adjustments": ["A non-empty list is required."]}, status=400)
+        if len(items) > MAX_BULK_ADJUSTMENTS:
+            return Response({"adjustments": [f"At most {MAX_BULK_ADJUSTMENTS} items per request."]}, status=400)
+        ser = StockAdjustmentSerializer(data=items, many=True)
+        ser.is_valid(raise_exception=True)
+
+        ids = {a["id"] for a in ser.validated_data if "id" in a}
+        skus = {a["sku"] for a in ser.validated_data if "sku" in a}
+        found = Material.objects.filter(Q(pk__in=ids) | Q(sku__in=skus)).values_list("pk", "sku")
+        by_sku = {sku: pk for pk, sku in found}
+        known = set(by_sku.values())
+        missing = sorted(str(i) for i in ids - known) + sorted(skus - set(by_sku))
+        if missing:
+            return Response({"detail": "Unknown materials", "missing": missing}, status=400)
+
+        forbidden = known - adjustable_ids(request.user, known)
+        if forbidden:
+            return Response({"detail": "Not allowed to adjust stock", "ids": sorted(forbidden)}, status=403)
+
+        pairs = [(a["id"] if "id" in a else by_sku[a["sku"]], a["delta"]) for a in ser.validated_data]
+        stock = apply_adjustments(pairs, user=request.user)
+        sku_of = {pk: sku for sku, pk in by_sku.items()}
+        return Response({
+            "results": [{"id": pk, "sku": sku_of[pk], "stock_qty": qty} for pk, qty in sorted(stock.items())]
+        })
+
+    @action(detail=False, methods=["post"], url_path="import", permission_classes=[IsAdmin])
+    def bulk_import(self, request):
+        """
+        POST /api/materials/import/   (multipart, admin only)
+        file=<csv|ndjson>, optional fmt=csv|ndjson (default from file name), dry_run=1
+        Upserts materials + price tiers by sku; returns counts and per-row errors.
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"detail": "file is required"}, status=400)
+        fmt = request.data.get("fmt") or guess_format(upload.name)
+        if fmt not in IMPORT_FORMATS:
+            return Response({"detail": f"fmt must be one of {list(IMPORT_FORMATS)}"}, status=400)
+        dry_run = request.data.get("dry_run") in ("1", "true", "True")
+        report = import_materials(read_rows(upload.file, fmt), dry_run=dry_run, user=request.user)
+        report["dry_run"] = dry_run
+        return Response(report)
 
 
 # ─────────── Price Tier CRUD ───────────
@@ -104,58 +285,34 @@ class PriceTierViewSet(viewsets.ModelViewSet):
 
 # ─────────── Public Catalog (Landing / Catalog page) ───────────
 
-class CatalogViewSet(viewsets.ReadOnlyModelViewSet):
+class CatalogViewSet(CachedReadMixin, SparseFieldsViewMixin, viewsets.ReadOnlyModelViewSet):
     """
     Public catalog endpoints:
-      GET /api/catalog/           (optional ?category=<slug>)
+      GET /api/catalog/           (optional ?category=<slug>, ?search=<text>)
       GET /api/catalog/{id}/
+      GET /api/catalog/facets/    (same filters, optional ?bucket_size=)
+      GET /api/catalog/export/    (same filters, ?fmt=ndjson|csv, ?gzip=1)
+    List pages are numbered by default; ?pagination=cursor switches to keyset
+    pages with opaque next/previous cursors (optionally ?with_total=1).
+    Responses are cached per query + role until the catalog version changes.
+    ?fields= / ?omit= trim the payload and the queries (see common.fieldsets).
     """
 
     permission_classes = [AllowAny]
     serializer_class = MaterialCatalogSerializer
+    pagination_class = PageOrKeysetPagination
+    # list prices come from Material's columns; nested tiers only on detail
+    default_omit = {"list": {"prices"}}
 
     def get_queryset(self):
-        # annotate a minimum price across price tiers to enable basic price filtering/sorting
-        qs = (
-            Material.objects
-            .select_related("category")
-            .prefetch_related(
-                Prefetch("prices", queryset=PriceTier.objects.all()),
-                Prefetch("suppliers"),
-            )
-            .annotate(min_price=Min("prices__price"))
-            .order_by("title")
-        )
+        # min_price / retail_price / wholesale_price are stored columns on Material,
+        # so only the detail view still needs the PriceTier rows themselves
+        qs = _prune_for_fieldset(Material.objects.order_by("title"), self)
 
         params = self.request.query_params
-        slug = params.get("category")
-        search = params.get("search")
-        min_price = params.get("min_price")
-        max_price = params.get("max_price")
+        qs = filter_catalog(qs, params)
         ordering = params.get("ordering") or params.get("sortBy")
 
-        if slug:
-            qs = qs.filter(category__slug=slug)
-
-        if search:
-            qs = qs.filter(
-                Q(title__icontains=search) | Q(sku__icontains=search) | Q(description__icontains=search)
-            )
-
-        if min_price:
-            try:
-                mq = float(min_price)
-                qs = qs.filter(min_price__gte=mq)
-            except ValueError:
-                pass
-
-        if max_price:
-            try:
-                mq = float(max_price)
-                qs = qs.filter(min_price__lte=mq)
-            except ValueError:
-                pass
-
         # ordering support: accept 'price-low', 'price-high', 'newest' or raw field names
         if ordering:
             if ordering in ("price-low", "price_asc", "price_retail"):
@@ -163,13 +320,64 @@ class CatalogViewSet(viewsets.ReadOnlyModelViewSet):
             elif ordering in ("price-high", "price_desc", "-price_retail"):
                 qs = qs.order_by("-min_price")
             elif ordering == "newest":
-                qs = qs.order_by("-created_at")
+                qs = qs.order_by("-created_at", "-id")
             else:
                 # allow passing model field ordering directly
                 qs = qs.order_by(ordering)
 
         return qs
 
+    def get_validators(self, request, *args, **kwargs):
+        """
+        One aggregate over the filtered rows (no serialization): newest
+        updated_at + row count, combined with the cache key (catalog version,
+        role, normalized params).
+        """
+        if self.action == "facets":
+            # facets span every category, so only the catalog version is a safe validator
+            return make_etag(response_cache_key(request)), None
+        if self.action == "retrieve":
+            updated_at = _updated_at(Material.objects.all(), kwargs.get("pk"))
+            if updated_at is None:
+                return None, None
+            return make_etag(response_cache_key(request), updated_at), updated_at
+        qs = self.filter_queryset(self.get_queryset())
+        stats = qs.order_by().aggregate(last=Max("updated_at"), n=Count("id"))
+        if not stats["n"]:
+            return None, None
+        return make_etag(response_cache_key(request), stats["last"], stats["n"]), stats["last"]
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """
+        Per-category counts, in-stock counts and a price histogram in one
+        grouped query; cached with the catalog version like the list.
+        """
+        return self.cached_response(request, lambda req: Response(catalog_facets(req.query_params)))
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAdmin])
+    def export(self, request):
+        """
+        Full catalog dump streamed in constant memory. Uses ?fmt= because
+        DRF reserves ?format= for renderer selection.
+        Admin only: rows carry stock levels, both price tiers and supplier
+        cost / lead time, which the public catalog does not expose.
+        """
+        params = request.query_params
+        fmt = params.get("fmt", "ndjson")
+        if fmt not in FORMATS:
+            return Response({"detail": f"fmt must be one of {sorted(FORMATS)}"}, status=400)
+        gzip = params.get("gzip") in ("1", "true", "True")
+
+        qs = filter_catalog(Material.objects.all(), params)
+        response = StreamingHttpResponse(
+            stream_catalog(qs, fmt=fmt, gzip=gzip),
+            content_type="application/gzip" if gzip else FORMATS[fmt],
+        )
+        filename = f"catalog.{fmt}" + (".gz" if gzip else "")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
         user = getattr(self.request, "user", None)
@@ -203,5 +411,6 @@ class InventoryAlertViewSet(viewsets.ModelViewSet):
     def resolve(self, request, pk=None):
         alert = self.get_object()
         alert.is_resolved = True
-        alert.save(update_fields=["is_resolved"])
+        # updated_at doubles as the resolution time (alert archival age)
+        alert.save(update_fields=["is_resolved", "updated_at"])
         return Response({"id": alert.id, "resolved": True})
@@ -1,13 +1,13 @@
 # users/urls.py
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 
-from .views import register_view, me_view  
+from .views import LoginView, register_view, me_view
 
 urlpatterns = [
     # Auth
     path("auth/register/", register_view, name="register"),
-    path("auth/login/", TokenObtainPairView.as_view(), name="auth-login"),
+    path("auth/login/", LoginView.as_view(), name="auth-login"),
     path("auth/refresh/", TokenRefreshView.as_view(), name="auth-refresh"),
     path("auth/me/", me_view, name="auth-me"),
 ]
@@ -3,7 +3,10 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.views import TokenObtainPairView
 
+from orders.cart_store import merge_guest_cart
 from .serializers import RegisterSerializer
 
 
@@ -36,3 +39,24 @@ def me_view(request):
         }
     )
 
+
+class LoginView(TokenObtainPairView):
+    """
+    POST: username, password -> {access, refresh}
+    A guest cart sent as X-Cart-Token is merged into the user's cart; lines
+    it could not add come back as "cart_unknown" / "cart_shortages".
+    """
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        data = dict(serializer.validated_data)
+        merged = merge_guest_cart(request, serializer.user)
+        if merged and merged["unknown"]:
+            data["cart_unknown"] = merged["unknown"]
+        if merged and merged["shortages"]:
+            data["cart_shortages"] = merged["shortages"]
+        return Response(data, status=status.HTTP_200_OK)
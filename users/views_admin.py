@@ -9,9 +9,10 @@ from rest_framework.response import Response
 # 🔹 Models sahi apps se
 from orders.models import Order, OrderItem          # orders app
 from products.models import Material                # ✅ tumhara real model
+from products.cache import cache_stats
 
 # 🔹 Serializers
-from orders.serializers import OrderListSerializer
+from orders.serializers import OrderListSerializer, with_list_annotations
 from products.serializers import MaterialSerializer   # <-- yeh naam apne serializer ke mutabiq rakhna
 
 
@@ -42,7 +43,7 @@ def admin_metrics(request):
     )
 
     pending_payments = Order.objects.filter(status="PENDING").count()
-    low_stock = Material.objects.filter(stock_qty__lte=F("min_stock")).count()
+    low_stock = Material.objects.low_stock().count()
 
     return Response(
         {
@@ -50,6 +51,7 @@ def admin_metrics(request):
             "revenue_today": float(revenue_today),
             "pending_payments": pending_payments,
             "low_stock": low_stock,
+            "catalog_cache": cache_stats(),
         }
     )
 
@@ -60,10 +62,7 @@ def admin_metrics(request):
 @permission_classes([IsAdminRole])
 def recent_orders(request):
     # Order model me FK ka naam "user" hai
-    qs = (
-        Order.objects.select_related("user")
-        .order_by("-created_at")[:10]
-    )
+    qs = with_list_annotations(Order.objects.order_by("-created_at", "-id"))[:10]
     data = OrderListSerializer(qs, many=True).data
     return Response(data)
 
@@ -73,7 +72,7 @@ def recent_orders(request):
 @permission_classes([IsAdminRole])
 def low_stock_products(request):
     qs = (
-        Material.objects.filter(stock_qty__lte=F("min_stock"))
+        Material.objects.low_stock()
         .order_by("stock_qty")[:20]
     )
     data = MaterialSerializer(qs, many=True).data